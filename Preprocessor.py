@@ -1,17 +1,45 @@
+import functools
+import hashlib
+import inspect
+import os
+
 import pandas as pd
-import streamlit as st
-from Preprocessor import preprocessor_data
 from datetime import datetime
 
-def preprocessor_data("cleaning dataset final.csv"):
+# Declared in-memory schema for the cleaned dataset (see apply_schema)
+# Low-cardinality text columns: stored as categoricals (small integer codes + one copy of each label)
+CATEGORICAL_COLUMNS = [
+    'Gender', 'Location', 'Profession', 'Demographics', 'Platform', 'Video Category', 'Frequency',
+    'Watch Reason', 'DeviceType', 'OS', 'CurrentActivity', 'ConnectionType', 'Age Group',
+]
+# Bounded scores and counts: stored in the smallest integer width that holds their values
+INTEGER_COLUMNS = [
+    'Age', 'Addiction Level', 'Self Control', 'Satisfaction', 'Importance Score', 'ProductivityLoss',
+    'Number of Sessions', 'Number of Videos Watched', 'Scroll Rate', 'Video Length', 'Time Spent On Video',
+    'Video ID', 'UserID', 'Income',
+]
+BOOLEAN_COLUMNS = ['Debt', 'Owns Property']
+
+# Age bins of the 'Age Group' column (left-closed, e.g. 18 falls in '19-30')
+AGE_BINS = [0, 18, 30, 40, 50, 60, 100]
+AGE_LABELS = ['0-18', '19-30', '31-40', '41-50', '51-60', '60+']
+
+# Stage outputs kept on disk per column by ColumnCache; older versions are removed
+CACHED_COLUMN_VERSIONS = 4
+
+def preprocessor_data(file_path="cleaning dataset final.csv", cache=None):
     # Read the dataset
-    df = pd.read_csv("cleaning dataset final.csv")
+    df = pd.read_csv(file_path)
     
     # Clean the dataset (handle missing values, incorrect data types, etc.)
     df = clean_data(df)
     
-    # Create new columns based on existing ones if needed (e.g., date parsing, time calculations)
-    df = create_additional_columns(df)
+    # Create new columns based on existing ones if needed (e.g., date parsing, time calculations);
+    # with a ColumnCache only the stages whose inputs or code changed are recomputed
+    df = create_additional_columns(df, cache)
+
+    # Compact dtypes (categoricals, small ints, bools) for the copy kept in memory
+    df = apply_schema(df)
     
     # Return the processed dataframe
     return df
@@ -30,33 +58,194 @@ def clean_data(df):
     
     return df
 
-def create_additional_columns(df):
-    # Convert 'Date' to datetime format if the dataset contains a 'Date' column
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')  # Coerce errors to NaT if invalid
-    
-    # Example: Create a 'Hour' column from 'Total Time Spent' (assuming 'Total Time Spent' is in minutes)
-    df['Hour'] = df['Total Time Spent'] // 60  # Convert minutes to hours
-    
-    # Example: Create a 'Month' column for grouping by month (if 'Date' is available)
-    if 'Date' in df.columns:
-        df['Month'] = df['Date'].dt.to_period('M')  # Add month column
-    
+# Derived columns are a pipeline of stages. Each stage names its output column, the columns
+# it reads and the function (plus parameters) computing it. A stage's key is a hash of its
+# code, its parameters and the keys of its inputs (a content hash for source columns), so a
+# change to one stage only changes the keys of the stages downstream of it.
+
+class Stage:
+    # output = func(*[df[column] for column in inputs], **params)
+
+    def __init__(self, output, inputs, func, **params):
+        self.output = output
+        self.inputs = list(inputs)
+        self.func = func
+        self.params = params
+
+    def code_key(self):
+        try:
+            code = inspect.getsource(self.func)
+        except (OSError, TypeError):
+            code = self.func.__code__.co_code.hex()
+        return _sha1(self.output, self.inputs, code, sorted(self.params.items()))
+
+    def run(self, df):
+        return self.func(*[df[column] for column in self.inputs], **self.params).rename(self.output)
+
+def parse_dates(dates):
+    # Coerce errors to NaT if invalid
+    return pd.to_datetime(dates, errors='coerce')
+
+def hours(total_time_spent):
+    # 'Total Time Spent' is in minutes
+    return total_time_spent // 60
+
+def months(dates):
+    # Month period for grouping by month
+    return dates.dt.to_period('M')
+
+def age_groups(ages, bins, labels):
+    return pd.cut(ages, bins=bins, labels=labels, right=False)
+
+# In dependency order; a stage whose inputs are missing (e.g. no 'Date' column) is skipped
+PIPELINE = [
+    Stage('Date', ['Date'], parse_dates),
+    Stage('Hour', ['Total Time Spent'], hours),
+    Stage('Month', ['Date'], months),
+    Stage('Age Group', ['Age'], age_groups, bins=AGE_BINS, labels=AGE_LABELS),
+]
+
+def _sha1(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+def column_fingerprint(values):
+    # Content hash of a source column
+    hashed = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return _sha1(str(values.dtype), hashlib.sha1(hashed.tobytes()).hexdigest())
+
+@functools.lru_cache(maxsize=None)
+def pipeline_fingerprint():
+    # Changes whenever any stage's code or parameters change (part of the snapshot key)
+    return _sha1([stage.code_key() for stage in PIPELINE])
+
+def stage(name):
+    for candidate in PIPELINE:
+        if candidate.output == name:
+            return candidate
+    raise KeyError(f"No pipeline stage produces {name!r}")
+
+def derive(df, name):
+    # The derived column `name`: df's own copy when it has one, else computed from its inputs
+    if name in df.columns:
+        return df[name]
+    producer = stage(name)
+    return producer.func(*[derive(df, column) for column in producer.inputs], **producer.params).rename(name)
+
+class ColumnCache:
+    # Stage outputs on disk, one Parquet file per (export, column, key). Versions are kept and
+    # pruned per export, so dashboards on different exports don't evict each other's columns.
+
+    def __init__(self, directory, source=None, keep=CACHED_COLUMN_VERSIONS):
+        self.directory = directory
+        self.source = os.path.splitext(os.path.basename(source))[0].replace(' ', '_') if source else None
+        self.keep = keep
+
+    def _prefix(self, column):
+        column = column.replace(' ', '_') + "-"
+        return f"{self.source}-{column}" if self.source else column
+
+    def _path(self, column, key):
+        return os.path.join(self.directory, f"{self._prefix(column)}{key}.parquet")
+
+    def get(self, column, key, index):
+        path = self._path(column, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            values = pd.read_parquet(path)[column]
+        except Exception:
+            return None
+        if len(values) != len(index):
+            return None
+        values.index = index
+        return values
+
+    def put(self, column, key, values):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(column, key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            values.to_frame().to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            self._prune(column)
+        except OSError:
+            # Read-only deployments simply recompute
+            pass
+
+    def _prune(self, column):
+        prefix = self._prefix(column)
+        paths = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith(".parquet")
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def run_pipeline(df, cache=None, stages=PIPELINE):
+    # Adds every stage's output column to df. With a ColumnCache, an output whose key is
+    # cached is read back instead of recomputed.
+    keys = {}
+    for current in stages:
+        if not all(column in df.columns for column in current.inputs):
+            continue
+        if cache is None:
+            df[current.output] = current.run(df)
+            continue
+        input_keys = [keys.get(column) or column_fingerprint(df[column]) for column in current.inputs]
+        key = _sha1(current.code_key(), input_keys)
+        values = cache.get(current.output, key, df.index)
+        if values is None:
+            values = current.run(df)
+            cache.put(current.output, key, values)
+        df[current.output] = values
+        keys[current.output] = key
     return df
 
+def create_additional_columns(df, cache=None):
+    # 'Date' parsed, plus 'Hour', 'Month' and 'Age Group' (see PIPELINE)
+    return run_pipeline(df, cache)
+
+def apply_schema(df):
+    # Returns df with the declared compact dtypes. Categories are sorted, so grouping on a
+    # categorical orders groups the same way as grouping on the original strings.
+    columns = {}
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            columns[column] = df[column].astype('category')
+    for column in INTEGER_COLUMNS:
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column].dtype):
+            columns[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in BOOLEAN_COLUMNS:
+        if column in df.columns and df[column].notna().all():
+            columns[column] = df[column].astype(bool)
+    return df.assign(**columns) if columns else df
+
+def memory_report(df):
+    # Resident bytes per column (strings and category labels included), largest first
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'column': usage.index,
+        'dtype': [str(df[column].dtype) for column in usage.index],
+        'bytes': usage.to_numpy(),
+    })
+    report['share'] = report['bytes'] / max(report['bytes'].sum(), 1)
+    return report.sort_values('bytes', ascending=False, ignore_index=True)
+
 def add_custom_bins(df):
-    # Create custom age groups if necessary
-    bins = [0, 18, 30, 40, 50, 60, 100]
-    labels = ['0-18', '19-30', '31-40', '41-50', '51-60', '60+']
-    df['Age Group'] = pd.cut(df['Age'], bins=bins, labels=labels, right=False)
+    # Create custom age groups if necessary (the 'Age Group' stage on its own)
+    df['Age Group'] = stage('Age Group').run(df)
     
     return df
 
 def aggregate_monthly_data(df):
     # Aggregate data by month for trends over time (for example: total time spent by month)
     if 'Date' in df.columns:
-        df['Month'] = df['Date'].dt.to_period('M')  # Ensure 'Month' column exists
-        monthly_data = df.groupby('Month')['Total Time Spent'].sum().reset_index()
+        month = derive(df, 'Month')  # Month key without modifying df (it may be shared)
+        monthly_data = df.groupby(month)['Total Time Spent'].sum().reset_index()
         monthly_data['Month'] = monthly_data['Month'].dt.to_timestamp()  # Convert 'Month' back to datetime format
         return monthly_data
     else:
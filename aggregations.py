@@ -0,0 +1,41 @@
+import numpy as np
+
+# Box statistics for section 6, which the cube cannot answer (quantiles are not additive).
+# They come back as a small frame whose size depends on the number of groups, never on
+# the number of rows.
+
+# Outliers drawn per box; the rest are summarised by the whiskers
+MAX_OUTLIERS_PER_GROUP = 50
+
+
+def box_stats(values, keys, whis=1.5, max_outliers=MAX_OUTLIERS_PER_GROUP, seed=0):
+    # Per-group quartiles, Tukey whiskers and a capped, sampled outlier set, computed with
+    # grouped (vectorized) passes instead of one scan per group. Columns: q1, med, q3,
+    # whislo, whishi, min, max, count, fliers (array of sampled outliers), indexed by group.
+    grouped = values.groupby(keys)
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "med", "q3"]
+    stats["min"] = grouped.min()
+    stats["max"] = grouped.max()
+    stats["count"] = grouped.count()
+
+    iqr = stats["q3"] - stats["q1"]
+    low = (stats["q1"] - whis * iqr).reindex(keys).to_numpy()
+    high = (stats["q3"] + whis * iqr).reindex(keys).to_numpy()
+    inside = (values.to_numpy() >= low) & (values.to_numpy() <= high)
+
+    # Whiskers reach the most extreme values still inside the fences
+    stats["whislo"] = values[inside].groupby(keys[inside]).min()
+    stats["whishi"] = values[inside].groupby(keys[inside]).max()
+
+    outliers = values[~inside & values.notna().to_numpy()]
+    outliers = outliers.sample(frac=1.0, random_state=seed).groupby(keys[outliers.index]).head(max_outliers)
+    fliers = {group: part.to_numpy() for group, part in outliers.groupby(keys[outliers.index])}
+    stats["fliers"] = [fliers.get(group, np.array([])) for group in stats.index]
+    return stats
+
+
+def hour_box_stats(df, max_outliers=MAX_OUTLIERS_PER_GROUP):
+    # Section 6: distribution of 'Total Time Spent' per 'Hour' bucket
+    hours = df['Hour'].astype(int).rename('Hour')
+    return box_stats(df['Total Time Spent'], hours, max_outliers=max_outliers)
@@ -0,0 +1,282 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Preprocessor import AGE_LABELS, derive
+from aggregations import MAX_OUTLIERS_PER_GROUP
+from data_loader import dataset_fingerprint, derived, peek_derived
+from filter_index import AGE_COLUMN, FILTER_COLUMNS, FilterState
+from olap_cube import CUBE_MEASURES
+from query_backend import as_list, shape_pivot
+from rollup_store import GRANULARITIES, bucket_start
+
+# Approximate answers for large exports: a stratified sample answers the KPIs and the charts
+# right away, with 95% error bounds, while the exact structures (cube and per-hour box
+# statistics) are built in the background and replace it once ready. On by default from
+# APPROXIMATE_MIN_ROWS rows, so the first page never waits for the exact build.
+
+# "1" turns approximate mode on by default, "0" off; unset, it depends on the dataset size
+APPROXIMATE_ENV = "INSIGHTS_APPROXIMATE"
+APPROXIMATE_MIN_ROWS = 1_000_000
+
+# Rows drawn in total, spread over the strata in proportion to their size
+SAMPLE_ROWS = 100_000
+# Every stratum keeps at least this many rows (or all of them, if it has fewer)
+MIN_PER_STRATUM = 5
+# Half-widths are Z standard errors (95% normal interval)
+Z = 1.96
+
+# Strata are the combinations of the categorical sidebar filters, so any categorical
+# selection keeps or drops whole strata and only the age slider cuts across them
+STRATA = FILTER_COLUMNS
+
+
+class StratifiedSample:
+    # Answers the same queries as olap_cube.Cube (mean, sum, count, pivot) from a weighted
+    # stratified sample, plus *_with_error variants returning (estimate, 95% half-width).
+    # Means are ratio estimates; variances use the stratified linearisation with the
+    # finite-population correction, so a fully sampled stratum contributes no error.
+
+    def __init__(self, rows, stratum_sizes, stratum_samples, population):
+        self.rows = rows
+        self.stratum_sizes = stratum_sizes
+        self.stratum_samples = stratum_samples
+        self.population = population
+        self._last = None
+
+    @classmethod
+    def build(cls, df, target=SAMPLE_ROWS, seed=0):
+        codes = df.groupby(STRATA, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+        sizes = np.bincount(codes)
+        wanted = np.maximum(MIN_PER_STRATUM, np.round(sizes * target / max(len(df), 1)).astype(np.int64))
+        samples = np.minimum(sizes, wanted)
+
+        # A random rank inside each stratum; the lowest `samples[h]` ranks are kept
+        rng = np.random.default_rng(seed)
+        order = np.lexsort((rng.random(len(df)), codes))
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        rank = np.empty(len(df), dtype=np.int64)
+        rank[order] = np.arange(len(df)) - np.repeat(starts, sizes)
+        keep = np.flatnonzero(rank < samples[codes])
+
+        columns = [c for c in STRATA + [AGE_COLUMN, "ConnectionType", "Hour"] + CUBE_MEASURES if c in df.columns]
+        rows = df.iloc[keep][columns].reset_index(drop=True)
+        rows["_stratum"] = codes[keep]
+        rows["_weight"] = sizes[codes[keep]] / samples[codes[keep]]
+        rows["_all"] = 0
+        rows["_age_group"] = derive(df, 'Age Group').iloc[keep].astype(str).to_numpy()
+        # Trend buckets, named "_day", "_week", "_month" (see rollup_store); all missing, and
+        # so no trend, for an export without dates
+        if 'Date' in df.columns:
+            dates = df['Date'].iloc[keep].reset_index(drop=True)
+        else:
+            dates = pd.Series(pd.NaT, index=rows.index, dtype='datetime64[ns]')
+        for granularity in GRANULARITIES:
+            rows[f"_{granularity}"] = bucket_start(dates, granularity)
+        return cls(rows, sizes, samples, len(df))
+
+    def domain(self, state):
+        # Sample rows inside the filter state (cached for the last state asked for)
+        last = self._last
+        if last is not None and last[0] == state:
+            return last[1]
+        mask = pd.Series(True, index=self.rows.index)
+        for column, values in state.selections:
+            mask &= self.rows[column].isin(values)
+        if state.age_range is not None:
+            mask &= self.rows[AGE_COLUMN].between(*state.age_range)
+        rows = self.rows[mask]
+        self._last = (state, rows)
+        return rows
+
+    def estimate(self, state, keys, measure=None, stat="rows", start=None, end=None):
+        # (estimate, half-width) Series indexed by `keys`, over sample rows dated start..end
+        rows = self.domain(state)
+        if start is not None:
+            rows = rows[rows["_day"] >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            rows = rows[rows["_day"] <= pd.Timestamp(end).normalize()]
+        keys = keys or ["_all"]
+        if stat == "rows":
+            values = pd.Series(1.0, index=rows.index)
+        elif stat == "count":
+            values = rows[measure].notna().astype(float)
+        elif stat == "sum":
+            values = rows[measure].astype(float).fillna(0.0)
+        elif stat == "mean":
+            rows = rows[rows[measure].notna()]
+            values = rows[measure].astype(float)
+        else:
+            raise ValueError(f"Statistic {stat!r} is not available in approximate mode")
+
+        groups = [rows[key] for key in keys]
+        weights = rows["_weight"]
+        if stat == "mean":
+            # Ratio estimator; its linearised residuals carry the variance
+            weight_total = weights.groupby(groups, observed=True).transform("sum")
+            ratio = (weights * values).groupby(groups, observed=True).transform("sum") / weight_total
+            estimate = (weights * values).groupby(groups, observed=True).sum()
+            estimate = estimate / weights.groupby(groups, observed=True).sum()
+            residuals = (values - ratio) / weight_total
+        else:
+            estimate = (weights * values).groupby(groups, observed=True).sum()
+            residuals = values
+        return estimate, Z * np.sqrt(self._variance(rows, keys, residuals))
+
+    def _variance(self, rows, keys, residuals):
+        # Sum over strata of N_h^2 (1 - n_h/N_h) s_h^2 / n_h, where s_h^2 is taken over all n_h
+        # sampled rows of the stratum (rows outside the group count as zeros)
+        frame = rows[keys + ["_stratum"]].assign(u=residuals, u2=residuals * residuals)
+        per_stratum = frame.groupby(keys + ["_stratum"], observed=True)[["u", "u2"]].sum()
+        strata = per_stratum.index.get_level_values("_stratum")
+        size = self.stratum_sizes[strata].astype(float)
+        sample = self.stratum_samples[strata].astype(float)
+        spread = (per_stratum["u2"] - per_stratum["u"] ** 2 / sample) / np.maximum(sample - 1, 1)
+        contribution = size * size * (1 - sample / size) / sample * spread
+        return contribution.groupby(level=keys, observed=True).sum()
+
+    def _scalar_with_error(self, state, measure, stat):
+        estimate, error = self.estimate(state, [], measure, stat)
+        if estimate.empty:
+            return (np.nan, np.nan) if stat == "mean" else (0.0, 0.0)
+        return float(estimate.iloc[0]), float(error.iloc[0])
+
+    def mean_with_error(self, state, measure):
+        return self._scalar_with_error(state, measure, "mean")
+
+    def sum_with_error(self, state, measure):
+        return self._scalar_with_error(state, measure, "sum")
+
+    def count_with_error(self, state, measure=None):
+        return self._scalar_with_error(state, measure, "rows" if measure is None else "count")
+
+    def pivot_with_error(self, state, rows, columns=None, measure=None, stat="rows"):
+        rows, columns = as_list(rows), as_list(columns)
+        estimate, error = self.estimate(state, rows + columns, measure, stat)
+        return shape_pivot(estimate, stat, measure, columns), shape_pivot(error, stat, measure, columns)
+
+    def mean(self, state, measure):
+        return self.mean_with_error(state, measure)[0]
+
+    def sum(self, state, measure):
+        return self.sum_with_error(state, measure)[0]
+
+    def count(self, state, measure=None):
+        return self.count_with_error(state, measure)[0]
+
+    def pivot(self, state, rows, columns=None, measure=None, stat="rows"):
+        return self.pivot_with_error(state, rows, columns, measure, stat)[0]
+
+    # Section 4, 5 and 7 frames, shaped like parallel_aggregate.DatasetAggregates returns them
+
+    def age_group_time(self):
+        estimate, _ = self.estimate(FilterState(), ["_age_group"], 'Total Time Spent', "mean")
+        return pd.DataFrame({
+            'Age Group': pd.Categorical(AGE_LABELS, categories=AGE_LABELS),
+            'Total Time Spent': estimate.reindex(AGE_LABELS).to_numpy(),
+        })
+
+    def trend(self, state, granularity="month", start=None, end=None, rows=None):
+        # Same frame as rollup_store.RollupStore.trend, estimated (the sample never needs `rows`)
+        estimate, _ = self.estimate(state, [f"_{granularity}"], 'Total Time Spent', "sum", start, end)
+        return estimate.rename('Total Time Spent').rename_axis(granularity.title()).reset_index()
+
+    def date_bounds(self):
+        days = self.rows["_day"].dropna()
+        if days.empty:
+            return None
+        return days.min(), days.max()
+
+    def platform_totals(self):
+        estimate, _ = self.estimate(FilterState(), ["Platform"], 'Total Time Spent', "sum")
+        return estimate.round().rename('Total Time Spent').rename_axis('Platform').reset_index()
+
+    def hour_box_stats(self, max_outliers=MAX_OUTLIERS_PER_GROUP, whis=1.5, seed=0):
+        # Section 6 from weighted sample quantiles. cilo/cihi bound the median (Woodruff
+        # interval on the effective sample size) and are drawn as box notches.
+        rng = np.random.default_rng(seed)
+        records = {}
+        for hour, part in self.rows.groupby(self.rows["Hour"].astype(int)):
+            order = np.argsort(part['Total Time Spent'].to_numpy(), kind="stable")
+            values = part['Total Time Spent'].to_numpy()[order]
+            weights = part["_weight"].to_numpy()[order]
+            cumulative = np.cumsum(weights) - weights / 2
+            total = weights.sum()
+
+            def quantile(p):
+                return float(np.interp(p * total, cumulative, values))
+
+            q1, med, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+            effective = total * total / (weights * weights).sum()
+            spread = Z * np.sqrt(0.25 / effective)
+            low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+            inside = values[(values >= low) & (values <= high)]
+            outliers = values[(values < low) | (values > high)]
+            if len(outliers) > max_outliers:
+                outliers = rng.choice(outliers, size=max_outliers, replace=False)
+            records[hour] = {
+                "q1": q1, "med": med, "q3": q3,
+                "min": values.min(), "max": values.max(), "count": int(round(total)),
+                "whislo": inside.min() if len(inside) else q1,
+                "whishi": inside.max() if len(inside) else q3,
+                "fliers": outliers,
+                "cilo": quantile(max(0.0, 0.5 - spread)), "cihi": quantile(min(1.0, 0.5 + spread)),
+            }
+        return pd.DataFrame.from_dict(records, orient="index").sort_index()
+
+
+def approximate_by_default(df):
+    setting = os.environ.get(APPROXIMATE_ENV)
+    if setting in ("0", "1"):
+        return setting == "1"
+    return len(df) >= APPROXIMATE_MIN_ROWS
+
+
+def get_sample(df):
+    return derived(df, "stratified_sample", StratifiedSample.build)
+
+
+def with_error(query, method, *args, **kwargs):
+    # (value, half-width) from backends that estimate, (value, None) from exact ones
+    estimate = getattr(query, f"{method}_with_error", None)
+    if estimate is None:
+        return getattr(query, method)(*args, **kwargs), None
+    return estimate(*args, **kwargs)
+
+
+# Exact structures are built one at a time off the script thread
+_refiner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="insights-refine")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def exact_or_none(df, name, build, extend=None):
+    # The exact derived structure if it is ready; otherwise schedules derived(df, name, build)
+    # in the background (once) and returns None so the caller can fall back to the sample
+    value = peek_derived(df, name)
+    if value is not None:
+        return value
+    fingerprint = dataset_fingerprint(df)
+    if fingerprint is None:
+        return derived(df, name, build, extend)
+    key = (fingerprint, name)
+    with _pending_lock:
+        if key not in _pending:
+            future = _refiner.submit(derived, df, name, build, extend)
+            _pending[key] = future
+            future.add_done_callback(lambda _, key=key: _forget(key))
+    return None
+
+
+def _forget(key):
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+def refining():
+    # True while any exact structure is still being built
+    with _pending_lock:
+        return bool(_pending)
@@ -0,0 +1,248 @@
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import plotly.offline
+
+import charts
+from aggregations import hour_box_stats
+from data_loader import DATA_PATH, dataset_fingerprint, derived, load_dataset
+from filter_index import FILTER_COLUMNS, get_filter_index
+from parallel_aggregate import get_aggregates, process_context, worker_count
+from render_cache import cache_key, figure_png
+
+# Static reports for a list of filter presets, without the Streamlit UI. Aggregates are
+# computed once per preset from the shared cube and rollups; charts that do not depend on
+# the preset (sections 4 and 6) or that several presets share are rendered once. Rendering,
+# the slow part, runs in a process pool.
+#
+#   python batch_reports.py --per Location --per Platform --output reports
+#   python batch_reports.py --presets presets.json --output reports
+#
+# A presets file is a JSON list of {"name": ..., "filters": {column: [values]}, "age_range": [low, high]}
+# (filters and age_range optional).
+
+# Section -> (title, chart function in charts, output format), in dashboard order
+SECTIONS = {
+    "connection_type": ("Connection Type Usage by Profession", "connection_type_chart", "png"),
+    "addiction_by_age": ("Average Addiction Level by Age Group", "addiction_by_age_chart", "png"),
+    "self_control": ("Self-Control Across Genders and Platforms", "self_control_chart", "png"),
+    "age_group_time": ("Time Spent by Age Group", "age_group_time_chart", "html"),
+    "monthly_trends": ("Monthly Trends in Social Media Engagement", "monthly_trends_chart", "png"),
+    "hour_boxplot": ("Distribution of Time Spent per Hour", "hour_boxplot_chart", "png"),
+    "platform_share": ("Share of Time Spent per Platform", "platform_share_chart", "html"),
+    "gender_location_heatmap": ("Time Spent on Social Media by Gender and Location", "gender_location_heatmap", "png"),
+}
+
+# Written once at the top of the output directory, so reports work offline
+PLOTLY_JS = "plotly.min.js"
+
+
+class Preset:
+    def __init__(self, name, filters=None, age_range=None):
+        self.name = name
+        self.filters = filters or {}
+        self.age_range = tuple(age_range) if age_range is not None else None
+
+    def slug(self):
+        return re.sub(r"[^A-Za-z0-9_.=-]+", "-", self.name).strip("-") or "report"
+
+
+def presets_per_value(index, column):
+    # One preset per distinct value of a sidebar filter column
+    return [Preset(f"{column}={value}", {column: [value]}) for value in index.options(column)]
+
+
+def read_presets(path):
+    with open(path, encoding="utf-8") as handle:
+        return [Preset(**entry) for entry in json.load(handle)]
+
+
+def preset_sections(aggregates, state, df, granularity="month"):
+    # section -> (cache key inputs, chart data) for one preset; None data means "no rows"
+    cube, rollups = aggregates.cube, aggregates.rollups
+    sections = {
+        "connection_type": cube.pivot(state, 'Profession', 'ConnectionType'),
+        "addiction_by_age": cube.pivot(state, 'Age', measure='Addiction Level', stat='mean'),
+        "self_control": cube.pivot(state, 'Gender', 'Platform', measure='Self Control', stat='count'),
+        "monthly_trends": rollups.trend(state, granularity, rows=df),
+        "gender_location_heatmap": cube.pivot(state, 'Gender', 'Location', measure='Total Time Spent', stat='mean'),
+    }
+    inputs = {section: (state, granularity) if section == "monthly_trends" else (state,) for section in sections}
+
+    # Section 7 shows the preset's platforms (all of them without a platform filter)
+    platforms = aggregates.platform_totals()
+    chosen = state.values('Platform')
+    if chosen is not None:
+        platforms = platforms[platforms['Platform'].isin(chosen)]
+    sections["platform_share"] = platforms
+    inputs["platform_share"] = (tuple(sorted(map(str, platforms['Platform']))),)
+    return {section: (inputs[section], None if data.empty else data) for section, data in sections.items()}
+
+
+def render_chart(job):
+    # Runs in a pool worker: chart data in, PNG bytes or an HTML fragment out
+    section, data = job
+    _, function, kind = SECTIONS[section]
+    fig = getattr(charts, function)(data)
+    if kind == "png":
+        return figure_png(fig)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def render_all(jobs, workers):
+    # key -> rendered chart, for a dict of key -> (section, data)
+    keys = list(jobs)
+    if workers <= 1 or len(keys) < 2:
+        return {key: render_chart(jobs[key]) for key in keys}
+    chunksize = max(1, len(keys) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context([__name__])) as pool:
+        return dict(zip(keys, pool.map(render_chart, [jobs[key] for key in keys], chunksize=chunksize)))
+
+
+def chart_file(key):
+    section, digest = key.split(":", 1)
+    return f"{section}-{digest[:16]}.{SECTIONS[section][2]}"
+
+
+def kpis(cube, state):
+    rows = cube.count(state)
+    return {
+        "Rows": f"{rows:,}",
+        "Average Engagement": f"{cube.mean(state, 'Engagement'):.2f}" if rows else "-",
+        "Total Time Spent": f"{cube.sum(state, 'Total Time Spent') / 3600:.2f} hours",
+        "Time Spent per Video": f"{cube.mean(state, 'Time Spent On Video'):.2f} seconds" if rows else "-",
+    }
+
+
+def report_page(preset, figures, rendered, metrics):
+    # One self-contained page per preset; PNGs are linked from the shared charts directory
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(preset.name)}</title>",
+        f"<script src='../{PLOTLY_JS}'></script>",
+        "<style>body{font-family:Arial,sans-serif;margin:2em}img{max-width:100%}"
+        ".kpi{display:inline-block;margin-right:2em}</style></head><body>",
+        f"<h1>{html.escape(preset.name)}</h1>",
+        "".join(f"<div class='kpi'><b>{html.escape(label)}</b><br>{html.escape(value)}</div>" for label, value in metrics.items()),
+    ]
+    for section, key in figures.items():
+        title, _, kind = SECTIONS[section]
+        parts.append(f"<h2>{html.escape(title)}</h2>")
+        if key is None:
+            parts.append("<p>No data available for this preset.</p>")
+        elif kind == "png":
+            parts.append(f"<img src='../charts/{chart_file(key)}' alt='{html.escape(title)}'>")
+        else:
+            parts.append(rendered[key])
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def index_page(entries):
+    rows = "".join(
+        f"<li><a href='{html.escape(slug)}/index.html'>{html.escape(name)}</a> ({html.escape(count)} rows)</li>"
+        for name, slug, count in entries
+    )
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Reports</title></head><body><ul>{rows}</ul></body></html>"
+
+
+def generate_reports(presets, output, path=DATA_PATH, workers=None, granularity="month"):
+    # Writes output/<preset>/index.html for every preset plus the charts they share; returns a summary
+    started = time.perf_counter()
+    workers = worker_count() if workers is None else workers
+    df = load_dataset(path)
+    index = get_filter_index(df)
+    data_version = dataset_fingerprint(df)
+    aggregates = get_aggregates(df)
+    hour_stats = derived(df, "hour_box_stats", hour_box_stats)
+
+    # Preset-independent sections
+    shared = {
+        "age_group_time": ((), aggregates.age_group_time()),
+        "hour_boxplot": ((), hour_stats),
+    }
+
+    jobs = {}
+    pages = []
+    for preset in presets:
+        state = index.state(preset.filters, preset.age_range)
+        sections = dict(shared)
+        sections.update(preset_sections(aggregates, state, df, granularity))
+        figures = {}
+        for section in SECTIONS:
+            inputs, data = sections[section]
+            if data is None:
+                figures[section] = None
+                continue
+            key = cache_key(section, data_version, *inputs)
+            # Presets resolving to the same state (or sections that ignore it) share one render
+            jobs.setdefault(key, (section, data))
+            figures[section] = key
+        pages.append((preset, figures, kpis(aggregates.cube, state)))
+    aggregated = time.perf_counter()
+
+    rendered = render_all(jobs, workers)
+
+    os.makedirs(os.path.join(output, "charts"), exist_ok=True)
+    with open(os.path.join(output, PLOTLY_JS), "w", encoding="utf-8") as handle:
+        handle.write(plotly.offline.get_plotlyjs())
+    for key, chart in rendered.items():
+        mode, encoding = ("wb", None) if isinstance(chart, bytes) else ("w", "utf-8")
+        with open(os.path.join(output, "charts", chart_file(key)), mode, encoding=encoding) as handle:
+            handle.write(chart)
+    entries = []
+    for preset, figures, metrics in pages:
+        directory = os.path.join(output, preset.slug())
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as handle:
+            handle.write(report_page(preset, figures, rendered, metrics))
+        entries.append((preset.name, preset.slug(), metrics["Rows"]))
+    with open(os.path.join(output, "index.html"), "w", encoding="utf-8") as handle:
+        handle.write(index_page(entries))
+
+    return {
+        "presets": len(presets),
+        "charts_rendered": len(rendered),
+        "charts_referenced": sum(key is not None for _, figures, _ in pages for key in figures.values()),
+        "workers": workers,
+        "aggregate_seconds": aggregated - started,
+        "total_seconds": time.perf_counter() - started,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write static dashboard reports for a list of filter presets.")
+    parser.add_argument("--data", default=DATA_PATH, help="export to report on")
+    parser.add_argument("--presets", help="JSON file with a list of presets")
+    parser.add_argument("--per", action="append", default=[], choices=FILTER_COLUMNS,
+                        help="add one preset per value of this filter column (repeatable)")
+    parser.add_argument("--all", action="store_true", help="add an unfiltered preset")
+    parser.add_argument("--granularity", default="month", choices=["day", "week", "month"])
+    parser.add_argument("--workers", type=int, help="render processes (default: INSIGHTS_WORKERS or the core count)")
+    parser.add_argument("--output", default="reports")
+    args = parser.parse_args(argv)
+
+    presets = read_presets(args.presets) if args.presets else []
+    if args.per:
+        index = get_filter_index(load_dataset(args.data))
+        for column in args.per:
+            presets.extend(presets_per_value(index, column))
+    if args.all or not presets:
+        presets.insert(0, Preset("All"))
+
+    summary = generate_reports(presets, args.output, args.data, args.workers, args.granularity)
+    sys.stdout.write(json.dumps(summary) + "\n")
+
+
+if __name__ == "__main__":
+    main()
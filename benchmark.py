@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import pandas as pd
+
+import charts
+import client_charts
+import data_loader
+import shared_dataset
+from Preprocessor import clean_data, create_additional_columns, preprocessor_data
+from aggregations import hour_box_stats
+from filter_index import FILTER_COLUMNS, FilterIndex
+from olap_cube import Cube
+from parallel_aggregate import DatasetAggregates, worker_count
+from query_backend import DASHBOARD_QUERIES, ArrowBackend, PandasBackend
+from client_charts import bounded_json
+from render_cache import figure_png, plotly_json
+from synthetic_data import write_csv
+
+# Headless timings of every stage main1.py goes through, on synthetic exports of growing
+# size. Each record is one JSON line so runs can be diffed or loaded into a DataFrame.
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def measure(stage, func, repeat):
+    # Peak traced allocation comes from the first call; timings from all calls
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    timings = [time.perf_counter() - start]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    record = {
+        "stage": stage,
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_bytes": peak,
+        "repeat": repeat,
+    }
+    return result, record
+
+
+def sample_filter_state(index):
+    # A realistic narrowing: half of every categorical filter and the middle of the age range
+    selections = {column: index.options(column)[::2] for column in FILTER_COLUMNS}
+    low, high = index.age_bounds()
+    span = high - low
+    return index.state(selections, (low + span // 4, high - span // 4))
+
+
+def trend_range(aggregates):
+    # The middle half of the dataset's dates, as a date range picked in section 5
+    bounds = aggregates.date_bounds()
+    if bounds is None:
+        return None, None
+    first, last = bounds
+    return first + (last - first) / 4, last - (last - first) / 4
+
+
+def run_size(rows, repeat, workdir, render=True):
+    csv_path = os.path.join(workdir, f"synthetic_{rows}.csv")
+    write_csv(csv_path, rows)
+    records = []
+
+    def step(stage, func, times=repeat):
+        result, record = measure(stage, func, times)
+        record["rows"] = rows
+        records.append(record)
+        return result
+
+    raw = step("load.read_csv", lambda: pd.read_csv(csv_path))
+    cleaned = step("load.clean_data", lambda: clean_data(raw.copy()))
+    step("load.create_additional_columns", lambda: create_additional_columns(cleaned.copy()))
+    step("load.preprocessor_data", lambda: preprocessor_data(csv_path), 1)
+
+    data_loader.SNAPSHOT_DIR = os.path.join(workdir, "snapshots")
+    shared_dataset.SHARED_DIR = os.path.join(workdir, "shared")
+    data_loader.clear_cache()
+    step("load.snapshot_cold", lambda: data_loader.load_dataset(csv_path), 1)
+    fingerprint = data_loader.file_fingerprint(csv_path)
+    step("load.snapshot_warm", lambda: pd.read_parquet(data_loader.snapshot_path(csv_path, fingerprint)))
+    # What a warm start does now: map the copy published by the cold load
+    df = step("load.shared_attach", lambda: (data_loader.clear_cache(), data_loader.load_dataset(csv_path))[1])
+
+    index = step("filter.index_build", lambda: FilterIndex(df), 1)
+    state = sample_filter_state(index)
+    step("filter.apply_pandas", lambda: PandasBackend(df).filtered(state))
+    rows_set = step("filter.apply_index", lambda: index.resolve(state))
+    step("filter.take", lambda: rows_set.take(df))
+
+    step("aggregate.cube_build", lambda: Cube.build(df), 1)
+    # Cube cells plus the section 4/5/7 sums, as partition partials over the process pool;
+    # the queries below go through it like main1.py's do
+    aggregates = step("aggregate.map_reduce", lambda: DatasetAggregates.build(df), 1)
+    # The same aggregates in one process, to find the row count where the pool starts paying off
+    step("aggregate.in_process", lambda: DatasetAggregates.build(df, workers=1), 1)
+    cube = aggregates.cube
+    step("aggregate.kpis", lambda: (
+        cube.mean(state, 'Engagement'), cube.sum(state, 'Total Time Spent'), cube.mean(state, 'Time Spent On Video')
+    ))
+    section1 = step("aggregate.section1", lambda: cube.pivot(state, 'Profession', 'ConnectionType'))
+    section2 = step("aggregate.section2", lambda: cube.pivot(state, 'Age', measure='Addiction Level', stat='mean'))
+    section3 = step("aggregate.section3", lambda: cube.pivot(state, 'Gender', 'Platform', measure='Self Control', stat='count'))
+    section4 = step("aggregate.section4", lambda: aggregates.age_group_time())
+    section5 = step("aggregate.section5", lambda: aggregates.trend(state, "month", rows=df))
+    step("aggregate.section5_ranged", lambda: aggregates.trend(state, "month", *trend_range(aggregates), df))
+    section6 = step("aggregate.section6", lambda: hour_box_stats(df))
+    section7 = step("aggregate.section7", lambda: aggregates.platform_totals())
+    section8 = step("aggregate.section8", lambda: cube.pivot(state, 'Gender', 'Location', measure='Total Time Spent', stat='mean'))
+
+    # The same KPI and section queries through the row-level backends
+    pandas_backend = PandasBackend(df)
+    arrow_backend = step("query.arrow.build", lambda: ArrowBackend.from_frame(df), 1)
+    step("query.arrow.filter", lambda: arrow_backend.table.filter(arrow_backend.mask(state)))
+    for name, backend in (("pandas", pandas_backend), ("arrow", arrow_backend)):
+        for query, (method, args, kwargs) in DASHBOARD_QUERIES.items():
+            call = getattr(backend, method)
+            step(f"query.{name}.{query}", lambda call=call, args=args, kwargs=kwargs: call(state, *args, **kwargs))
+
+    if render:
+        # Server-side PNGs (batch reports) and the Plotly specs main1.py sends; payload_bytes
+        # is what one chart costs on the wire
+        renders = {
+            "render.section1": lambda: figure_png(charts.connection_type_chart(section1)),
+            "render.section2": lambda: figure_png(charts.addiction_by_age_chart(section2)),
+            "render.section3": lambda: figure_png(charts.self_control_chart(section3)),
+            "render.section4": lambda: plotly_json(charts.age_group_time_chart(section4)),
+            "render.section5": lambda: figure_png(charts.monthly_trends_chart(section5)),
+            "render.section6": lambda: figure_png(charts.hour_boxplot_chart(section6)),
+            "render.section7": lambda: plotly_json(charts.platform_share_chart(section7)),
+            "render.section8": lambda: figure_png(charts.gender_location_heatmap(section8)),
+            "render.client.section1": lambda: bounded_json(client_charts.connection_type_chart(section1)),
+            "render.client.section2": lambda: bounded_json(client_charts.addiction_by_age_chart(section2)),
+            "render.client.section3": lambda: bounded_json(client_charts.self_control_chart(section3)),
+            "render.client.section5": lambda: bounded_json(client_charts.monthly_trends_chart(section5)),
+            "render.client.section6": lambda: bounded_json(client_charts.hour_boxplot_chart(section6)),
+            "render.client.section8": lambda: bounded_json(client_charts.gender_location_heatmap(section8)),
+        }
+        for stage, render_chart in renders.items():
+            payload = step(stage, render_chart)
+            records[-1]["payload_bytes"] = len(payload) if isinstance(payload, bytes) else len(payload.encode("utf-8"))
+
+    data_loader.clear_cache()
+    os.remove(csv_path)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every dashboard stage on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-render", action="store_true", help="skip figure rendering")
+    parser.add_argument("--output", help="JSON lines file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    environment = {
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "workers": worker_count(),
+    }
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for rows in args.rows:
+                for record in run_size(rows, args.repeat, workdir, render=not args.no_render):
+                    record.update(environment)
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import pandas as pd
+
+# Figure builders for the dashboard sections. Each one takes the already-aggregated data
+# for its section and returns a figure, so figures can be rendered (and cached) outside
+# of the Streamlit script.
+#
+# matplotlib, seaborn and plotly.express are imported by the builders that use them (about
+# a second together), so importing this module is free and the dashboard, which only draws
+# sections 4 and 7 from here, never loads matplotlib.
+
+
+####1
+def connection_type_chart(connection_counts):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Palette is scoped to this figure instead of being set globally
+    with sns.color_palette("viridis", len(connection_counts.columns)):
+        # Create a Matplotlib figure with a modern style
+        fig, ax = plt.subplots(figsize=(12, 7))
+
+        # Create the bar plot
+        connection_counts.plot(kind='bar', stacked=False, ax=ax)
+    ax.set_xlabel('Profession', color='#333', fontsize=16, weight='bold')
+    ax.set_ylabel('Count', color='#333', fontsize=16, weight='bold')
+    ax.set_title('Connection Type Usage by Profession', fontsize=20, color='#2C3E50', weight='bold', pad=20)
+
+    # Adjust legend placement and style
+    ax.legend(title='Connection Type', title_fontsize=14, loc='upper right', fontsize=12)
+
+    # Add a grid for better readability
+    ax.grid(axis='y', linestyle='--', linewidth=0.6, alpha=0.7)
+    return fig
+
+
+####2
+def addiction_by_age_chart(grouped_data, errors=None):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))  # Set figure size for better readability
+    # Line chart with customization
+    ax.step(grouped_data.index, grouped_data.values, marker='o', linestyle='--', color="olive", linewidth=2)
+    if errors is not None:
+        # Approximate mode: shaded 95% band around the estimated averages
+        low, high = grouped_data - errors, grouped_data + errors
+        ax.fill_between(grouped_data.index, low.values, high.values, step='pre', color="olive", alpha=0.2)
+
+    # Annotate each data point with its value
+    for i, (x, y) in enumerate(zip(grouped_data.index, grouped_data.values)):
+        ax.text(x, y, f'{y:.2f}', fontsize=10, color='#FF1493', ha='center', va='bottom')  # Adjust fontsize and position
+
+    # Add axis labels and title
+    ax.set_xlabel('Age Group', fontsize=14, color='#FF1493')
+    ax.set_ylabel('Average Addiction Level', fontsize=14, color='#FF1493')
+    ax.set_title('Average Addiction Level by Age Group', fontsize=20, color='#C71585')
+
+    # Add gridlines for better readability
+    ax.grid(True, linestyle='--', linewidth=0.5,color='#FF1493')
+    return fig
+
+
+####3
+def self_control_chart(grouped_data):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Create the bar plot
+    grouped_data.plot(
+        kind='bar',
+        stacked=True,
+        colormap='viridis',
+        figsize=(12, 6),
+        edgecolor='black',  # Adding borders for better clarity
+        ax=ax
+    )
+
+    # Customizing the chart
+    ax.set_title('Self Control Across Genders on Different Platforms', fontsize=20, pad=20, color='#006400')
+    ax.set_xlabel('Gender', fontsize=16, labelpad=10)
+    ax.set_ylabel('Self Control', fontsize=16, labelpad=10)
+    ax.legend(title='Platform', fontsize=12, loc='upper right')  # Adjust legend position
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=0, fontsize=14)
+
+    # Adding gridlines for better readability
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    return fig
+
+
+####4
+def age_group_time_chart(average_time_spent):
+    import plotly.express as px
+
+    fig = px.bar(
+        average_time_spent,
+        x='Age Group',
+        y='Total Time Spent',
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig.update_layout(
+        title="Average Time Spent by Age Group",
+        xaxis_title="Age Group",
+        yaxis_title="Total Time Spent (minutes)",
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+####5
+# Chart title per bucket column of the trend frame
+TREND_TITLES = {'Day': 'Daily', 'Week': 'Weekly', 'Month': 'Monthly'}
+
+# Points are marked and labelled only up to this many buckets; beyond that the line alone reads better
+MAX_ANNOTATED_POINTS = 36
+
+def monthly_trends_chart(monthly_trends):
+    import matplotlib.pyplot as plt
+
+    # Works for any bucket size: the first column holds the bucket start ('Month', 'Week' or 'Day')
+    period = monthly_trends.columns[0]
+    annotate = len(monthly_trends) <= MAX_ANNOTATED_POINTS
+
+    # Create the Matplotlib plot
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    # Set a custom background color
+    ax.set_facecolor('#f0f8ff')  # Light blue background
+
+    # Draw the line plot with sharp transitions
+    ax.plot(
+        monthly_trends[period],
+        monthly_trends['Total Time Spent'],
+        marker='o' if annotate else None,
+        linestyle='-',
+        color='blue',
+        linewidth=2.5,
+        markersize=8,
+        label='Total Time Spent'
+    )
+
+    # Add a title and subtitle
+    ax.set_title(f"{TREND_TITLES.get(period, period)} Trends in Social Media Engagement", fontsize=20, fontweight='bold', color='darkblue')
+    ax.set_xlabel(period, fontsize=16, fontweight='bold', color='purple', labelpad=15)
+    ax.set_ylabel('Total Time Spent (minutes)', fontsize=16, fontweight='bold', color='teal', labelpad=15)
+
+    # Customize ticks
+    plt.xticks(rotation=45, fontsize=12)
+    plt.yticks(fontsize=12)
+
+    # Add prominent grid lines
+    ax.grid(color='gray', linestyle='-', linewidth=0.7, alpha=0.7)
+
+    # Annotate each point with its value
+    if annotate:
+        for i, row in monthly_trends.iterrows():
+            ax.text(
+                row[period],
+                row['Total Time Spent'] + 50,  # Position text slightly above
+                f"{row['Total Time Spent']}",
+                ha='center',
+                va='bottom',
+                fontsize=9,
+                color='black',
+                bbox=dict(facecolor='white', alpha=0.8, edgecolor='none', boxstyle='round,pad=0.3')
+            )
+
+    # Add a legend
+    ax.legend(loc='upper right', fontsize=12)
+
+    # Spread the plot slightly equally from both sides
+    if not monthly_trends.empty:
+        plt.xlim([monthly_trends[period].min() - pd.DateOffset(days=10), monthly_trends[period].max() + pd.DateOffset(days=10)])
+    return fig
+
+
+####6
+def hour_boxplot_chart(hour_stats):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Drawn from precomputed per-hour statistics (aggregations.hour_box_stats), so the
+    # figure only holds one box per hour plus a capped sample of outliers
+    boxes = [
+        {
+            "label": str(hour),
+            "q1": row["q1"], "med": row["med"], "q3": row["q3"],
+            "whislo": row["whislo"], "whishi": row["whishi"],
+            "fliers": row["fliers"],
+            # Approximate stats carry a confidence interval for the median, drawn as notches
+            **({"cilo": row["cilo"], "cihi": row["cihi"]} if "cilo" in hour_stats.columns else {}),
+        }
+        for hour, row in hour_stats.iterrows()
+    ]
+    colors = sns.color_palette("coolwarm", len(boxes))  # Attractive color palette
+
+    # Seaborn style with a soft background color, scoped to this figure
+    with sns.axes_style("whitegrid", rc={"axes.facecolor": "#e6f2ff"}):  # Light blue background for the plot area
+        # Create a box plot
+        fig = plt.figure(figsize=(18, 12))  # Increased figure size for more space
+        box_plot = fig.add_subplot()
+        artists = box_plot.bxp(
+            boxes,
+            positions=list(hour_stats.index),
+            widths=0.8,  # Wider boxes to give a more spaced-out look
+            patch_artist=True,
+            manage_ticks=False,
+            shownotches="cilo" in hour_stats.columns,
+            boxprops=dict(linewidth=2, edgecolor='#3f3f3f'),  # Thicker lines for better visibility
+            whiskerprops=dict(linewidth=2, color='#3f3f3f'),
+            capprops=dict(linewidth=2, color='#3f3f3f'),
+            medianprops=dict(linewidth=2, color='#3f3f3f'),
+            flierprops=dict(marker='d', markersize=6, markerfacecolor='#3f3f3f', markeredgecolor='#3f3f3f'),  # Larger outliers for better visibility
+        )
+        for patch, color in zip(artists['boxes'], colors):
+            patch.set_facecolor(color)
+        box_plot.grid(axis='x', visible=False)
+
+    # Modify the title with matching colors and design
+    plt.title('Distribution of Time Spent on Social Media by Hour of the Day',
+              fontsize=30, fontweight='bold',
+              color='darkblue', backgroundcolor='lightyellow',
+              pad=25, style='italic', loc='center')
+
+    # Customize the axis labels with vibrant colors and light yellow background
+    xlabel = plt.xlabel('Hour of the Day', fontsize=20, fontweight='bold', color='darkgreen', labelpad=20, style='italic')
+    ylabel = plt.ylabel('Total Time Spent (minutes)', fontsize=20, fontweight='bold', color='darkgreen', labelpad=20, style='italic')
+
+    # Set the background color for the x and y axis labels
+    xlabel.set_bbox(dict(facecolor='lightyellow', edgecolor='none', alpha=0.7))
+    ylabel.set_bbox(dict(facecolor='lightyellow', edgecolor='none', alpha=0.7))
+
+    # Add text labels for each box (median values with "Median" label)
+    for hour, median in hour_stats['med'].items():
+        if pd.notna(median):
+            # Adding "Median: " before the value
+            box_plot.text(hour, median + 5, f'Median: {median:.1f}',
+                          horizontalalignment='center', size=12, color='black', weight='semibold',
+                          bbox=dict(facecolor='white', edgecolor='gray', boxstyle='round,pad=0.3'))
+
+    # Set x-axis ticks from 0 to 10
+    plt.xticks(range(11), fontsize=14, color='slategray', fontweight='bold')
+
+    # Increase y-axis limits to show a larger range of 'Total Time Spent'
+    plt.xlim(-0.5, 10.5)
+    plt.ylim(0, hour_stats['max'].max() + 100)  # Increase y-axis range to show more spread
+
+    # Style the ticks and grid
+    plt.yticks(fontsize=14, color='slategray', fontweight='bold')
+    plt.grid(axis='y', linestyle='--', alpha=0.5)
+
+    # Remove top and right spines for a cleaner look
+    plt.gca().spines['top'].set_visible(False)
+    plt.gca().spines['right'].set_visible(False)
+
+    plt.tight_layout()
+    return fig
+
+
+####7
+def platform_share_chart(filtered_platform_data):
+    import plotly.express as px
+
+    # Create a pie chart with Plotly Express for the selected platforms
+    fig = px.pie(filtered_platform_data, values='Total Time Spent', names='Platform',
+                 title='Time Spent Distribution Across Selected Platforms',  # Dynamic title
+                 color_discrete_sequence=px.colors.qualitative.Set3,  # Color palette
+                 hover_name='Platform', hover_data=['Total Time Spent'])
+
+    # Update the layout of the pie chart
+    fig.update_layout(
+        width=800, height=600, font_size=14,
+        title=dict(
+            text='<b><span style="color:##FC8D62;"></span></b><br>'
+                 '<span style="font-style:italic;font-size:18px; color:#888888;">(Based on Total Time Spent)</span>',
+            font=dict(family='Arial Black', size=26),
+            x=0.5, y=0.97, xanchor='center', yanchor='top'
+        )
+    )
+    fig.update_traces(marker=dict(line=dict(width=3, color='white')),
+                      textinfo='label+percent', textposition='inside', textfont_size=16)
+    return fig
+
+
+####8
+def gender_location_heatmap(demographic_time, errors=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    annot = True
+    if errors is not None:
+        # Approximate mode: each cell shows its estimate and 95% half-width
+        annot = demographic_time.map(lambda v: f"{v:.1f}") + "\n±" + errors.reindex_like(demographic_time).map(lambda v: f"{v:.1f}")
+    sns.heatmap(
+        demographic_time,
+        ax=ax,
+        annot=annot,
+        fmt=".1f" if errors is None else "",
+        cmap="viridis",
+        cbar_kws={'label': 'Avg Time Spent (mins)'}
+    )
+    ax.set_title("Time Spent on Social Media by Gender and Location", fontsize=16)
+    ax.set_ylabel("Gender", fontsize=12)
+    ax.set_xlabel("Location", fontsize=12)
+    return fig
@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
+
+# Plotly versions of the matplotlib sections in charts.py (1, 2, 3, 5, 6 and 8). They take
+# the same aggregated frames, but the figure is drawn in the browser: the server only
+# serialises the aggregated series, instead of rasterising a PNG on every cache miss.
+
+# Largest chart spec sent to the browser; bigger figures are downsampled until they fit
+PAYLOAD_BUDGET_BYTES = 256 * 1024
+
+# Traces are never thinned below this many points
+MIN_POINTS = 32
+
+# Decimals kept in the serialised values (the charts show at most two)
+DECIMALS = 3
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+def _colors(count, scale="Viridis"):
+    return sample_colorscale(scale, [i / max(count - 1, 1) for i in range(count)])
+
+
+def _values(series):
+    return np.round(np.asarray(series, dtype=float), DECIMALS)
+
+
+####1
+def connection_type_chart(connection_counts):
+    fig = go.Figure([
+        go.Bar(name=str(column), x=[str(v) for v in connection_counts.index], y=connection_counts[column].tolist(), marker_color=color)
+        for column, color in zip(connection_counts.columns, _colors(len(connection_counts.columns)))
+    ])
+    fig.update_layout(
+        barmode='group',
+        title='Connection Type Usage by Profession',
+        xaxis_title='Profession', yaxis_title='Count', legend_title='Connection Type',
+    )
+    return fig
+
+
+####2
+def addiction_by_age_chart(grouped_data, errors=None):
+    x = grouped_data.index.tolist()
+    y = _values(grouped_data)
+    traces = []
+    if errors is not None:
+        # Approximate mode: shaded 95% band around the estimated averages
+        error = _values(errors.reindex(grouped_data.index))
+        traces.append(go.Scatter(x=x, y=y + error, mode='lines', line=dict(width=0, shape='vh'), hoverinfo='skip', showlegend=False))
+        traces.append(go.Scatter(
+            x=x, y=y - error, mode='lines', line=dict(width=0, shape='vh'), fill='tonexty',
+            fillcolor='rgba(128,128,0,0.2)', hoverinfo='skip', showlegend=False,
+        ))
+    traces.append(go.Scatter(
+        x=x, y=y, mode='lines+markers+text', line=dict(shape='vh', dash='dash', color='olive', width=2),
+        text=[f'{v:.2f}' for v in y], textposition='top center', textfont=dict(color='#FF1493'),
+        name='Average Addiction Level',
+    ))
+    fig = go.Figure(traces)
+    fig.update_layout(
+        title='Average Addiction Level by Age Group', xaxis_title='Age Group',
+        yaxis_title='Average Addiction Level', showlegend=False,
+    )
+    return fig
+
+
+####3
+def self_control_chart(grouped_data):
+    fig = go.Figure([
+        go.Bar(name=str(column), x=[str(v) for v in grouped_data.index], y=grouped_data[column].tolist(),
+               marker=dict(color=color, line=dict(color='black', width=1)))
+        for column, color in zip(grouped_data.columns, _colors(len(grouped_data.columns)))
+    ])
+    fig.update_layout(
+        barmode='stack',
+        title='Self Control Across Genders on Different Platforms',
+        xaxis_title='Gender', yaxis_title='Self Control', legend_title='Platform',
+    )
+    return fig
+
+
+####5
+# Chart title per bucket column of the trend frame
+TREND_TITLES = {'Day': 'Daily', 'Week': 'Weekly', 'Month': 'Monthly'}
+
+def monthly_trends_chart(monthly_trends):
+    # Any bucket size: the first column holds the bucket start ('Month', 'Week' or 'Day')
+    period = monthly_trends.columns[0]
+    fig = go.Figure(go.Scatter(
+        x=monthly_trends[period].dt.strftime('%Y-%m-%d').tolist(), y=_values(monthly_trends['Total Time Spent']),
+        mode='lines+markers' if len(monthly_trends) <= 36 else 'lines',
+        line=dict(color='blue', width=2.5), name='Total Time Spent',
+    ))
+    fig.update_layout(
+        title=f"{TREND_TITLES.get(period, period)} Trends in Social Media Engagement",
+        xaxis_title=period, yaxis_title='Total Time Spent (minutes)',
+    )
+    return fig
+
+
+####6
+def hour_boxplot_chart(hour_stats):
+    # One precomputed box per hour (aggregations.hour_box_stats) plus its capped outliers;
+    # Plotly draws boxes from q1/median/q3/fences, so no raw rows are sent
+    hours = [int(hour) for hour in hour_stats.index]
+    box = dict(
+        x=hours, q1=_values(hour_stats['q1']), median=_values(hour_stats['med']), q3=_values(hour_stats['q3']),
+        lowerfence=_values(hour_stats['whislo']), upperfence=_values(hour_stats['whishi']),
+        name='Total Time Spent', marker_color='#3f3f3f', fillcolor='#9ecae1', boxpoints=False,
+    )
+    if 'cilo' in hour_stats.columns:
+        # Approximate stats carry a confidence interval for the median, drawn as notches
+        box['notched'] = True
+        box['notchspan'] = _values((hour_stats['cihi'] - hour_stats['cilo']) / 2)
+    outlier_x = [hour for hour, fliers in zip(hours, hour_stats['fliers']) for _ in range(len(fliers))]
+    outlier_y = np.concatenate([np.asarray(fliers, dtype=float) for fliers in hour_stats['fliers']] or [np.array([])])
+    fig = go.Figure([
+        go.Box(**box),
+        go.Scatter(x=outlier_x, y=np.round(outlier_y, DECIMALS), mode='markers',
+                   marker=dict(symbol='diamond', size=6, color='#3f3f3f'), name='Outliers'),
+    ])
+    fig.update_layout(
+        title='Distribution of Time Spent on Social Media by Hour of the Day',
+        xaxis_title='Hour of the Day', yaxis_title='Total Time Spent (minutes)', showlegend=False,
+        xaxis=dict(dtick=1),
+    )
+    return fig
+
+
+####8
+def gender_location_heatmap(demographic_time, errors=None):
+    values = demographic_time.to_numpy(dtype=float)
+    if errors is None:
+        text = np.vectorize(lambda v: '' if np.isnan(v) else f'{v:.1f}')(values)
+    else:
+        # Approximate mode: each cell shows its estimate and 95% half-width
+        spread = errors.reindex_like(demographic_time).to_numpy(dtype=float)
+        text = np.vectorize(lambda v, e: '' if np.isnan(v) else f'{v:.1f}<br>±{e:.1f}')(values, spread)
+    fig = go.Figure(go.Heatmap(
+        z=np.round(values, DECIMALS), x=[str(v) for v in demographic_time.columns], y=[str(v) for v in demographic_time.index],
+        text=text, texttemplate='%{text}', colorscale='Viridis', colorbar=dict(title='Avg Time Spent (mins)'),
+    ))
+    fig.update_layout(title='Time Spent on Social Media by Gender and Location', xaxis_title='Location', yaxis_title='Gender')
+    return fig
+
+
+def lttb(x, y, threshold):
+    # Positions of `threshold` points chosen by Largest-Triangle-Three-Buckets: the first
+    # and last points, plus from each bucket in between the point forming the largest
+    # triangle with the previous pick and the next bucket's average. Keeps peaks and dips.
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    picked = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following = slice(stop, edges[bucket + 2] if bucket + 2 < len(edges) else n)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        area = np.abs(
+            (x[picked] - next_x) * (y[start:stop] - y[picked]) - (x[picked] - x[start:stop]) * (next_y - y[picked])
+        )
+        picked = start + int(np.argmax(area))
+        keep[bucket + 1] = picked
+    return keep
+
+
+def _positions(x):
+    # Numeric x for LTTB: dates as nanoseconds, categories by position
+    values = pd.Series(x)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    dates = pd.to_datetime(values, errors='coerce')
+    if dates.notna().all():
+        return dates.astype('int64').to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+
+def _thin(fig):
+    # Halves the points of every scatter trace longer than MIN_POINTS; False if none is
+    thinned = False
+    for trace in fig.data:
+        if trace.type not in ('scatter', 'scattergl') or trace.y is None or len(trace.y) <= MIN_POINTS:
+            continue
+        target = max(MIN_POINTS, len(trace.y) // 2)
+        if 'lines' in (trace.mode or 'lines'):
+            keep = lttb(_positions(trace.x), trace.y, target)
+        else:
+            keep = np.linspace(0, len(trace.y) - 1, target).astype(np.int64)
+        updates = {'x': np.asarray(trace.x, dtype=object)[keep], 'y': np.asarray(trace.y)[keep]}
+        if trace.text is not None and not isinstance(trace.text, str):
+            updates['text'] = np.asarray(trace.text, dtype=object)[keep]
+        trace.update(updates)
+        thinned = True
+    return thinned
+
+
+def bounded_json(fig, budget=PAYLOAD_BUDGET_BYTES):
+    # Plotly JSON for fig, at most `budget` bytes: line traces are downsampled with LTTB and
+    # marker-only traces by even striding until the spec fits
+    payload = fig.to_json()
+    while len(payload.encode('utf-8')) > budget:
+        if not _thin(fig):
+            raise PayloadTooLarge(f"Chart spec is {len(payload.encode('utf-8'))} bytes after downsampling (budget {budget})")
+        payload = fig.to_json()
+    return payload
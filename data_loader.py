@@ -0,0 +1,275 @@
+import hashlib
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from Preprocessor import ColumnCache, apply_schema, pipeline_fingerprint, preprocessor_data
+from shared_dataset import attach_current, publish, publishing, release
+
+# Export the dashboard reads; INSIGHTS_DATA points it at another file (e.g. a synthetic export)
+DATA_PATH_ENV = "INSIGHTS_DATA"
+DATA_PATH = os.environ.get(DATA_PATH_ENV) or "cleaning dataset final.csv"
+
+# Parquet snapshots of the cleaned dataset live next to the app
+SNAPSHOT_DIR = ".snapshots"
+
+# Exports at least this big are cleaned chunk by chunk (streaming_ingest) instead of in one frame
+STREAMING_THRESHOLD_BYTES = 512 * 1024 * 1024
+
+# Bump this whenever clean_data or apply_schema change what they produce so old snapshots are
+# ignored; changes to the derived-column stages are picked up by pipeline_fingerprint()
+SNAPSHOT_VERSION = 2
+
+# Process-wide cache: source path -> (fingerprint, cleaned DataFrame)
+_datasets = {}
+# Structures built from a loaded dataset (indexes, cubes, ...): (fingerprint, name) -> object
+_derived = {}
+# name -> extend(value, new_rows) for derived structures that can absorb appended rows
+_extenders = {}
+# Paths kept current by an append tracker (live_ingest), which owns their freshness checks
+_followed = set()
+_lock = threading.RLock()
+# (fingerprint, name) -> lock held while that derived structure is built, so a slow build
+# (e.g. exact aggregates refining in the background) never blocks unrelated ones
+_building = {}
+
+
+def file_fingerprint(path):
+    # Size and modification time are enough to notice a changed export without reading it
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|v{SNAPSHOT_VERSION}|{pipeline_fingerprint()}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_path(path, fingerprint):
+    stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    return os.path.join(SNAPSHOT_DIR, f"{stem}-{fingerprint}.parquet")
+
+
+def _write_snapshot(df, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Write to a temporary file first so a concurrent reader never sees a half-written snapshot
+    tmp = f"{target}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def _remove_stale_snapshots(path, keep):
+    prefix = os.path.basename(snapshot_path(path, "")).rsplit("-", 1)[0] + "-"
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    for name in os.listdir(SNAPSHOT_DIR):
+        full = os.path.join(SNAPSHOT_DIR, name)
+        if name.startswith(prefix) and name.endswith(".parquet") and full != keep:
+            try:
+                if os.path.isdir(full):
+                    shutil.rmtree(full)
+                else:
+                    os.remove(full)
+            except OSError:
+                pass
+
+
+def _read_or_build(path, fingerprint):
+    target = snapshot_path(path, fingerprint)
+    if os.path.exists(target):
+        try:
+            if os.path.isdir(target):
+                from streaming_ingest import read_parts
+
+                return apply_schema(read_parts(target))
+            return apply_schema(pd.read_parquet(target))
+        except Exception:
+            # A corrupt snapshot is simply rebuilt from the CSV
+            pass
+
+    if os.path.getsize(path) >= STREAMING_THRESHOLD_BYTES:
+        # Cleaning happens in bounded chunks; the snapshot is a directory of Parquet parts
+        from streaming_ingest import read_parts, stream_preprocess
+
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        stream_preprocess(path, target)
+        _remove_stale_snapshots(path, target)
+        return apply_schema(read_parts(target))
+
+    # Derived columns whose stage and inputs are unchanged since an earlier build are reused
+    df = preprocessor_data(path, ColumnCache(os.path.join(SNAPSHOT_DIR, "columns"), path)).reset_index(drop=True)
+    try:
+        _write_snapshot(df, target)
+        _remove_stale_snapshots(path, target)
+    except OSError:
+        # Read-only deployments still work, they just re-parse on a cold start
+        pass
+    return df
+
+
+def _streamed_aggregates(path, fingerprint):
+    # A streamed snapshot carries the whole-dataset partials its chunks added up; they fill
+    # in for parallel_aggregate.get_aggregates, which would otherwise aggregate the rows again
+    target = snapshot_path(path, fingerprint)
+    if not os.path.isdir(target):
+        return None
+    from parallel_aggregate import DatasetAggregates
+    from streaming_ingest import read_partials
+
+    try:
+        partials = read_partials(target)
+    except Exception:
+        # Unreadable side files: the aggregates are built from the rows on demand
+        return None
+    return DatasetAggregates(partials) if partials is not None else None
+
+
+def _load_shared(path, fingerprint):
+    # The host-wide memory-mapped copy of this version (shared_dataset), published by
+    # whichever process gets here first; a private frame if it cannot be published
+    df = attach_current(path, fingerprint)
+    if df is not None:
+        return df
+    with publishing(path):
+        df = attach_current(path, fingerprint)
+        if df is not None:
+            return df
+        df = _read_or_build(path, fingerprint)
+        try:
+            return publish(path, fingerprint, df)
+        except (OSError, ValueError, TypeError):
+            # No writable shared directory, or a column Arrow cannot hold
+            return df
+
+
+def load_dataset(path=DATA_PATH, revalidate=None):
+    # Returns the cleaned dataset, re-parsing the CSV only when the file itself changed.
+    # The returned frame is shared by every session, so callers must not modify it in place.
+    # Followed paths skip the check by default: their tracker folds appends in as they land.
+    if revalidate is None:
+        revalidate = path not in _followed
+    cached = _datasets.get(path)
+    if cached is not None and not revalidate:
+        return cached[1]
+    fingerprint = file_fingerprint(path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with _lock:
+        cached = _datasets.get(path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        df = _load_shared(path, fingerprint)
+        if cached is not None:
+            _drop_derived(cached[0])
+            release(cached[1])
+        _datasets[path] = (fingerprint, df)
+        aggregates = _streamed_aggregates(path, fingerprint)
+        if aggregates is not None:
+            _derived[(fingerprint, "aggregates")] = aggregates
+        return df
+
+
+def _drop_derived(fingerprint):
+    for key in [key for key in _derived if key[0] == fingerprint]:
+        del _derived[key]
+
+
+def dataset_fingerprint(df):
+    # Matched by identity: slices of a cached frame are different data and have no fingerprint
+    for fingerprint, frame in list(_datasets.values()):
+        if frame is df:
+            return fingerprint
+    return None
+
+
+def derived(df, name, build, extend=None):
+    # Returns build(df), computed once per loaded dataset and shared by every session.
+    # Frames that did not come from load_dataset have no fingerprint and are never cached.
+    # extend(value, new_rows), if given, updates the value in place of a rebuild on append_rows.
+    if extend is not None:
+        _extenders[name] = extend
+    fingerprint = dataset_fingerprint(df)
+    if fingerprint is None:
+        return build(df)
+    key = (fingerprint, name)
+    value = _derived.get(key)
+    if value is None:
+        with _lock:
+            building = _building.setdefault(key, threading.Lock())
+        with building:
+            value = _derived.get(key)
+            if value is None:
+                value = build(df)
+                with _lock:
+                    # Not kept if the dataset was replaced (appended to, reloaded) meanwhile
+                    if dataset_fingerprint(df) == fingerprint:
+                        _derived[key] = value
+                    _building.pop(key, None)
+    return value
+
+
+def peek_derived(df, name):
+    # The cached derived structure, or None if it has not been built (never builds it)
+    fingerprint = dataset_fingerprint(df)
+    if fingerprint is None:
+        return None
+    return _derived.get((fingerprint, name))
+
+
+def append_rows(path, rows):
+    # Folds already-cleaned rows appended to `path` into the cached dataset. Derived
+    # structures with an extender are updated incrementally; the rest are rebuilt on demand.
+    with _lock:
+        cached = _datasets.get(path)
+        if cached is None:
+            return load_dataset(path)
+        old_fingerprint, old_df = cached
+        if rows.empty:
+            return old_df
+
+        df = pd.concat(_matching_categories(old_df, rows), ignore_index=True)
+        fingerprint = file_fingerprint(path)
+        for (key_fingerprint, name), value in list(_derived.items()):
+            if key_fingerprint == old_fingerprint and name in _extenders:
+                _derived[(fingerprint, name)] = _extenders[name](value, rows)
+        if fingerprint != old_fingerprint:
+            _drop_derived(old_fingerprint)
+        # Appended rows stay in this process; the next full load publishes them host-wide
+        release(old_df)
+        _datasets[path] = (fingerprint, df)
+        return df
+
+
+def _matching_categories(old_df, rows):
+    # Gives categorical columns the same categories on both sides so concat keeps them
+    # categorical. The old frame is only re-coded when the new rows bring new labels.
+    old_columns, new_columns = {}, {}
+    for column in old_df.columns:
+        dtype = old_df[column].dtype
+        if not isinstance(dtype, pd.CategoricalDtype) or column not in rows.columns:
+            continue
+        labels = pd.Index(rows[column].dropna().unique())
+        if not labels.isin(dtype.categories).all():
+            categories = dtype.categories.union(labels)
+            old_columns[column] = old_df[column].cat.set_categories(categories)
+        else:
+            categories = dtype.categories
+        new_columns[column] = pd.Categorical(rows[column], categories=categories)
+    if old_columns:
+        old_df = old_df.assign(**old_columns)
+    return [old_df, rows.assign(**new_columns) if new_columns else rows]
+
+
+def follow(path):
+    _followed.add(path)
+
+
+def unfollow(path):
+    _followed.discard(path)
+
+
+def clear_cache():
+    with _lock:
+        for _, df in _datasets.values():
+            release(df)
+        _datasets.clear()
+        _derived.clear()
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_loader import derived
+from shared_dataset import mapped_table
+
+# Row-level view behind the charts: one page of the filtered rows at a time. Pages are
+# taken from the memory-mapped Arrow file when the dataset is shared (shared_dataset), so
+# only the visible rows of the projected columns are read and converted; the filtered
+# segment itself is never copied, only its row positions.
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Columns shown until the analyst picks others
+DEFAULT_COLUMNS = [
+    "UserID", "Age", "Gender", "Location", "Profession", "Platform", "DeviceType",
+    "Total Time Spent", "Engagement", "Addiction Level",
+]
+
+# Filtered-and-sorted row orders kept per dataset (one per filter state, sort column and order)
+MAX_CACHED_ORDERS = 8
+
+
+def sort_keys(values):
+    # Dense ranks in sort order (category order for categoricals), missing values ranked last
+    codes, uniques = pd.factorize(values, sort=True)
+    codes[codes < 0] = len(uniques)
+    return codes, len(uniques)
+
+
+def _position_dtype(size):
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+class DrillDown:
+    # Pages of the filtered rows of one dataset, optionally sorted by one column. Sort
+    # permutations over the whole dataset are computed once per column and order; a filtered
+    # order is the permutation restricted to the filtered rows, one pass per new request.
+
+    def __init__(self, df):
+        self.df = df
+        self.table = mapped_table(df)
+        self.columns = list(df.columns)
+        self._permutations = {}
+        self._orders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def permutation(self, column, descending=False):
+        key = (column, descending)
+        with self._lock:
+            permutation = self._permutations.get(key)
+        if permutation is None:
+            codes, missing = sort_keys(self.df[column])
+            if descending:
+                codes = np.where(codes == missing, missing, missing - 1 - codes)
+            permutation = np.argsort(codes, kind="stable").astype(_position_dtype(len(codes)))
+            with self._lock:
+                self._permutations[key] = permutation
+        return permutation
+
+    def order(self, state, rows, sort=None, descending=False):
+        # Row positions of `rows` (the RowSet for `state`) in display order
+        key = (state, sort, descending)
+        with self._lock:
+            positions = self._orders.get(key)
+            if positions is not None:
+                self._orders.move_to_end(key)
+                return positions
+        if sort is None:
+            positions = rows.indices()
+        else:
+            permutation = self.permutation(sort, descending)
+            positions = permutation[rows.mask()[permutation]]
+        with self._lock:
+            self._orders[key] = positions
+            while len(self._orders) > MAX_CACHED_ORDERS:
+                self._orders.popitem(last=False)
+        return positions
+
+    def page(self, state, rows, number, size, columns=None, sort=None, descending=False):
+        # (page frame, total filtered rows) for 0-based page `number`; the frame's index holds
+        # the dataset row positions
+        columns = [column for column in (columns or self.columns) if column in self.columns]
+        positions = self.order(state, rows, sort, descending)
+        chosen = positions[number * size:(number + 1) * size]
+        if self.table is not None:
+            frame = self.table.select(columns).take(pa.array(chosen)).to_pandas()
+            frame.index = chosen
+        else:
+            frame = self.df.iloc[chosen, [self.df.columns.get_loc(column) for column in columns]]
+        return frame, len(positions)
+
+
+def get_drill_down(df):
+    return derived(df, "drill_down", DrillDown)
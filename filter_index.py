@@ -0,0 +1,249 @@
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+
+# Categorical sidebar filters, in the order they appear in main1.py
+FILTER_COLUMNS = ["Gender", "Profession", "Location", "Platform", "DeviceType"]
+AGE_COLUMN = "Age"
+
+
+@dataclass(frozen=True)
+class FilterState:
+    # Canonical, hashable sidebar selection.
+    # selections: ((column, (value, ...)), ...) for constrained columns only, sorted by column;
+    # a column that is absent (or "Select All") keeps every row.
+    # age_range: (low, high) inclusive, or None for the full range.
+    selections: tuple = ()
+    age_range: tuple = None
+
+    def values(self, column):
+        for name, values in self.selections:
+            if name == column:
+                return values
+        return None
+
+    def key(self):
+        # Stable across processes (unlike hash()), so it can name cache entries and files
+        return hashlib.sha1(repr((self.selections, self.age_range)).encode("utf-8")).hexdigest()
+
+
+class RowSet:
+    # A set of row positions stored as a packed bitset (8 rows per byte)
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def full(cls, size):
+        return cls.from_mask(np.ones(size, dtype=bool))
+
+    def __and__(self, other):
+        return RowSet(np.bitwise_and(self.bits, other.bits), self.size)
+
+    def __or__(self, other):
+        return RowSet(np.bitwise_or(self.bits, other.bits), self.size)
+
+    def difference(self, other):
+        return RowSet(np.bitwise_and(self.bits, np.invert(other.bits)), self.size)
+
+    def count(self):
+        return int(np.bitwise_count(self.bits).sum())
+
+    def __len__(self):
+        return self.count()
+
+    def is_empty(self):
+        return not self.bits.any()
+
+    def mask(self):
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def indices(self):
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.size))
+
+    def take(self, df):
+        return df.iloc[self.indices()]
+
+    def extend(self, mask):
+        # Appends rows; only the last, partially filled byte is re-packed
+        mask = np.asarray(mask, dtype=bool)
+        whole = self.size // 8
+        tail = np.unpackbits(self.bits[whole:], count=self.size - whole * 8).astype(bool)
+        bits = np.concatenate([self.bits[:whole], np.packbits(np.concatenate([tail, mask]))])
+        return RowSet(bits, self.size + len(mask))
+
+
+class FilterIndex:
+    # One bitset per categorical value plus cumulative "Age <= a" bitsets, built once per dataset.
+    # Resolving a filter state is then a few ORs per column and one AND per active filter.
+    # With age_column=None there are no age bitsets and states must not carry an age range.
+
+    def __init__(self, df, columns=FILTER_COLUMNS, age_column=AGE_COLUMN):
+        self.size = len(df)
+        self.columns = list(columns)
+        self.age_column = age_column
+        self.bitsets = {}
+        for column in self.columns:
+            codes, uniques = pd.factorize(df[column])
+            self.bitsets[column] = {
+                value: RowSet.from_mask(codes == code) for code, value in enumerate(uniques)
+            }
+
+        ages = df[age_column].to_numpy() if age_column is not None else np.empty(0, dtype=np.int64)
+        self.ages = np.unique(ages)
+        self.age_le = self._cumulative_age_bitsets(ages)
+        self._all = RowSet.full(self.size)
+
+    def _cumulative_age_bitsets(self, ages):
+        order = np.argsort(ages, kind="stable")
+        boundaries = np.searchsorted(ages[order], self.ages, side="right")
+        # age_le[i] holds every row whose age is <= self.ages[i]
+        age_le = []
+        mask = np.zeros(len(ages), dtype=bool)
+        start = 0
+        for end in boundaries:
+            mask[order[start:end]] = True
+            age_le.append(RowSet.from_mask(mask))
+            start = end
+        return age_le
+
+    def extended(self, rows):
+        # Index over the current rows followed by `rows`, without re-reading the current rows
+        index = FilterIndex.__new__(FilterIndex)
+        index.size = self.size + len(rows)
+        index.columns = self.columns
+        index.age_column = self.age_column
+        index.bitsets = {}
+        for column in self.columns:
+            values = rows[column].to_numpy()
+            bitsets = {value: bits.extend(values == value) for value, bits in self.bitsets[column].items()}
+            empty = RowSet(np.zeros_like(self._all.bits), self.size)
+            for value in pd.unique(values):
+                if value not in bitsets:
+                    bitsets[value] = empty.extend(values == value)
+            index.bitsets[column] = bitsets
+
+        new_ages = rows[self.age_column].to_numpy() if self.age_column is not None else self.ages
+        index.ages = np.union1d(self.ages, new_ages)
+        index.age_le = []
+        for age in index.ages:
+            # Old rows with age <= a come from the largest old age bucket not above a
+            position = np.searchsorted(self.ages, age, side="right") - 1
+            old = self.age_le[position] if position >= 0 else RowSet(np.zeros_like(self._all.bits), self.size)
+            index.age_le.append(old.extend(new_ages <= age))
+        index._all = RowSet.full(index.size)
+        return index
+
+    def options(self, column):
+        # Distinct values in first-seen order, same as df[column].unique()
+        return list(self.bitsets[column])
+
+    def age_bounds(self):
+        return int(self.ages[0]), int(self.ages[-1])
+
+    def state(self, selections, age_range=None):
+        # Builds a canonical FilterState, dropping filters that select everything
+        constrained = []
+        for column, values in selections.items():
+            if values is None:
+                continue
+            chosen = set(values)
+            if chosen.issuperset(self.bitsets[column]):
+                continue
+            constrained.append((column, tuple(sorted(chosen, key=str))))
+        if age_range is not None:
+            low, high = int(age_range[0]), int(age_range[1])
+            if (low, high) == self.age_bounds():
+                age_range = None
+            else:
+                age_range = (low, high)
+        return FilterState(tuple(sorted(constrained)), age_range)
+
+    def age_rows(self, low, high):
+        hi = np.searchsorted(self.ages, high, side="right") - 1
+        lo = np.searchsorted(self.ages, low, side="left") - 1
+        if hi < 0 or hi <= lo:
+            return RowSet(np.zeros_like(self._all.bits), self.size)
+        rows = self.age_le[hi]
+        if lo >= 0:
+            rows = rows.difference(self.age_le[lo])
+        return rows
+
+    def column_rows(self, column, values):
+        bitsets = self.bitsets[column]
+        rows = None
+        for value in values:
+            bits = bitsets.get(value)
+            if bits is not None:
+                rows = bits if rows is None else rows | bits
+        if rows is None:
+            return RowSet(np.zeros_like(self._all.bits), self.size)
+        return rows
+
+    def resolve(self, state):
+        rows = self._all
+        for column, values in state.selections:
+            rows = rows & self.column_rows(column, values)
+        if state.age_range is not None:
+            rows = rows & self.age_rows(*state.age_range)
+        return rows
+
+    def facets(self, state):
+        # Sidebar previews for a filter state: per filter column, option -> rows that option
+        # would keep under the *other* active filters, plus the age histogram under the
+        # categorical filters. Each active filter is resolved once; the "all but one"
+        # intersections come from prefix and suffix ANDs, then one popcount per option/age.
+        parts = [
+            None if state.values(column) is None else self.column_rows(column, state.values(column))
+            for column in self.columns
+        ]
+        parts.append(None if state.age_range is None else self.age_rows(*state.age_range))
+
+        # prefix[i]: AND of parts[:i], suffix[i]: AND of parts[i:] (None = every row)
+        prefix, suffix = [None], [None]
+        for part in parts:
+            prefix.append(_intersect(prefix[-1], part))
+        for part in reversed(parts):
+            suffix.append(_intersect(suffix[-1], part))
+        suffix.reverse()
+        others = [_intersect(prefix[i], suffix[i + 1]) for i in range(len(parts))]
+
+        scratch = np.empty_like(self._all.bits)
+        counts = {
+            column: {value: _count(bits, rows, scratch) for value, bits in self.bitsets[column].items()}
+            for column, rows in zip(self.columns, others)
+        }
+        # Cumulative "age <= a" counts differenced into one count per distinct age
+        cumulative = np.array([_count(bits, others[-1], scratch) for bits in self.age_le], dtype=np.int64)
+        ages = pd.Series(np.diff(cumulative, prepend=0), index=self.ages, name="Rows")
+        return counts, ages.rename_axis(self.age_column)
+
+
+def _intersect(rows, other):
+    if rows is None:
+        return other
+    if other is None:
+        return rows
+    return rows & other
+
+
+def _count(bits, rows, scratch):
+    # Rows of `bits` inside `rows`; the intersection goes into a reused buffer
+    if rows is None:
+        return bits.count()
+    np.bitwise_and(bits.bits, rows.bits, out=scratch)
+    return int(np.bitwise_count(scratch).sum())
+
+
+def get_filter_index(df):
+    return derived(df, "filter_index", FilterIndex, FilterIndex.extended)
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Spans are appended here as JSON lines when set (one OpenTelemetry-style span per line)
+TRACE_FILE_ENV = "INSIGHTS_TRACE_FILE"
+
+# Set to 1 to trace allocations (tracemalloc) from startup, so spans report peak and retained
+# bytes; it can also be switched on from the performance panel. Tracing slows Python down.
+TRACE_MEMORY_ENV = "INSIGHTS_TRACE_MEMORY"
+
+# Durations kept per span name for the rolling percentiles
+ROLLING_WINDOW = 500
+
+
+class Span:
+    # One timed unit of work. Field names follow the OpenTelemetry span data model so the
+    # JSON lines can be shipped to an OTLP-compatible collector with little translation.
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+        self.duration_ms = None
+        self._start = time.perf_counter()
+        # Traced bytes at the start and the highest seen since, when memory is traced
+        self._memory_start = None
+        self._memory_peak = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000.0
+        self.end_time_unix_nano = time.time_ns()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    # Process-wide span collector. Each Streamlit rerun is one trace; nested spans get
+    # slash-joined names ("section1/render") so the breakdown reads as a tree.
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._file_lock = threading.Lock()
+        # Open spans of every thread that trace memory. tracemalloc keeps one process-wide
+        # peak, so before it is reset the peak is folded into all of them.
+        self._memory_spans = set()
+        self._memory_lock = threading.Lock()
+
+    def start_run(self, **attributes):
+        # Starts a new trace for the calling thread (one per rerun) and returns its id
+        self._local.trace_id = uuid.uuid4().hex
+        self._local.stack = []
+        self._local.spans = []
+        self._local.attributes = attributes
+        return self._local.trace_id
+
+    def run_spans(self):
+        # Finished spans of the calling thread's current run, in completion order
+        return list(getattr(self._local, "spans", []))
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if not hasattr(self._local, "trace_id"):
+            self.start_run()
+        stack = self._local.stack
+        full_name = f"{stack[-1].name}/{name}" if stack else name
+        parent_id = stack[-1].span_id if stack else None
+        span = Span(full_name, self._local.trace_id, parent_id, {**self._local.attributes, **attributes})
+        if tracemalloc.is_tracing():
+            with self._memory_lock:
+                current = self._fold_peak()
+                span._memory_start = span._memory_peak = current
+                self._memory_spans.add(span)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+            span.finish()
+            if span._memory_start is not None:
+                with self._memory_lock:
+                    current = self._fold_peak() if tracemalloc.is_tracing() else None
+                    self._memory_spans.discard(span)
+                if current is not None:
+                    span.set("memory.peak_delta_bytes", span._memory_peak - span._memory_start)
+                    span.set("memory.retained_bytes", current - span._memory_start)
+            self._record(span)
+
+    def _fold_peak(self):
+        # Hands the peak since the last reset to every open span, then starts a new interval;
+        # resetting without this would hide an inner span's peak from the spans around it.
+        # Returns the traced bytes now. Called with _memory_lock held.
+        current, peak = tracemalloc.get_traced_memory()
+        for open_span in self._memory_spans:
+            open_span._memory_peak = max(open_span._memory_peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def _record(self, span):
+        self._local.spans.append(span)
+        with self._lock:
+            self._durations[span.name].append(span.duration_ms)
+        path = os.environ.get(TRACE_FILE_ENV)
+        if path:
+            with self._file_lock, open(path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def rolling_stats(self):
+        # p50/p95 of every span name over the last ROLLING_WINDOW occurrences
+        with self._lock:
+            snapshot = {name: np.array(values) for name, values in self._durations.items() if values}
+        rows = [
+            {
+                "span": name,
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+            }
+            for name, values in snapshot.items()
+        ]
+        return pd.DataFrame(rows, columns=["span", "count", "p50_ms", "p95_ms"])
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+
+
+# Shared by every session in the process
+tracer = Tracer()
+span = tracer.span
+
+
+def memory_traced():
+    return tracemalloc.is_tracing()
+
+
+def trace_memory(enabled):
+    # Turns allocation tracing on or off for the whole process (every session)
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+if os.environ.get(TRACE_MEMORY_ENV) == "1":
+    trace_memory(True)
+
+
+def render_debug_panel(container):
+    # Per-rerun breakdown and rolling percentiles, drawn into a Streamlit container
+    spans = tracer.run_spans()
+    breakdown = pd.DataFrame(
+        [
+            {
+                "span": s.name,
+                "ms": round(s.duration_ms, 2),
+                "peak_kb": s.attributes.get("memory.peak_delta_bytes", float("nan")) / 1024,
+                "retained_kb": s.attributes.get("memory.retained_bytes", float("nan")) / 1024,
+                "top_level": s.parent_id is None,
+            }
+            for s in spans
+        ],
+        columns=["span", "ms", "peak_kb", "retained_kb", "top_level"],
+    )
+    top_level = breakdown[breakdown["top_level"]]
+    breakdown = breakdown.drop(columns="top_level")
+    if breakdown[["peak_kb", "retained_kb"]].isna().all().all():
+        # Memory is only measured while allocations are traced
+        breakdown = breakdown.drop(columns=["peak_kb", "retained_kb"])
+    else:
+        breakdown[["peak_kb", "retained_kb"]] = breakdown[["peak_kb", "retained_kb"]].round(1)
+    container.caption(f"This rerun: {top_level['ms'].sum():.1f} ms across {len(top_level)} top-level spans")
+    container.dataframe(breakdown, hide_index=True, use_container_width=True)
+    container.caption("Rolling percentiles (this process)")
+    container.dataframe(tracer.rolling_stats().round(2), hide_index=True, use_container_width=True)
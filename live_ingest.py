@@ -0,0 +1,133 @@
+import io
+import os
+import threading
+
+import pandas as pd
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from Preprocessor import apply_schema, clean_data, create_additional_columns
+from data_loader import append_rows, follow, load_dataset, unfollow
+from streaming_ingest import RowHashSet, row_hashes
+
+
+class AppendTracker:
+    # Follows a CSV export that grows by appending rows. Only the bytes after the last
+    # consumed newline are parsed, cleaned and folded into the cached dataset; anything
+    # else (truncation, rotation, rewrite) falls back to a full load_dataset.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        df = load_dataset(self.path, revalidate=True)
+        stat = os.stat(self.path)
+        with open(self.path, "rb") as handle:
+            self.header = handle.readline()
+            handle.seek(0, os.SEEK_END)
+            self.offset = _last_newline_end(handle, stat.st_size)
+        self.inode = stat.st_ino
+        self.columns = pd.read_csv(io.BytesIO(self.header)).columns
+        self.dtypes = df.dtypes
+        # Appended rows that duplicate existing ones are dropped, as a full reload would
+        self.seen = RowHashSet()
+        self.seen.add_new(row_hashes(df))
+
+    def poll(self):
+        # Consumes any complete lines appended since the last call; returns the number of new rows
+        with self._lock:
+            stat = os.stat(self.path)
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset()
+                return 0
+            if stat.st_size == self.offset:
+                return 0
+
+            with open(self.path, "rb") as handle:
+                handle.seek(self.offset)
+                tail = handle.read(stat.st_size - self.offset)
+            end = tail.rfind(b"\n") + 1
+            if end == 0:
+                # Only a partial line so far; wait for the writer to finish it
+                return 0
+            self.offset += end
+
+            rows = self.parse(tail[:end])
+            if rows.empty:
+                return 0
+            append_rows(self.path, rows)
+            return len(rows)
+
+    def parse(self, data):
+        rows = pd.read_csv(io.BytesIO(data), header=None, names=self.columns)
+        rows = apply_schema(create_additional_columns(clean_data(rows)))
+        # Match the cached frame's dtypes so concatenation and hashing line up; categoricals
+        # keep their own labels and are reconciled by append_rows
+        rows = rows.astype({
+            column: dtype for column, dtype in self.dtypes.items()
+            if column in rows.columns and not isinstance(dtype, pd.CategoricalDtype)
+        })
+        if rows.empty:
+            return rows
+        return rows[self.seen.add_new(row_hashes(rows))].reset_index(drop=True)
+
+
+def _last_newline_end(handle, size):
+    # Offset just past the last newline, so a half-written final line is read later
+    block = 4096
+    position = size
+    while position > 0:
+        start = max(0, position - block)
+        handle.seek(start)
+        found = handle.read(position - start).rfind(b"\n")
+        if found >= 0:
+            return start + found + 1
+        position = start
+    return 0
+
+
+class _AppendHandler(FileSystemEventHandler):
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.target = os.path.abspath(tracker.path)
+
+    def on_modified(self, event):
+        if not event.is_directory and os.path.abspath(event.src_path) == self.target:
+            self.tracker.poll()
+
+    on_created = on_modified
+
+    def on_moved(self, event):
+        if os.path.abspath(event.dest_path) == self.target:
+            self.tracker.poll()
+
+
+# One watcher per file per process, however many sessions ask for it
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def watch_appends(path):
+    # Starts (once) a background watchdog observer that folds appended rows into the cache
+    key = os.path.abspath(path)
+    with _watchers_lock:
+        if key in _watchers:
+            return _watchers[key][0]
+        tracker = AppendTracker(path)
+        observer = Observer()
+        observer.schedule(_AppendHandler(tracker), os.path.dirname(key) or ".", recursive=False)
+        observer.daemon = True
+        observer.start()
+        follow(path)
+        _watchers[key] = (tracker, observer)
+        return tracker
+
+
+def stop_watching():
+    with _watchers_lock:
+        for tracker, observer in _watchers.values():
+            observer.stop()
+            unfollow(tracker.path)
+        _watchers.clear()
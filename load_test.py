@@ -0,0 +1,463 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from tornado.websocket import websocket_connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from data_loader import DATA_PATH_ENV
+from filter_index import AGE_COLUMN, FILTER_COLUMNS
+from shared_dataset import SHARED_DIR_ENV
+from synthetic_data import write_csv
+
+# Concurrent-session load test for main1.py. For every session count it starts a headless
+# `streamlit run` on a synthetic export, warms it with one session, then connects N
+# websocket sessions that replay sidebar and section 7 interaction traces the way a browser
+# does (widget states in a rerun_script message, fragment reruns for section 7). Each
+# rerun's latency is the time until the server reports the script finished; peak RSS and
+# CPU come from /proc for the server and its worker processes. Before that it times a cold
+# start and a restart up to the first element and the whole first page. One JSON line per
+# start and per session count; the exit status is 1 when any SLO is breached.
+#
+#   python load_test.py --sessions 1 4 8 --rows 100000 --slo p95_ms=1500
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main1.py")
+LOGO = os.path.join(os.path.dirname(APP), "Project Logo.jpg")
+
+DEFAULT_SESSIONS = [1, 4, 8]
+DEFAULT_ROWS = 100_000
+DEFAULT_STEPS = 8
+
+# Mean pause between a session's interactions; 0 replays back to back
+DEFAULT_THINK_SECONDS = 1.0
+
+# Metric -> highest acceptable value; --slo metric=value overrides or adds one
+DEFAULT_SLOS = {"p95_ms": 2000.0, "p99_ms": 5000.0, "errors": 0}
+METRICS = [
+    "p50_ms", "p95_ms", "p99_ms", "max_ms", "errors", "peak_rss_mb", "cpu_seconds_per_rerun", "cpu_utilisation",
+    "server_ready_ms", "first_paint_ms", "first_page_ms",
+]
+
+# Label of the section 7 multiselect (it has no key)
+SECTION7_WIDGET = "Select Platforms"
+
+SERVER_START_SECONDS = 180
+SAMPLE_SECONDS = 0.1
+
+TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def random_trace(rng, options, age_bounds, steps):
+    # What an analyst does: narrow a column to a few values (untick "Select All", then pick),
+    # widen it again, drag the age range, and compare platforms in section 7. An action is
+    # {"widget": key or label, "value": value}.
+    trace = []
+    constrained = set()
+    while len(trace) < steps:
+        roll = rng.random()
+        if roll < 0.4:
+            column = FILTER_COLUMNS[rng.integers(len(FILTER_COLUMNS))]
+            if column in constrained:
+                trace.append({"widget": f"all_{column}", "value": True})
+                constrained.discard(column)
+            else:
+                count = int(rng.integers(1, min(3, len(options[column])) + 1))
+                picked = [str(value) for value in rng.choice(options[column], size=count, replace=False)]
+                trace.append({"widget": f"all_{column}", "value": False})
+                trace.append({"widget": f"filter_{column}", "value": picked})
+                constrained.add(column)
+        elif roll < 0.7:
+            low, high = sorted(int(age) for age in rng.integers(age_bounds[0], age_bounds[1] + 1, size=2))
+            trace.append({"widget": "age_filter", "value": [low, high]})
+        else:
+            count = int(rng.integers(1, len(options["Platform"]) + 1))
+            picked = [str(value) for value in rng.choice(options["Platform"], size=count, replace=False)]
+            trace.append({"widget": SECTION7_WIDGET, "value": picked})
+    return trace
+
+
+def trace_inputs(csv_path):
+    # Filter options and age bounds of an export, for building traces
+    frame = pd.read_csv(csv_path, usecols=FILTER_COLUMNS + [AGE_COLUMN])
+    options = {column: list(frame[column].dropna().unique()) for column in FILTER_COLUMNS}
+    return options, (int(frame[AGE_COLUMN].min()), int(frame[AGE_COLUMN].max()))
+
+
+class Session:
+    # One browser tab speaking Streamlit's websocket protocol
+
+    def __init__(self, url):
+        self.url = url
+        self.socket = None
+        self.page_hash = ""
+        # widget key (or label when it has none) -> (id, element type, fragment id, options)
+        self.widgets = {}
+        # widget id -> WidgetState sent with every rerun, like the browser does
+        self.states = {}
+        self.errors = 0
+        # Seconds from the last rerun request to its first element
+        self.first_paint = None
+
+    async def connect(self):
+        self.socket = await websocket_connect(self.url, subprotocols=["streamlit"])
+        return await self.rerun()
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+
+    async def rerun(self, fragment_id=""):
+        # Seconds until the server finishes the (fragment) run
+        message = BackMsg()
+        rerun = message.rerun_script
+        rerun.query_string = ""
+        rerun.page_script_hash = self.page_hash
+        rerun.widget_states.widgets.extend(self.states.values())
+        if fragment_id:
+            rerun.fragment_id = fragment_id
+        seen = set()
+        self.first_paint = None
+        started = time.perf_counter()
+        await self.socket.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await self.socket.read_message()
+            if raw is None:
+                raise ConnectionError("server closed the session")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = forward.new_session.main_script_hash
+            elif kind == "delta":
+                if self.first_paint is None:
+                    self.first_paint = time.perf_counter() - started
+                self._read_delta(forward.delta, seen)
+            elif kind == "script_finished":
+                break
+        elapsed = time.perf_counter() - started
+        if not fragment_id:
+            # Widgets a full run did not draw are gone; the browser drops their state too
+            self.widgets = {name: widget for name, widget in self.widgets.items() if widget[0] in seen}
+            self.states = {key: state for key, state in self.states.items() if key in seen}
+        return elapsed
+
+    def _read_delta(self, delta, seen):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        kind = delta.new_element.WhichOneof("type")
+        if kind == "exception":
+            self.errors += 1
+            return
+        element = getattr(delta.new_element, kind)
+        widget_id = getattr(element, "id", "")
+        if not widget_id.startswith("$$ID-"):
+            return
+        # Widget ids end in the user key, or "None" without one
+        name = widget_id.split("-", 2)[2]
+        if name == "None":
+            name = getattr(element, "label", widget_id)
+        self.widgets[name] = (widget_id, kind, delta.fragment_id, list(getattr(element, "options", [])))
+        seen.add(widget_id)
+
+    async def apply(self, action):
+        name, value = action["widget"], action["value"]
+        if name not in self.widgets:
+            raise KeyError(f"widget {name!r} is not on the page")
+        widget_id, kind, fragment_id, options = self.widgets[name]
+        state = WidgetState(id=widget_id)
+        if kind == "checkbox":
+            state.bool_value = bool(value)
+        elif kind == "slider":
+            state.double_array_value.data.extend(float(v) for v in value)
+        elif kind == "multiselect":
+            state.int_array_value.data.extend(options.index(str(v)) for v in value)
+        else:
+            raise ValueError(f"cannot drive a {kind} widget")
+        self.states[widget_id] = state
+        return await self.rerun(fragment_id)
+
+
+async def replay(url, trace, think, rng):
+    # Latencies of the page load and every action of the trace
+    session = Session(url)
+    try:
+        latencies = [await session.connect()]
+        for action in trace:
+            if think > 0:
+                await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+            latencies.append(await session.apply(action))
+    finally:
+        session.close()
+    return latencies, session.errors
+
+
+def _children(pid):
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", encoding="ascii") as handle:
+                children.extend(int(child) for child in handle.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def process_tree_usage(pid):
+    # (resident bytes, CPU seconds) of a process and its live descendants, or None without /proc
+    rss, cpu, found = 0, 0.0, False
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/stat", encoding="ascii") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        found = True
+        # Fields after the command name start at field 3 (state): utime, stime, cutime and
+        # cstime are fields 14-17, rss is field 24
+        cpu += sum(int(value) for value in fields[11:15]) / TICKS
+        rss += int(fields[21]) * PAGE_BYTES
+        pending.extend(_children(current))
+    return (rss, cpu) if found else None
+
+
+async def sample_peak_rss(pid, peak, stop):
+    while not stop.is_set():
+        usage = process_tree_usage(pid)
+        if usage is not None:
+            peak[0] = max(peak[0], usage[0])
+        await asyncio.sleep(SAMPLE_SECONDS)
+
+
+async def run_sessions(url, pid, traces, think, seed):
+    # All traces at once; returns (latencies, errors, peak RSS bytes, CPU seconds, wall seconds)
+    peak, stop = [0], asyncio.Event()
+    sampler = asyncio.ensure_future(sample_peak_rss(pid, peak, stop))
+    before = process_tree_usage(pid)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        replay(url, trace, think, np.random.default_rng([seed, number])) for number, trace in enumerate(traces)
+    ))
+    wall = time.perf_counter() - started
+    after = process_tree_usage(pid)
+    stop.set()
+    await sampler
+    latencies = [latency for session, _ in results for latency in session]
+    errors = sum(session_errors for _, session_errors in results)
+    cpu = after[1] - before[1] if before is not None and after is not None else None
+    return latencies, errors, peak[0] or None, cpu, wall
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("localhost", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(csv_path, workdir, log):
+    # Headless Streamlit on a free port, in a scratch directory so its snapshots, shared
+    # dataset and filter history stay out of the app's own
+    port = free_port()
+    os.makedirs(workdir, exist_ok=True)
+    if not os.path.exists(os.path.join(workdir, os.path.basename(LOGO))):
+        os.symlink(LOGO, os.path.join(workdir, os.path.basename(LOGO)))
+    env = dict(os.environ, **{DATA_PATH_ENV: csv_path, SHARED_DIR_ENV: os.path.join(workdir, "shared")})
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(APP), env.get("PYTHONPATH")]))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process, f"ws://localhost:{port}/_stcore/stream"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"streamlit did not answer within {SERVER_START_SECONDS} s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def first_page(url):
+    # (seconds to the first element, seconds to the finished page, exceptions) for a new session
+    session = Session(url)
+    try:
+        page = await session.connect()
+    finally:
+        session.close()
+    return session.first_paint, page, session.errors
+
+
+def measure_start(csv_path, workdir, kind, log):
+    # Process start to health check, to the first element and to the whole first page
+    started = time.perf_counter()
+    process, url = start_server(csv_path, workdir, log)
+    ready = time.perf_counter() - started
+    try:
+        first_paint, page, errors = asyncio.run(first_page(url))
+        usage = process_tree_usage(process.pid)
+    finally:
+        stop_server(process)
+    return {
+        "start": kind,
+        "server_ready_ms": ready * 1000,
+        "first_paint_ms": (ready + first_paint) * 1000,
+        "first_page_ms": (ready + page) * 1000,
+        "errors": errors,
+        "rss_mb": None if usage is None else usage[0] / 1024 ** 2,
+    }
+
+
+def measure_cold_start(csv_path, workdir, log=subprocess.DEVNULL):
+    # A server on a never-seen export ("cold": parse, clean, snapshot, publish), then a
+    # restart that keeps the on-disk snapshots but not the shared-memory copy, like a new
+    # container or replica with a persistent volume ("restart")
+    workdir = os.path.join(workdir, "cold-start")
+    records = [measure_start(csv_path, workdir, "cold", log)]
+    shutil.rmtree(os.path.join(workdir, "shared"), ignore_errors=True)
+    records.append(measure_start(csv_path, workdir, "restart", log))
+    return records
+
+
+def summarise(sessions, latencies, errors, peak_rss, cpu, wall):
+    milliseconds = np.asarray(latencies) * 1000
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "p50_ms": float(np.percentile(milliseconds, 50)),
+        "p95_ms": float(np.percentile(milliseconds, 95)),
+        "p99_ms": float(np.percentile(milliseconds, 99)),
+        "max_ms": float(milliseconds.max()),
+        "errors": errors,
+        "peak_rss_mb": None if peak_rss is None else peak_rss / 1024 ** 2,
+        "cpu_seconds": cpu,
+        "cpu_seconds_per_rerun": None if cpu is None else cpu / len(latencies),
+        "cpu_utilisation": None if cpu is None else cpu / wall,
+        "wall_seconds": wall,
+    }
+
+
+def breaches(record, slos):
+    # "metric=value > threshold" for every SLO the record misses; unmeasured metrics pass
+    return [
+        f"{metric}={record[metric]:.1f} > {threshold:g}"
+        for metric, threshold in slos.items()
+        if record.get(metric) is not None and record[metric] > threshold
+    ]
+
+
+def parse_slo(text):
+    metric, _, value = text.partition("=")
+    if metric not in METRICS or not value:
+        raise argparse.ArgumentTypeError(f"expected metric=value with metric one of {METRICS}")
+    return metric, float(value)
+
+
+def run_load_test(csv_path, session_counts, traces, think, slos, workdir, seed=0, log=subprocess.DEVNULL):
+    # One record per session count; traces[i] is replayed by session i (cycled)
+    records = []
+    for sessions in session_counts:
+        process, url = start_server(csv_path, os.path.join(workdir, f"server-{sessions}"), log)
+        try:
+            # Warm-up: the first run after start builds the dataset, index and aggregates,
+            # which is cold-start cost (benchmark.py), not concurrency cost
+            asyncio.run(run_sessions(url, process.pid, [[]], 0, seed))
+            chosen = [traces[number % len(traces)] for number in range(sessions)]
+            latencies, errors, peak_rss, cpu, wall = asyncio.run(run_sessions(url, process.pid, chosen, think, seed))
+        finally:
+            stop_server(process)
+        record = summarise(sessions, latencies, errors, peak_rss, cpu, wall)
+        record["slo_breaches"] = breaches(record, slos)
+        records.append(record)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay concurrent dashboard sessions and check rerun latency SLOs.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS, help="concurrent session counts to test")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows in the synthetic export")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="interactions per generated trace")
+    parser.add_argument("--traces", help="JSON file with a list of traces (lists of {widget, value}) to replay instead")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK_SECONDS, help="mean seconds between interactions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo", type=parse_slo, action="append", default=[], metavar="METRIC=VALUE",
+                        help=f"fail when METRIC exceeds VALUE (repeatable; defaults {DEFAULT_SLOS})")
+    parser.add_argument("--no-cold-start", action="store_true", help="skip the cold start and first paint measurement")
+    parser.add_argument("--server-log", help="file for the Streamlit servers' output")
+    parser.add_argument("--output", help="JSON lines file (default: stdout)")
+    args = parser.parse_args(argv)
+    slos = dict(DEFAULT_SLOS, **dict(args.slo))
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    failed = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = write_csv(os.path.join(workdir, f"synthetic_{args.rows}.csv"), args.rows, seed=args.seed)
+            if args.traces:
+                with open(args.traces, encoding="utf-8") as handle:
+                    traces = json.load(handle)
+            else:
+                options, age_bounds = trace_inputs(csv_path)
+                traces = [
+                    random_trace(np.random.default_rng([args.seed, number]), options, age_bounds, args.steps)
+                    for number in range(max(args.sessions))
+                ]
+
+            def emit(record):
+                record.update({"rows": args.rows, "slos": slos})
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                label = f"{record['sessions']} sessions" if "sessions" in record else f"{record['start']} start"
+                failed.extend(f"{label}: {breach}" for breach in record["slo_breaches"])
+
+            if not args.no_cold_start:
+                for record in measure_cold_start(csv_path, workdir, log):
+                    record["slo_breaches"] = breaches(record, slos)
+                    emit(record)
+            for record in run_load_test(csv_path, args.sessions, traces, args.think, slos, workdir, args.seed, log):
+                emit(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if log is not subprocess.DEVNULL:
+            log.close()
+    for breach in failed:
+        sys.stderr.write(f"SLO breached: {breach}\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
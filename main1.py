@@ -1,177 +1,277 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from PIL import Image
-import plotly.express as px
-
+from page_assets import FOOTER_HTML, KPI_CARD_HTML, TITLE_HTML, logo_bytes
 
-# Reading the data
-df = pd.read_csv("cleaning dataset final.csv")
+# The title and logo only need Streamlit, so they go out before the data and plotting stack is
+# imported: a fresh process (restart, new replica) paints them while the rest loads. The
+# strings and the logo bytes are prepared once per process in page_assets.
 #st.header("Mapping Trends in Digital Engagement")
-st.markdown(
-    """
-    <div style='text-align: center;'>
-        <h3 style='color: #1E90FF; font-size: 42px; font-weight: bold; font-family: Arial, sans-serif;'>
-            <em>The Social Clock: Mapping Global Trends in Digital Engagement 📱</em> 
-        </h3>
-        <p style='color: #555; font-size: 18px; font-style: italic; font-family: "Georgia", serif;'>
-            Understanding user behavior is vital in today’s digital age. This project analyzes global social media engagement across demographics, platforms, and devices. With advanced visualizations and interactive filters, it empowers data-driven decisions and uncovers key digital trends. Welcome to the future of social insights!.
-        </p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-
-
-# Load the logo image
-logo = Image.open("Project Logo.jpg")  # Replace with the path to your logo file
+st.markdown(TITLE_HTML, unsafe_allow_html=True)
 
 # Display the logo at the top of the sidebar
-st.sidebar.image(logo, use_container_width=True)  # Updated parameter
+st.sidebar.image(logo_bytes(), use_container_width=True)  # Updated parameter
 
+import pandas as pd
+import plotly.io as pio
+import charts
+import client_charts
+from aggregations import hour_box_stats
+from approximate import approximate_by_default, exact_or_none, get_sample, refining, with_error
+from data_loader import DATA_PATH, dataset_fingerprint, load_dataset
+from live_ingest import watch_appends
+from parallel_aggregate import DatasetAggregates, get_aggregates
+from prewarm import prewarmer
+from drill_down import DEFAULT_COLUMNS, PAGE_SIZES, get_drill_down
+from Preprocessor import memory_report
+from filter_index import FILTER_COLUMNS, get_filter_index
+from query_backend import get_backend
+from render_cache import cache_key, plotly_json, render_cache
+from instrumentation import memory_traced, render_debug_panel, span, trace_memory, tracer
+
+
+# Every rerun is one trace; the spans below feed the optional performance panel
+tracer.start_run()
+
+with span("load"):
+    # Reading the data (cleaned snapshot, shared across reruns -- do not modify in place)
+    df = load_dataset(DATA_PATH)
+    # Rows appended to the export are folded into the cached dataset in the background
+    watch_appends(DATA_PATH)
+    # Bitset index over the sidebar filter columns, built once per dataset
+    filter_index = get_filter_index(df)
+    # Rendered charts are cached under the dataset version plus the inputs each section depends on
+    data_version = dataset_fingerprint(df)
 # Sidebar Filters
 # Sidebar Filters
 st.sidebar.header("Filter Options")
 
+# Facet counts: how many rows each option would keep under the other active filters, and the
+# age histogram under the categorical ones. Widget values are already in session_state when a
+# rerun starts, so the counts follow the selection the widgets below are about to return.
+with span("facets"):
+    facet_state = filter_index.state(
+        {
+            column: None if st.session_state.get(f"all_{column}", True) else st.session_state.get(f"filter_{column}", [])
+            for column in FILTER_COLUMNS
+        },
+        st.session_state.get("age_filter"),
+    )
+    facet_counts, age_histogram = filter_index.facets(facet_state)
+
+
+def facet_caption(column):
+    # Shown under the multiselect rather than in its option labels: Streamlit derives a
+    # widget's identity from the labels (and help), so counts there would reset the selection
+    # whenever another filter changed them
+    st.sidebar.caption(
+        " · ".join(f"{value}: {facet_counts[column].get(value, 0):,}" for value in filter_index.options(column))
+    )
+
+
 # Gender Filter
-if st.sidebar.checkbox("Select All Genders", value=True):
-    gender_filter = df["Gender"].unique()
+if st.sidebar.checkbox("Select All Genders", value=True, key="all_Gender"):
+    gender_filter = filter_index.options("Gender")
 else:
     gender_filter = st.sidebar.multiselect(
         "Select Gender",
-        options=df["Gender"].unique(),
-        default=[]  # Start with no selection when "Select All" is unchecked
+        options=filter_index.options("Gender"),
+        default=[],  # Start with no selection when "Select All" is unchecked
+        key="filter_Gender",
     )
+    facet_caption("Gender")
 
 # Profession Filter
-if st.sidebar.checkbox("Select All Professions", value=True):
-    professions_filter = df['Profession'].unique()
+if st.sidebar.checkbox("Select All Professions", value=True, key="all_Profession"):
+    professions_filter = filter_index.options("Profession")
 else:
     professions_filter = st.sidebar.multiselect(
         "Select Profession:", 
-        options=df['Profession'].unique(),
-        default=[]  # Start with no selection when "Select All" is unchecked
+        options=filter_index.options("Profession"),
+        default=[],  # Start with no selection when "Select All" is unchecked
+        key="filter_Profession",
     )
-
-# Age Range Filter
+    facet_caption("Profession")
+
+# Age Range Filter, with a preview of how the filtered rows spread over the ages
+age_low, age_high = st.session_state.get("age_filter", filter_index.age_bounds())
+in_range = (age_histogram.index >= age_low) & (age_histogram.index <= age_high)
+st.sidebar.bar_chart(
+    pd.DataFrame({
+        "In range": age_histogram.where(in_range, 0),
+        "Outside range": age_histogram.where(~in_range, 0),
+    }),
+    color=["#1E90FF", "#D3D3D3"],
+    height=120,
+)
 age_filter = st.sidebar.slider(
     "Select Age Range",
-    min_value=int(df["Age"].min()),
-    max_value=int(df["Age"].max()),
-    value=(int(df["Age"].min()), int(df["Age"].max()))
+    min_value=filter_index.age_bounds()[0],
+    max_value=filter_index.age_bounds()[1],
+    value=filter_index.age_bounds(),
+    key="age_filter",
 )
 
 # Location Filter
-if st.sidebar.checkbox("Select All Locations", value=True):
-    location_filter = df["Location"].unique()
+if st.sidebar.checkbox("Select All Locations", value=True, key="all_Location"):
+    location_filter = filter_index.options("Location")
 else:
     location_filter = st.sidebar.multiselect(
         "Select Location",
-        options=df["Location"].unique(),
-        default=[]  # Start with no selection when "Select All" is unchecked
+        options=filter_index.options("Location"),
+        default=[],  # Start with no selection when "Select All" is unchecked
+        key="filter_Location",
     )
+    facet_caption("Location")
 
 # Platform Filter
-if st.sidebar.checkbox("Select All Platforms", value=True):
-    platform_filter = df["Platform"].unique()
+if st.sidebar.checkbox("Select All Platforms", value=True, key="all_Platform"):
+    platform_filter = filter_index.options("Platform")
 else:
     platform_filter = st.sidebar.multiselect(
         "Select Platform",
-        options=df["Platform"].unique(),
-        default=[]  # Start with no selection when "Select All" is unchecked
+        options=filter_index.options("Platform"),
+        default=[],  # Start with no selection when "Select All" is unchecked
+        key="filter_Platform",
     )
+    facet_caption("Platform")
 
 # Device Type Filter
-if st.sidebar.checkbox("Select All Devices", value=True):
-    device_filter = df["DeviceType"].unique()
+if st.sidebar.checkbox("Select All Devices", value=True, key="all_DeviceType"):
+    device_filter = filter_index.options("DeviceType")
 else:
     device_filter = st.sidebar.multiselect(
         "Select Device Type",
-        options=df["DeviceType"].unique(),
-        default=[]  # Start with no selection when "Select All" is unchecked
+        options=filter_index.options("DeviceType"),
+        default=[],  # Start with no selection when "Select All" is unchecked
+        key="filter_DeviceType",
     )
+    facet_caption("DeviceType")
+
+# Approximate mode: answers come from a stratified sample straight away, with error bounds,
+# while the exact aggregates are built in the background. Decided before anything below
+# waits on the exact build, and on by default for large exports (INSIGHTS_APPROXIMATE).
+approximate = st.sidebar.toggle(
+    "Approximate mode",
+    value=approximate_by_default(df),
+    key="approximate",
+    help="Show sample-based estimates with 95% error bounds immediately, then refine to exact values.",
+)
 
 
 
 # Apply Filters
-filtered_df = df[
-    (df["Gender"].isin(gender_filter)) &
-    (df["Age"].between(*age_filter)) &
-    (df["Location"].isin(location_filter)) &
-    (df["Platform"].isin(platform_filter))&
-    (df['Profession'].isin(professions_filter))&
-    (df['DeviceType'].isin(device_filter))
-]
+with span("filter"):
+    filter_state = filter_index.state(
+        {
+            "Gender": gender_filter,
+            "Location": location_filter,
+            "Platform": platform_filter,
+            "Profession": professions_filter,
+            "DeviceType": device_filter,
+        },
+        age_filter,
+    )
+    # Row set shared by every section below
+    filtered_rows = filter_index.resolve(filter_state)
+
+with span("aggregates"):
+    if approximate:
+        aggregates = exact_or_none(df, "aggregates", DatasetAggregates.build, DatasetAggregates.extended)
+        hour_stats = exact_or_none(df, "hour_box_stats", hour_box_stats)
+    else:
+        # Whole-dataset counts and sums (cube cells, per-age-group, per-month, per-platform),
+        # computed as partition partials in a process pool for large exports
+        aggregates = get_aggregates(df)
+        hour_stats = None
+    estimating = aggregates is None
+    hour_estimating = approximate and hour_stats is None
+    if estimating:
+        # The sample answers the same queries as the cube and DatasetAggregates
+        aggregates = query = get_sample(df)
+    else:
+        # Answers the KPIs and the grouped charts: the pre-aggregated cube by default, or the
+        # pandas / Arrow backend when INSIGHTS_QUERY_BACKEND says so (all give the same results)
+        query = get_backend(df)
+    # Estimated charts are cached apart from exact ones
+    answer_kind = "estimate" if estimating else "exact"
+
+# Remember which states sessions pick, then render the likely next ones in the background
+if st.session_state.get("recorded_filter_state") != filter_state:
+    st.session_state["recorded_filter_state"] = filter_state
+    prewarmer.history.record(filter_state)
+if not estimating:
+    prewarmer.schedule(df, filter_state)
 
 
 # KPIs Calculation on Filtered Data
 st.subheader("Overall Insights Engine Analysis")
-avg_engagement = filtered_df['Engagement'].mean()
-total_time_spent = filtered_df['Total Time Spent'].sum()
-avg_time_video = filtered_df['Time Spent On Video'].mean()
+with span("kpis"):
+    # Errors are None for exact answers
+    avg_engagement, engagement_error = with_error(query, "mean", filter_state, 'Engagement')
+    total_time_spent, total_time_error = with_error(query, "sum", filter_state, 'Total Time Spent')
+    avg_time_video, time_video_error = with_error(query, "mean", filter_state, 'Time Spent On Video')
 
 # Create a single row for KPIs
 col1, col2, col3 = st.columns(3)
 
-# Function to display styled KPI with modern design
-def styled_metric(label, value, font_size_label=16, font_size_value=24, bg_color="#f9f9f9", text_color="#333"):
-    st.markdown(
-        f"""
-        <div style="background: {bg_color}; border-radius: 10px; padding: 15px; text-align: center; box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);">
-            <p style="margin: 0; font-size: {font_size_label}px; color: {text_color}; font-weight: bold;">{label}</p>
-            <p style="margin: 0; font-size: {font_size_value}px; color: {text_color}; font-weight: bold;">{value}</p>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+# Function to display styled KPI with modern design (layout in page_assets.PAGE_STYLE)
+def styled_metric(label, value, bg_color="#f9f9f9", text_color="#333"):
+    st.markdown(KPI_CARD_HTML.format(label=label, value=value, bg_color=bg_color, text_color=text_color), unsafe_allow_html=True)
+
+# "4994.31", or "≈4994.31 ± 12.40" for an estimate
+def kpi_text(value, error, unit=""):
+    if error is None:
+        return f"{value:.2f}{unit}"
+    return f"≈{value:.2f} ± {error:.2f}{unit}"
 
 # Display KPIs in columns with light colors
 with col1:
-    styled_metric("Average Engagement", f"{avg_engagement:.2f}", bg_color="#eaf4fc", text_color="#1e81b0")
+    styled_metric("Average Engagement", kpi_text(avg_engagement, engagement_error), bg_color="#eaf4fc", text_color="#1e81b0")
 
 with col2:
-    styled_metric("Total Time Spent", f"{total_time_spent / 3600:.2f} hours", bg_color="#fff4e6", text_color="#f39c12")
+    styled_metric(
+        "Total Time Spent",
+        kpi_text(total_time_spent / 3600, None if total_time_error is None else total_time_error / 3600, " hours"),
+        bg_color="#fff4e6", text_color="#f39c12",
+    )
 
 with col3:
-    styled_metric("Time Spent per Video", f"{avg_time_video:.2f} seconds", bg_color="#eafce9", text_color="#27ae60")
+    styled_metric("Time Spent per Video", kpi_text(avg_time_video, time_video_error, " seconds"), bg_color="#eafce9", text_color="#27ae60")
 
 
 
+# Each section below is a fragment whose arguments are the inputs it depends on. A widget
+# inside a section (e.g. "Select Platforms") reruns only that section; sidebar changes rerun
+# the script, and sections whose inputs did not change are served from the render cache.
+# Charts go out as Plotly specs of the aggregated series (client_charts), capped at
+# client_charts.PAYLOAD_BUDGET_BYTES, and are drawn in the browser.
+
 ####1
 # Sidebar Filters
 
-# Group the filtered data
-if not filtered_df.empty:
-    connection_counts = filtered_df.groupby(['Profession', 'ConnectionType'], observed=True).size().unstack(fill_value=0)
-
-    # Subheader for the chart
-    st.subheader("Connection Type Usage by Profession")
-
-    # Create a Matplotlib figure with a modern style
-    #plt.style.use('seaborn-poster')
-    fig, ax = plt.subplots(figsize=(12, 7))
-    sns.set_palette("viridis", len(connection_counts.columns))
-
-    # Create the bar plot
-    connection_counts.plot(kind='bar', stacked=False, ax=ax)
-    ax.set_xlabel('Profession', color='#333', fontsize=16, weight='bold')
-    ax.set_ylabel('Count', color='#333', fontsize=16, weight='bold')
-    ax.set_title('Connection Type Usage by Profession', fontsize=20, color='#2C3E50', weight='bold', pad=20)
-
-    # Adjust legend placement and style
-    ax.legend(title='Connection Type', title_fontsize=14, loc='upper right', fontsize=12)
-
-    # Add a grid for better readability
-    ax.grid(axis='y', linestyle='--', linewidth=0.6, alpha=0.7)
+@st.fragment
+def connection_type_section(filter_state, filtered_rows, data_version, answer_kind):
+    # Group the filtered data
+    if not filtered_rows.is_empty():
+        # Subheader for the chart
+        st.subheader("Connection Type Usage by Profession")
+
+        def render_connection_type():
+            with span("aggregate"):
+                connection_counts = query.pivot(filter_state, 'Profession', 'ConnectionType')
+            with span("render"):
+                return client_charts.bounded_json(client_charts.connection_type_chart(connection_counts))
+
+        with span("section1"):
+            connection_json = render_cache.get_or_render(
+                cache_key("connection_type", data_version, answer_kind, filter_state), render_connection_type
+            )
 
-    # Remove the default Streamlit "box" by using the full width of the layout
-    st.pyplot(fig, use_container_width=True)
-else:
-    st.warning("No data available for the selected filters.")
+        # Remove the default Streamlit "box" by using the full width of the layout
+        st.plotly_chart(pio.from_json(connection_json), use_container_width=True)
+    else:
+        st.warning("No data available for the selected filters.")
 
+connection_type_section(filter_state, filtered_rows, data_version, answer_kind)
 
 
 
@@ -181,32 +281,30 @@ else:
 # Sidebar Filters for Dynamic Visualization
 # Sidebar Filters for Dynamic Visualization
 # Calculate average addiction level for selected age groups
-if not filtered_df.empty:
-    grouped_data = filtered_df.groupby('Age')['Addiction Level'].mean()
-
-    # Plot the line chart
-    st.subheader("Average Addiction Level by Age Group")
-    fig, ax = plt.subplots(figsize=(10, 6))  # Set figure size for better readability
-    # Line chart with customization
-    ax.step(grouped_data.index, grouped_data.values, marker='o', linestyle='--', color="olive", linewidth=2)
-
-    # Annotate each data point with its value
-    for i, (x, y) in enumerate(zip(grouped_data.index, grouped_data.values)):
-        ax.text(x, y, f'{y:.2f}', fontsize=10, color='#FF1493', ha='center', va='bottom')  # Adjust fontsize and position
-
-    # Add axis labels and title
-    ax.set_xlabel('Age Group', fontsize=14, color='#FF1493')
-    ax.set_ylabel('Average Addiction Level', fontsize=14, color='#FF1493')
-    ax.set_title('Average Addiction Level by Age Group', fontsize=20, color='#C71585')
-
-    # Add gridlines for better readability
-    ax.grid(True, linestyle='--', linewidth=0.5,color='#FF1493')
+@st.fragment
+def addiction_by_age_section(filter_state, filtered_rows, data_version, answer_kind):
+    if not filtered_rows.is_empty():
+        # Plot the line chart
+        st.subheader("Average Addiction Level by Age Group")
+        def render_addiction_by_age():
+            with span("aggregate"):
+                addiction_by_age, errors = with_error(
+                    query, "pivot", filter_state, 'Age', measure='Addiction Level', stat='mean'
+                )
+            with span("render"):
+                return client_charts.bounded_json(client_charts.addiction_by_age_chart(addiction_by_age, errors))
+
+        with span("section2"):
+            addiction_json = render_cache.get_or_render(
+                cache_key("addiction_by_age", data_version, answer_kind, filter_state), render_addiction_by_age
+            )
 
-    # Render the plot dynamically in Streamlit
-    st.pyplot(fig)
-else:
-    st.warning("No data available for the selected filters.")
+        # Render the plot dynamically in Streamlit
+        st.plotly_chart(pio.from_json(addiction_json), use_container_width=True)
+    else:
+        st.warning("No data available for the selected filters.")
 
+addiction_by_age_section(filter_state, filtered_rows, data_version, answer_kind)
 
 
 
@@ -215,217 +313,133 @@ else:
 
 3##### Sidebar Filters
 
-# Group the filtered data
-if not filtered_df.empty:
-    grouped_data = filtered_df.groupby(['Gender', 'Platform'], observed=True)['Self Control'].count().unstack(fill_value=0)
-
-    # Plotting the bar chart
-    st.subheader("📊 Self-Control Across Genders and Platforms 🌐")
-    fig, ax = plt.subplots(figsize=(12, 8))
-
-    # Create the bar plot
-    grouped_data.plot(
-        kind='bar', 
-        stacked=True, 
-        colormap='viridis', 
-        figsize=(12, 6), 
-        edgecolor='black',  # Adding borders for better clarity
-        ax=ax
-    )
-
-    # Customizing the chart
-    ax.set_title('Self Control Across Genders on Different Platforms', fontsize=20, pad=20, color='#006400')
-    ax.set_xlabel('Gender', fontsize=16, labelpad=10)
-    ax.set_ylabel('Self Control', fontsize=16, labelpad=10)
-    ax.legend(title='Platform', fontsize=12, loc='upper right')  # Adjust legend position
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=0, fontsize=14)
+@st.fragment
+def self_control_section(filter_state, filtered_rows, data_version, answer_kind):
+    # Group the filtered data
+    if not filtered_rows.is_empty():
+        # Plotting the bar chart
+        st.subheader("📊 Self-Control Across Genders and Platforms 🌐")
+        def render_self_control():
+            with span("aggregate"):
+                self_control = query.pivot(filter_state, 'Gender', 'Platform', measure='Self Control', stat='count')
+            with span("render"):
+                return client_charts.bounded_json(client_charts.self_control_chart(self_control))
+
+        with span("section3"):
+            self_control_json = render_cache.get_or_render(
+                cache_key("self_control", data_version, answer_kind, filter_state), render_self_control
+            )
 
-    # Adding gridlines for better readability
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
+        # Render the plot dynamically in Streamlit
+        st.plotly_chart(pio.from_json(self_control_json), use_container_width=True)
+    else:
+        st.warning("No data available for the selected filters.")
 
-    # Render the plot dynamically in Streamlit
-    st.pyplot(fig)
-else:
-    st.warning("No data available for the selected filters.")
+self_control_section(filter_state, filtered_rows, data_version, answer_kind)
 
 
 
 ###4
 
-st.subheader("Time Spent by Age Group")
-if not filtered_df.empty:
-    bins = [0, 18, 30, 40, 50, 60, 100]
-    labels = ['0-18', '19-30', '31-40', '41-50', '51-60', '60+']
-    df['Age Group'] = pd.cut(df['Age'], bins=bins, labels=labels, right=False)
-    average_time_spent = df.groupby('Age Group')['Total Time Spent'].mean().reset_index()
-    fig = px.bar(
-        average_time_spent, 
-        x='Age Group', 
-        y='Total Time Spent', 
-        color_discrete_sequence=px.colors.qualitative.Pastel
-    )
-    fig.update_layout(
-        title="Average Time Spent by Age Group",
-        xaxis_title="Age Group",
-        yaxis_title="Total Time Spent (minutes)",
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-    st.plotly_chart(fig)
-else:
-    st.warning("No data available for Time Spent.")
-
-
-
-#####5
-# Assuming your DataFrame 'df' is already loaded
-# If not, replace this with the actual loading mechanism
-df = pd.read_csv("cleaning dataset final.csv")
-
-# Create a synthetic date column
-start_date = '2023-01-01'  # Change this to your desired start date
-df['Date'] = pd.date_range(start=start_date, periods=len(df), freq='D')
-
-# Ensure the 'Date' column is in datetime format
-df['Date'] = pd.to_datetime(df['Date'])
-
-# Aggregate the data by month
-df['Month'] = df['Date'].dt.to_period('M')  # Create a new column for month
-
-# Calculate total time spent per month
-monthly_trends = df.groupby('Month')['Total Time Spent'].sum().reset_index()
-
-# Convert 'Month' back to a datetime format for plotting
-monthly_trends['Month'] = monthly_trends['Month'].dt.to_timestamp()
-
-# Visualization in Streamlit
-st.subheader("📊 Monthly Trends in Social Media Engagement")
+@st.fragment
+def age_group_time_section(filtered_rows, data_version, answer_kind):
+    st.subheader("Time Spent by Age Group")
+    if not filtered_rows.is_empty():
+        # Uses the whole dataset, so it only changes with the data
+        def render_age_group_time():
+            with span("aggregate"):
+                time_by_age_group = aggregates.age_group_time()
+            with span("render"):
+                return plotly_json(charts.age_group_time_chart(time_by_age_group))
+
+        with span("section4"):
+            age_group_json = render_cache.get_or_render(cache_key("age_group_time", data_version, answer_kind), render_age_group_time)
+        st.plotly_chart(pio.from_json(age_group_json))
+    else:
+        st.warning("No data available for Time Spent.")
 
-# Create the Matplotlib plot
-fig, ax = plt.subplots(figsize=(12, 6))
+age_group_time_section(filtered_rows, data_version, answer_kind)
 
-# Set a custom background color
-ax.set_facecolor('#f0f8ff')  # Light blue background
 
-# Draw the line plot with sharp transitions
-ax.plot(
-    monthly_trends['Month'],
-    monthly_trends['Total Time Spent'],
-    marker='o',
-    linestyle='-',
-    color='blue',
-    linewidth=2.5,
-    markersize=8,
-    label='Total Time Spent'
-)
 
-# Add a title and subtitle
-ax.set_title('Monthly Trends in Social Media Engagement', fontsize=20, fontweight='bold', color='darkblue')
-ax.set_xlabel('Month', fontsize=16, fontweight='bold', color='purple', labelpad=15)
-ax.set_ylabel('Total Time Spent (minutes)', fontsize=16, fontweight='bold', color='teal', labelpad=15)
-
-# Customize ticks
-plt.xticks(rotation=45, fontsize=12)
-plt.yticks(fontsize=12)
-
-# Add prominent grid lines
-ax.grid(color='gray', linestyle='-', linewidth=0.7, alpha=0.7)
-
-# Annotate each point with its value
-for i, row in monthly_trends.iterrows():
-    ax.text(
-        row['Month'],
-        row['Total Time Spent'] + 50,  # Position text slightly above
-        f"{row['Total Time Spent']}",
-        ha='center',
-        va='bottom',
-        fontsize=9,
-        color='black',
-        bbox=dict(facecolor='white', alpha=0.8, edgecolor='none', boxstyle='round,pad=0.3')
+#####5
+# Read from the day and month rollups built with the other whole-dataset aggregates, so the
+# trend follows the sidebar filters without rescanning the rows (df is only read for an age
+# range that ends inside an age group)
+
+@st.fragment
+def monthly_trends_section(filter_state, filtered_rows, data_version, answer_kind):
+    # Visualization in Streamlit
+    st.subheader("📊 Monthly Trends in Social Media Engagement")
+
+    bounds = aggregates.date_bounds()
+    if bounds is None:
+        st.warning("This export has no dates to draw trends from.")
+        return
+    if filtered_rows.is_empty():
+        st.warning("No data available for the selected filters.")
+        return
+
+    # Bucket size and date range only rerun this section
+    granularity_col, range_col = st.columns([1, 2])
+    granularity = granularity_col.radio(
+        "Bucket", ["month", "week", "day"], format_func=str.title, horizontal=True, key="trend_granularity"
     )
+    first, last = bounds[0].date(), bounds[1].date()
+    picked = range_col.date_input("Date range", value=(first, last), min_value=first, max_value=last, key="trend_range")
+    # While only the first day of a range is picked, keep the range open-ended
+    start, end = (tuple(picked) + (None, None))[:2] if isinstance(picked, (tuple, list)) else (picked, None)
+
+    def render_monthly_trends():
+        with span("aggregate"):
+            trends = aggregates.trend(filter_state, granularity, start, end, df)
+        with span("render"):
+            return client_charts.bounded_json(client_charts.monthly_trends_chart(trends))
+
+    # Render the plot in Streamlit
+    with span("section5"):
+        monthly_json = render_cache.get_or_render(
+            cache_key("monthly_trends", data_version, answer_kind, filter_state, granularity, start, end),
+            render_monthly_trends,
+        )
+    st.plotly_chart(pio.from_json(monthly_json), use_container_width=True)
 
-# Add a legend
-ax.legend(loc='upper right', fontsize=12)
-
-# Spread the plot slightly equally from both sides
-plt.xlim([monthly_trends['Month'].min() - pd.DateOffset(days=10), monthly_trends['Month'].max() + pd.DateOffset(days=10)])
-
-# Render the plot in Streamlit
-st.pyplot(fig)
+monthly_trends_section(filter_state, filtered_rows, data_version, answer_kind)
 
 
 
 
 
 ####6
-# Create a new 'Hour' column based on 'Total Time Spent'
-df['Hour'] = df['Total Time Spent'] // 60
-
-# Check if 'Hour' column is present
-if 'Hour' not in df.columns:
-    print("Error: 'Hour' column not found!")
-else:
-    # Check data types of columns
-    print(df.dtypes)
-    df['Hour'] = df['Hour'].astype(int)  # Ensure Hour is integer
-
-    # Set the style of seaborn with a soft background color
-    sns.set(style="whitegrid", rc={"axes.facecolor": "#e6f2ff"})  # Light blue background for the plot area
-
-    # Create a box plot
-    plt.figure(figsize=(18, 12))  # Increased figure size for more space
-    box_plot = sns.boxplot(
-        x='Hour', 
-        y='Total Time Spent', 
-        data=df, 
-        hue='Hour',  # Set hue to 'Hour' for proper color mapping
-        palette="coolwarm",  # Attractive color palette
-        linewidth=2,  # Thicker lines for better visibility
-        width=0.8,  # Wider boxes to give a more spaced-out look
-        fliersize=6,  # Larger outliers for better visibility
-        legend=False  # Hide legend since hue is only for color mapping
-    )
-
-    # Modify the title with matching colors and design
-    plt.title('Distribution of Time Spent on Social Media by Hour of the Day', 
-              fontsize=30, fontweight='bold', 
-              color='darkblue', backgroundcolor='lightyellow', 
-              pad=25, style='italic', loc='center')
-
-    # Customize the axis labels with vibrant colors and light yellow background
-    xlabel = plt.xlabel('Hour of the Day', fontsize=20, fontweight='bold', color='darkgreen', labelpad=20, style='italic')
-    ylabel = plt.ylabel('Total Time Spent (minutes)', fontsize=20, fontweight='bold', color='darkgreen', labelpad=20, style='italic')
-
-    # Set the background color for the x and y axis labels
-    xlabel.set_bbox(dict(facecolor='lightyellow', edgecolor='none', alpha=0.7))
-    ylabel.set_bbox(dict(facecolor='lightyellow', edgecolor='none', alpha=0.7))
-
-    # Add text labels for each box (median values with "Median" label)
-    for i in range(24):
-        median = df[df['Hour'] == i]['Total Time Spent'].median()
-        if pd.notna(median):  
-            # Adding "Median: " before the value
-            box_plot.text(i, median + 5, f'Median: {median:.1f}', 
-                          horizontalalignment='center', size=12, color='black', weight='semibold', 
-                          bbox=dict(facecolor='white', edgecolor='gray', boxstyle='round,pad=0.3'))
+# 'Hour' is derived from 'Total Time Spent' by Preprocessor.create_additional_columns
 
-    # Set x-axis ticks from 0 to 10
-    plt.xticks(range(11), fontsize=14, color='slategray', fontweight='bold')
-
-    # Increase y-axis limits to show a larger range of 'Total Time Spent'
-    plt.ylim(0, df['Total Time Spent'].max() + 100)  # Increase y-axis range to show more spread
-
-    # Style the ticks and grid
-    plt.yticks(fontsize=14, color='slategray', fontweight='bold')
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
-
-    # Remove top and right spines for a cleaner look
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
+@st.fragment
+def hour_boxplot_section(data_version, hour_stats, hour_estimating):
+    # Check if 'Hour' column is present
+    if 'Hour' not in df.columns:
+        print("Error: 'Hour' column not found!")
+    else:
+        def render_hour_boxplot():
+            # Check data types of columns
+            print(df.dtypes)
+            # One grouped pass for quartiles, whiskers and sampled outliers per hour
+            with span("aggregate"):
+                if hour_estimating:
+                    # Weighted sample quantiles; the median's error bound is drawn as notches
+                    stats = get_sample(df).hour_box_stats()
+                elif hour_stats is not None:
+                    stats = hour_stats
+                else:
+                    stats = hour_box_stats(df)
+            with span("render"):
+                return client_charts.bounded_json(client_charts.hour_boxplot_chart(stats))
 
-    plt.tight_layout()
+        # Display the plot in Streamlit
+        with span("section6"):
+            hour_json = render_cache.get_or_render(cache_key("hour_boxplot", data_version, "estimate" if hour_estimating else "exact"), render_hour_boxplot)
+        st.plotly_chart(pio.from_json(hour_json), use_container_width=True)
 
-    # Display the plot in Streamlit
-    st.pyplot(plt)
+hour_boxplot_section(data_version, hour_stats, hour_estimating)
 
 
 
@@ -446,107 +460,153 @@ else:
 # Assuming 'df' is your main DataFrame, replace with your actual DataFrame if it's named differently
 # Ensure that the DataFrame contains the 'Platform' and 'Total Time Spent' columns
 
-# Check if 'Platform' column exists in the main DataFrame (df)
-if 'Platform' in df.columns and 'Total Time Spent' in df.columns:
-    # Group the data by 'Platform' and calculate the total time spent
-    platform_data = df.groupby('Platform').agg({
-        'Total Time Spent': 'sum'  # Sum total time spent
-    }).reset_index()
-    st.header("Top 4 Social Media Plateform")
-    # Add a multiselect for platform selection
-    selected_platforms = st.multiselect("Select Platforms", options=platform_data['Platform'].unique())
-
-    if selected_platforms:
-        # Filter the data based on the selected platforms
-        filtered_platform_data = platform_data[platform_data['Platform'].isin(selected_platforms)]
-
-        # Display KPI for each selected platform
-        for platform in selected_platforms:
-            total_time_spent_selected = filtered_platform_data[filtered_platform_data['Platform'] == platform]['Total Time Spent'].sum()
-            st.metric(label=f"Total Time Spent on {platform}", value=f"{total_time_spent_selected:,} hours")
-
-        # Create a pie chart with Plotly Express for the selected platforms
-        fig = px.pie(filtered_platform_data, values='Total Time Spent', names='Platform', 
-                     title='Time Spent Distribution Across Selected Platforms',  # Dynamic title
-                     color_discrete_sequence=px.colors.qualitative.Set3,  # Color palette
-                     hover_name='Platform', hover_data=['Total Time Spent'])
-
-        # Update the layout of the pie chart
-        fig.update_layout(
-            width=800, height=600, font_size=14, 
-            title=dict(
-                text='<b><span style="color:##FC8D62;"></span></b><br>'
-                     '<span style="font-style:italic;font-size:18px; color:#888888;">(Based on Total Time Spent)</span>',
-                font=dict(family='Arial Black', size=26),
-                x=0.5, y=0.97, xanchor='center', yanchor='top'
-            )
-        )
-        fig.update_traces(marker=dict(line=dict(width=3, color='white')),
-                          textinfo='label+percent', textposition='inside', textfont_size=16)
-
-        # Render the chart in Streamlit
-        st.plotly_chart(fig, use_container_width=True)
+# Its multiselect only feeds this section, so changing it reruns just this fragment
+@st.fragment
+def platform_share_section(data_version, answer_kind):
+    # Check if 'Platform' column exists in the main DataFrame (df)
+    if 'Platform' in df.columns and 'Total Time Spent' in df.columns:
+        # Group the data by 'Platform' and calculate the total time spent
+        with span("section7/aggregate"):
+            platform_data = aggregates.platform_totals()
+        st.header("Top 4 Social Media Plateform")
+        # Add a multiselect for platform selection
+        selected_platforms = st.multiselect("Select Platforms", options=platform_data['Platform'].unique())
+
+        if selected_platforms:
+            # Filter the data based on the selected platforms
+            filtered_platform_data = platform_data[platform_data['Platform'].isin(selected_platforms)]
+
+            # Display KPI for each selected platform
+            for platform in selected_platforms:
+                total_time_spent_selected = filtered_platform_data[filtered_platform_data['Platform'] == platform]['Total Time Spent'].sum()
+                st.metric(label=f"Total Time Spent on {platform}", value=f"{total_time_spent_selected:,.0f} hours")
+
+            # Pie chart for the selected platforms
+            with span("section7/render"):
+                platform_json = render_cache.get_or_render(
+                    cache_key("platform_share", data_version, answer_kind, tuple(sorted(selected_platforms))),
+                    lambda: plotly_json(charts.platform_share_chart(filtered_platform_data)),
+                )
+
+            # Render the chart in Streamlit
+            st.plotly_chart(pio.from_json(platform_json), use_container_width=True)
+
+        else:
+            # Show a warning message if no platform is selected
+            st.warning("Please select at least one platform to see the data.")
 
     else:
-        # Show a warning message if no platform is selected
-        st.warning("Please select at least one platform to see the data.")
+        # Error message if 'Platform' or 'Total Time Spent' columns are missing
+        st.error("Columns 'Platform' or 'Total Time Spent' not found in the dataset.")
 
-else:
-    # Error message if 'Platform' or 'Total Time Spent' columns are missing
-    st.error("Columns 'Platform' or 'Total Time Spent' not found in the dataset.")
+platform_share_section(data_version, answer_kind)
 
 
 
 
 ###8
-# Group and calculate mean time spent
-demographic_time = df.groupby(["Gender", "Location"])["Total Time Spent"].mean().unstack()
+@st.fragment
+def gender_location_section(filter_state, filtered_rows, data_version, answer_kind):
+    # Streamlit app structure
+    st.subheader("Time Spent on Social Media by Gender and Location")
+
+    # Heatmap Visualization
+    if not filtered_rows.is_empty():
+        def render_heatmap():
+            with span("aggregate"):
+                demographic_time, errors = with_error(
+                    query, "pivot", filter_state, "Gender", "Location", measure="Total Time Spent", stat="mean"
+                )
+            if demographic_time.empty:
+                # Cached as an empty payload, so the warning below is a cache hit too
+                return ""
+            with span("render"):
+                return client_charts.bounded_json(client_charts.gender_location_heatmap(demographic_time, errors))
+
+        with span("section8"):
+            heatmap_json = render_cache.get_or_render(
+                cache_key("gender_location_heatmap", data_version, answer_kind, filter_state), render_heatmap
+            )
 
-# Streamlit app structure
-st.subheader("Time Spent on Social Media by Gender and Location")
+        if not heatmap_json:
+            st.warning("No data available to generate the heatmap. Please adjust the filters.")
+        else:
+            st.plotly_chart(pio.from_json(heatmap_json), use_container_width=True)
+    else:
+        st.warning("No data available for the selected filters. Please adjust the filters.")
+
+gender_location_section(filter_state, filtered_rows, data_version, answer_kind)
+
+
+###Drill down
+# The rows behind the charts, one page at a time: only the visible page of the chosen columns
+# is read (from the memory-mapped dataset when it is shared), and sorting uses per-column
+# sort permutations computed once per dataset
+@st.fragment
+def drill_down_section(filter_state, filtered_rows):
+    st.subheader("🔎 Drill Down into the Filtered Rows")
+    total = filtered_rows.count()
+    if total == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    drill_down = get_drill_down(df)
+
+    columns_col, sort_col, order_col = st.columns([3, 2, 1])
+    columns = columns_col.multiselect(
+        "Columns", options=drill_down.columns,
+        default=[column for column in DEFAULT_COLUMNS if column in drill_down.columns], key="drill_columns",
+    )
+    sort = sort_col.selectbox("Sort by", [None] + drill_down.columns, format_func=lambda column: "Dataset order" if column is None else column, key="drill_sort")
+    descending = order_col.toggle("Descending", key="drill_descending", disabled=sort is None)
 
-# Heatmap Visualization
-if not filtered_df.empty:
-    demographic_time = filtered_df.groupby(["Gender", "Location"])["Total Time Spent"].mean().unstack()
+    size_col, page_col, info_col = st.columns([1, 1, 2])
+    size = size_col.selectbox("Rows per page", PAGE_SIZES, key="drill_page_size")
+    pages = max(1, -(-total // size))
+    # The page count is part of the label, so a filter that changes it starts again at page 1
+    number = page_col.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key="drill_page")
 
-    if demographic_time.empty:
-        st.warning("No data available to generate the heatmap. Please adjust the filters.")
-    else:
-        fig, ax = plt.subplots(figsize=(12, 8))
-        sns.heatmap(
-            demographic_time,
-            ax=ax,
-            annot=True,
-            fmt=".1f",
-            cmap="viridis",
-            cbar_kws={'label': 'Avg Time Spent (mins)'}
-        )
-        ax.set_title("Time Spent on Social Media by Gender and Location", fontsize=16)
-        ax.set_ylabel("Gender", fontsize=12)
-        ax.set_xlabel("Location", fontsize=12)
-        st.pyplot(fig)
-else:
-    st.warning("No data available for the selected filters. Please adjust the filters.")
+    with span("drill_down"):
+        rows, _ = drill_down.page(filter_state, filtered_rows, number - 1, size, columns, sort, descending)
+    first = (number - 1) * size
+    info_col.caption(f"Rows {first + 1:,}–{first + len(rows):,} of {total:,}")
+    st.dataframe(rows.rename_axis("Row"), use_container_width=True)
+
+drill_down_section(filter_state, filtered_rows)
 
 
 #Custom footer in raw html/css paired with markdown feature of streamlit
-footer = """
-<style>
-.footer {
-    position: relative; /* Make footer relative to the content */
-    bottom: 0;
-    width: 100%;
-    background-color: white;
-    color: black;
-    text-align: center;
-    margin-top: 20px; /* Adds spacing before the footer */
-    padding: 10px 0;  /* Adds padding inside the footer */
-    border-top: 1px solid #ddd; /* Optional: Add a subtle top border */
-}
-</style>
-<div class="footer">
-    <p>☀️Developed by Shivani Singh☀️ </p>
-    
-</div>
-"""
-st.markdown(footer, unsafe_allow_html=True)
+st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+
+# While exact answers are being built, check back every second and rerun once they are in
+if approximate and refining():
+    st.sidebar.caption("Refining estimates to exact values…")
+
+    @st.fragment(run_every=1)
+    def refinement_watch():
+        if not refining():
+            st.rerun()
+
+    refinement_watch()
+
+
+# Per-rerun timing breakdown and rolling p50/p95 per stage, off by default
+if st.sidebar.checkbox("Show performance panel", value=False):
+    performance = st.sidebar.expander("⏱ Performance", expanded=True)
+    # Process-wide, so it applies to every session until switched off again
+    performance.checkbox(
+        "Trace memory",
+        value=memory_traced(),
+        key="trace_memory",
+        on_change=lambda: trace_memory(st.session_state["trace_memory"]),
+        help="Adds peak and retained KB per span from the next rerun on. Slows every session down.",
+    )
+    render_debug_panel(performance)
+    performance.caption(f"Dataset in memory: {df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+    performance.dataframe(memory_report(df), hide_index=True, use_container_width=True)
+    warmed = prewarmer.stats
+    performance.caption(
+        f"Prewarmed: {warmed['charts']} charts for {warmed['states']} states "
+        f"({warmed['bytes'] / 1024:.0f} KB, {warmed['cpu_seconds']:.1f} s CPU); "
+        f"render cache hits {render_cache.hits}, misses {render_cache.misses}"
+    )
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import AGE_COLUMN, FILTER_COLUMNS, FilterIndex
+
+# Every sidebar filter plus the extra dimensions the charts group by
+CUBE_DIMENSIONS = FILTER_COLUMNS + [AGE_COLUMN, "ConnectionType"]
+
+# Measures behind the KPIs and the section charts
+CUBE_MEASURES = ["Engagement", "Total Time Spent", "Time Spent On Video", "Self Control", "Addiction Level"]
+
+# Cell column holding the number of source rows in each cell
+ROWS = "rows"
+
+# Per-measure cell columns: non-null values, sum and sum of squares
+CELL_STATS = ("count", "sum", "sumsq")
+
+
+def measure_column(measure, stat):
+    # stat is one of "count" (non-null values), "sum" or "sumsq"
+    return f"{measure}|{stat}"
+
+
+class Cube:
+    # Additive pre-aggregates (row count, count/sum/sum of squares per measure) for every
+    # combination of CUBE_DIMENSIONS present in the data. Queries slice and sum cells, so
+    # their cost depends on the dimension cardinalities and not on the number of rows.
+
+    def __init__(self, cells, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES, filters=FILTER_COLUMNS, age_column=AGE_COLUMN):
+        self.cells = cells.reset_index(drop=True)
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        # The sidebar filters are resolved against the cells exactly like against the rows;
+        # `filters` and `age_column` are the dimensions a filter state may constrain
+        self.filters = list(filters)
+        self.age_column = age_column
+        self.index = FilterIndex(self.cells, self.filters, age_column)
+
+    @classmethod
+    def build(cls, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        return cls(aggregate_cells(df, dimensions, measures), dimensions, measures)
+
+    def extended(self, rows):
+        # Cube with `rows` folded in; only the new rows are aggregated
+        cells = merge_cells([self.cells, aggregate_cells(rows, self.dimensions, self.measures)], self.dimensions)
+        return Cube(cells, self.dimensions, self.measures, self.filters, self.age_column)
+
+    def slice(self, state):
+        return self.index.resolve(state).take(self.cells)
+
+    def is_empty(self, state):
+        return int(self.slice(state)[ROWS].sum()) == 0
+
+    def totals(self, state):
+        # Summed cell columns for the filter state (a Series keyed like the cell columns)
+        return self.slice(state).drop(columns=self.dimensions).sum()
+
+    def mean(self, state, measure):
+        totals = self.totals(state)
+        return _ratio(totals[measure_column(measure, "sum")], totals[measure_column(measure, "count")])
+
+    def sum(self, state, measure):
+        return self.totals(state)[measure_column(measure, "sum")]
+
+    def count(self, state, measure=None):
+        totals = self.totals(state)
+        return int(totals[ROWS] if measure is None else totals[measure_column(measure, "count")])
+
+    def pivot(self, state, rows, columns=None, measure=None, stat="rows"):
+        # Equivalent of filtered_df.groupby(rows + columns)[measure].<stat>(), unstacked on columns.
+        # stat: "rows" (group size), "count", "sum", "mean" or "std"; counts fill gaps with 0.
+        rows = [rows] if isinstance(rows, str) else list(rows)
+        columns = [] if columns is None else ([columns] if isinstance(columns, str) else list(columns))
+        keys = rows + columns
+        cells = self.slice(state).drop(columns=[d for d in self.dimensions if d not in keys])
+        result = cell_stat(cells.groupby(keys, observed=True).sum(), measure, stat)
+
+        if columns:
+            fill = 0 if stat in ("rows", "count") else None
+            result = result.unstack(columns, fill_value=fill)
+        return result
+
+
+def cell_stat(grouped, measure=None, stat="rows"):
+    # `stat` of `measure` per group of summed cells, leaving out groups without rows
+    grouped = grouped[grouped[ROWS] > 0]
+    if stat == "rows":
+        result = grouped[ROWS]
+    elif stat in ("count", "sum"):
+        result = grouped[measure_column(measure, stat)]
+    elif stat == "mean":
+        count = grouped[measure_column(measure, "count")]
+        result = grouped[measure_column(measure, "sum")] / count.where(count > 0)
+    elif stat == "std":
+        result = _std(grouped, measure)
+    else:
+        raise ValueError(f"Unknown cube statistic: {stat}")
+    return result.rename(measure if measure is not None else "size")
+
+
+def aggregate_cells(df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES, stats=CELL_STATS):
+    # Rolls rows up into cube cells; the output is additive, so cells built from separate
+    # chunks or partitions can be concatenated and re-aggregated with a plain sum.
+    # `stats` limits the per-measure columns (e.g. sums only, for the trend rollups).
+    parts = {dimension: df[dimension] for dimension in dimensions}
+    parts[ROWS] = np.ones(len(df), dtype=np.int64)
+    for measure in measures:
+        values = df[measure].astype(float)
+        if "count" in stats:
+            parts[measure_column(measure, "count")] = values.notna().astype(np.int64)
+        if "sum" in stats:
+            parts[measure_column(measure, "sum")] = values.fillna(0.0)
+        if "sumsq" in stats:
+            parts[measure_column(measure, "sumsq")] = (values * values).fillna(0.0)
+    frame = pd.DataFrame(parts, index=df.index)
+    return frame.groupby(dimensions, observed=True, dropna=False, sort=False).sum().reset_index()
+
+
+def merge_cells(cells, dimensions=CUBE_DIMENSIONS):
+    # Combines cell frames from several chunks/partitions into one set of cells
+    frame = pd.concat(cells, ignore_index=True)
+    return frame.groupby(dimensions, observed=True, dropna=False, sort=False).sum().reset_index()
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else np.nan
+
+
+def _std(grouped, measure):
+    # Sample standard deviation from count, sum and sum of squares
+    n = grouped[measure_column(measure, "count")]
+    total = grouped[measure_column(measure, "sum")]
+    squares = grouped[measure_column(measure, "sumsq")]
+    variance = (squares - total * total / n.where(n > 0)) / (n - 1).where(n > 1)
+    return np.sqrt(variance.clip(lower=0))
+
+
+def get_cube(df):
+    # Built together with the other whole-dataset aggregates, in parallel for large frames
+    # (imported here because parallel_aggregate builds on this module)
+    from parallel_aggregate import get_aggregates
+
+    return get_aggregates(df).cube
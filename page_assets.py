@@ -0,0 +1,63 @@
+import functools
+
+# Static parts of the page, prepared once per process: Streamlit re-executes main1.py on
+# every rerun, but imported modules stay loaded, so these strings and bytes are built once.
+
+LOGO_PATH = "Project Logo.jpg"
+
+# Page-wide CSS for the KPI cards and the footer, sent once with the title instead of
+# inline on every card
+PAGE_STYLE = """
+<style>
+.kpi-card {
+    border-radius: 10px; padding: 15px; text-align: center; box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
+}
+.kpi-card p { margin: 0; font-weight: bold; }
+.kpi-card .kpi-label { font-size: 16px; }
+.kpi-card .kpi-value { font-size: 24px; }
+.footer {
+    position: relative; /* Make footer relative to the content */
+    bottom: 0;
+    width: 100%;
+    background-color: white;
+    color: black;
+    text-align: center;
+    margin-top: 20px; /* Adds spacing before the footer */
+    padding: 10px 0;  /* Adds padding inside the footer */
+    border-top: 1px solid #ddd; /* Optional: Add a subtle top border */
+}
+</style>
+"""
+
+TITLE_HTML = PAGE_STYLE + """
+<div style='text-align: center;'>
+    <h3 style='color: #1E90FF; font-size: 42px; font-weight: bold; font-family: Arial, sans-serif;'>
+        <em>The Social Clock: Mapping Global Trends in Digital Engagement 📱</em>
+    </h3>
+    <p style='color: #555; font-size: 18px; font-style: italic; font-family: "Georgia", serif;'>
+        Understanding user behavior is vital in today’s digital age. This project analyzes global social media engagement across demographics, platforms, and devices. With advanced visualizations and interactive filters, it empowers data-driven decisions and uncovers key digital trends. Welcome to the future of social insights!.
+    </p>
+</div>
+"""
+
+# Filled in per KPI; the layout comes from PAGE_STYLE
+KPI_CARD_HTML = (
+    '<div class="kpi-card" style="background: {bg_color}; color: {text_color};">'
+    '<p class="kpi-label">{label}</p><p class="kpi-value">{value}</p></div>'
+)
+
+# Custom footer in raw html, styled by PAGE_STYLE
+FOOTER_HTML = """
+<div class="footer">
+    <p>☀️Developed by Shivani Singh☀️ </p>
+
+</div>
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def logo_bytes(path=LOGO_PATH):
+    # The JPEG as shipped. st.image serves bytes as they are; a PIL image would be decoded
+    # and re-encoded on every run.
+    with open(path, "rb") as handle:
+        return handle.read()
@@ -0,0 +1,178 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Preprocessor import derive
+from data_loader import derived
+from olap_cube import Cube, aggregate_cells, merge_cells
+from rollup_store import ROLLUP_DIMENSIONS, RollupStore, day_cells
+from shared_dataset import attach_rows, source_of
+
+# Whole-dataset aggregates (cube cells for the KPIs and sections 1, 2, 3 and 8, age-group
+# sums for section 4, per-day rollup cells for section 5, platform sums for section 7) computed
+# as per-partition partials and merged. Every partial is a count or a sum, so merging is a
+# plain addition and gives the same numbers as one pass over the whole frame.
+
+# Worker processes; INSIGHTS_WORKERS overrides the core count
+WORKERS_ENV = "INSIGHTS_WORKERS"
+
+# Below this many rows the pool costs more than it saves. Starting it takes about 2 s, and
+# each worker then attaches its rows and sends back cells nearly as many as its rows, about
+# 1 s per million rows on top of the aggregation itself (1.6 s per million in-process).
+# Compare the aggregate.map_reduce and aggregate.in_process benchmark stages to tune it for
+# a host; INSIGHTS_PARALLEL_ROWS overrides it.
+PARALLEL_ROWS_ENV = "INSIGHTS_PARALLEL_ROWS"
+MIN_PARALLEL_ROWS = 2_000_000
+
+
+def worker_count():
+    return int(os.environ.get(WORKERS_ENV) or os.cpu_count() or 1)
+
+
+def min_parallel_rows():
+    return int(os.environ.get(PARALLEL_ROWS_ENV) or MIN_PARALLEL_ROWS)
+
+
+def partial_aggregates(part):
+    # Additive aggregates of one row range
+    age_group = derive(part, 'Age Group')
+    time_spent = part['Total Time Spent']
+    grouped_by_age = time_spent.groupby(age_group, observed=False)
+    return {
+        "rows": len(part),
+        "cells": aggregate_cells(part),
+        "days": day_cells(part),
+        "age_sum": grouped_by_age.sum(),
+        "age_count": grouped_by_age.count(),
+        "platforms": time_spent.groupby(part['Platform'], observed=True).sum(),
+    }
+
+
+def merge_partials(partials):
+    partials = [partial for partial in partials if partial["rows"]] or partials[:1]
+    if len(partials) == 1:
+        return partials[0]
+    return {
+        "rows": sum(partial["rows"] for partial in partials),
+        "cells": merge_cells([partial["cells"] for partial in partials]),
+        "days": merge_cells([partial["days"] for partial in partials], ROLLUP_DIMENSIONS),
+        "age_sum": _add([partial["age_sum"] for partial in partials]),
+        "age_count": _add([partial["age_count"] for partial in partials]),
+        "platforms": _add([partial["platforms"] for partial in partials]),
+    }
+
+
+def _add(series):
+    return pd.concat(series).groupby(level=0, observed=False).sum().sort_index()
+
+
+def _partial_from_range(part):
+    return partial_aggregates(part)
+
+
+def _partial_from_shared(args):
+    # The worker maps its row range of the published dataset itself
+    source, start, stop = args
+    return partial_aggregates(attach_rows(source, start, stop))
+
+
+def process_context(preload):
+    # forkserver workers are forked from a clean helper process, never from the Streamlit
+    # server with its threads; `preload` modules are imported there once, not per worker
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(list(preload))
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+# One pool per process, started on first use
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context([__name__]))
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def map_reduce(df, workers=None):
+    # Splits df into one row range per worker, aggregates the ranges in the process pool
+    # and merges the partials. Small frames (or a single worker) are done in-process.
+    workers = worker_count() if workers is None else workers
+    if workers <= 1 or len(df) < min_parallel_rows():
+        return partial_aggregates(df)
+    bounds = np.linspace(0, len(df), workers + 1, dtype=np.int64)
+    bounds = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    pool = _get_pool(workers)
+    source = source_of(df)
+    if source is not None:
+        # Only row ranges cross the pipe; the rows are read from the shared mapping
+        try:
+            return merge_partials(list(pool.map(_partial_from_shared, [(source, start, end) for start, end in bounds])))
+        except OSError:
+            # Swapped out and unlinked before the workers opened it
+            pass
+    ranges = [df.iloc[start:end] for start, end in bounds]
+    return merge_partials(list(pool.map(_partial_from_range, ranges)))
+
+
+class DatasetAggregates:
+    # Merged partials plus the section 4, 5 and 7 frames built from them
+
+    def __init__(self, partials, rollups=None):
+        self.partials = partials
+        self.rows = partials["rows"]
+        self.cube = Cube(partials["cells"])
+        self.rollups = rollups if rollups is not None else RollupStore.from_day_cells(partials["days"])
+
+    @classmethod
+    def build(cls, df, workers=None):
+        return cls(map_reduce(df, workers))
+
+    def extended(self, rows):
+        # Appended rows only add their own partial
+        partial = partial_aggregates(rows)
+        return DatasetAggregates(merge_partials([self.partials, partial]), self.rollups.extended(partial["days"]))
+
+    def age_group_time(self):
+        # Section 4: average 'Total Time Spent' per age group
+        count = self.partials["age_count"]
+        mean = self.partials["age_sum"] / count.where(count > 0)
+        return mean.rename('Total Time Spent').rename_axis('Age Group').reset_index()
+
+    def trend(self, state, granularity="month", start=None, end=None, rows=None):
+        # Section 5, filtered: see RollupStore.trend
+        return self.rollups.trend(state, granularity, start, end, rows)
+
+    def date_bounds(self):
+        return self.rollups.date_bounds()
+
+    def platform_totals(self):
+        # Section 7: total time spent per platform
+        return self.partials["platforms"].rename('Total Time Spent').rename_axis('Platform').reset_index()
+
+
+def get_aggregates(df):
+    return derived(df, "aggregates", DatasetAggregates.build, DatasetAggregates.extended)
@@ -0,0 +1,235 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import charts
+import client_charts
+from aggregations import hour_box_stats
+from data_loader import SNAPSHOT_DIR, dataset_fingerprint
+from filter_index import FilterState, get_filter_index
+from parallel_aggregate import get_aggregates
+from query_backend import get_backend
+from render_cache import DEFAULT_MAX_BYTES, cache_key, plotly_json, render_cache
+
+# Speculative rendering of the dashboard sections for filter states a user is likely to pick
+# next, so the first click after startup or a data refresh lands on a warm render cache
+# entry. A background thread renders, in order: the default "Select All" state, the states
+# past sessions used most, and the states one sidebar move away from the current one. It
+# runs under a CPU share and a byte budget, and drops a cycle as soon as the user moves on.
+
+# Prewarm threads; 0 turns prewarming off
+PREWARM_ENV = "INSIGHTS_PREWARM"
+
+# Most frequent past states warmed per cycle
+HISTORY_PRESETS = 5
+
+# States warmed per cycle at most (default, presets and neighbours together)
+MAX_STATES = 48
+
+# Share of one core the prewarm thread may use; it sleeps after each chart to stay under it
+CPU_SHARE = 0.25
+
+# Bytes of render cache one cycle may fill, so prewarmed charts never push out more than a
+# quarter of what sessions rendered themselves
+MAX_BYTES = DEFAULT_MAX_BYTES // 4
+
+# Filter states past sessions picked, as {"filters": {column: [values]}, "age_range": [low, high], "count": n}
+HISTORY_FILE = os.path.join(SNAPSHOT_DIR, "filter_history.json")
+
+# The history file is rewritten at most this often
+HISTORY_SAVE_SECONDS = 30
+
+
+def prewarm_workers():
+    return int(os.environ.get(PREWARM_ENV) or 1)
+
+
+def _entry(state):
+    return {"filters": {column: list(values) for column, values in state.selections}, "age_range": state.age_range}
+
+
+class StateHistory:
+    # How often each filter state was picked, kept across restarts in HISTORY_FILE
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.counts = Counter()
+        self._saved = 0.0
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as handle:
+                for entry in json.load(handle):
+                    state = FilterState(
+                        tuple(sorted((column, tuple(values)) for column, values in entry["filters"].items())),
+                        tuple(entry["age_range"]) if entry.get("age_range") else None,
+                    )
+                    self.counts[state] += entry.get("count", 1)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # Counts recorded since the last periodic save
+        atexit.register(self.save)
+
+    def record(self, state):
+        with self._lock:
+            self.counts[state] += 1
+            due = time.monotonic() - self._saved >= HISTORY_SAVE_SECONDS
+        if due:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            self._saved = time.monotonic()
+            entries = [dict(_entry(state), count=count) for state, count in self.counts.most_common()]
+        if not entries:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as handle:
+                json.dump(entries, handle, default=str)
+            os.replace(tmp, self.path)
+        except OSError:
+            # Read-only checkout: the history only lives for this process
+            pass
+
+    def most_common(self, count=HISTORY_PRESETS):
+        with self._lock:
+            return [state for state, _ in self.counts.most_common(count)]
+
+
+def neighbours(index, state):
+    # States one sidebar move away: either age bound moved by a year, or one option of one
+    # column switched on or off (from "Select All", unticking it and picking that option)
+    selections = dict(state.selections)
+    first, last = index.age_bounds()
+    low, high = state.age_range or (first, last)
+    for age_range in ((low - 1, high), (low + 1, high), (low, high - 1), (low, high + 1)):
+        if first <= age_range[0] <= age_range[1] <= last:
+            yield index.state(selections, age_range)
+    for column in index.columns:
+        chosen = selections.get(column)
+        for value in index.options(column):
+            if chosen is None:
+                toggled = [value]
+            elif value in chosen:
+                toggled = [other for other in chosen if other != value]
+            else:
+                toggled = list(chosen) + [value]
+            yield index.state({**selections, column: toggled}, state.age_range)
+
+
+def section_jobs(df, state, rows, data_version, query, aggregates):
+    # render cache key -> render() for the exact-mode charts main1.py draws for `state` with
+    # its default section widgets; keys and payloads must match the sections there
+    if rows.is_empty():
+        return {}
+    jobs = {
+        cache_key("connection_type", data_version, "exact", state):
+            lambda: client_charts.bounded_json(client_charts.connection_type_chart(query.pivot(state, 'Profession', 'ConnectionType'))),
+        cache_key("addiction_by_age", data_version, "exact", state):
+            lambda: client_charts.bounded_json(client_charts.addiction_by_age_chart(
+                query.pivot(state, 'Age', measure='Addiction Level', stat='mean'))),
+        cache_key("self_control", data_version, "exact", state):
+            lambda: client_charts.bounded_json(client_charts.self_control_chart(
+                query.pivot(state, 'Gender', 'Platform', measure='Self Control', stat='count'))),
+        cache_key("age_group_time", data_version, "exact"):
+            lambda: plotly_json(charts.age_group_time_chart(aggregates.age_group_time())),
+    }
+    bounds = aggregates.date_bounds()
+    if bounds is not None:
+        start, end = bounds[0].date(), bounds[1].date()
+        jobs[cache_key("monthly_trends", data_version, "exact", state, "month", start, end)] = (
+            lambda: client_charts.bounded_json(client_charts.monthly_trends_chart(aggregates.trend(state, "month", start, end, df)))
+        )
+    if 'Hour' in df.columns:
+        jobs[cache_key("hour_boxplot", data_version, "exact")] = (
+            lambda: client_charts.bounded_json(client_charts.hour_boxplot_chart(hour_box_stats(df)))
+        )
+
+    def heatmap():
+        demographic_time = query.pivot(state, "Gender", "Location", measure="Total Time Spent", stat="mean")
+        # An empty payload stands for main1's "no data" warning
+        return "" if demographic_time.empty else client_charts.bounded_json(client_charts.gender_location_heatmap(demographic_time))
+
+    jobs[cache_key("gender_location_heatmap", data_version, "exact", state)] = heatmap
+    return jobs
+
+
+class Prewarmer:
+    # One background cycle per (dataset version, current state); a newer schedule() makes the
+    # running cycle stop after its current chart
+
+    def __init__(self, workers=None, history=None):
+        workers = prewarm_workers() if workers is None else workers
+        self.history = history if history is not None else StateHistory()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="insights-prewarm") if workers > 0 else None
+        self._lock = threading.Lock()
+        self._scheduled = None
+        self._generation = 0
+        self.stats = {"cycles": 0, "states": 0, "charts": 0, "bytes": 0, "cpu_seconds": 0.0}
+
+    def schedule(self, df, state):
+        # Called on every rerun with the state the page shows; cheap when nothing changed
+        if self._executor is None:
+            return None
+        key = (dataset_fingerprint(df), state)
+        with self._lock:
+            if key == self._scheduled:
+                return None
+            self._scheduled = key
+            self._generation += 1
+            generation = self._generation
+        return self._executor.submit(self.warm, df, state, generation)
+
+    def _current(self, generation):
+        return generation is None or generation == self._generation
+
+    def candidates(self, index, state):
+        states = [FilterState()] + self.history.most_common() + list(neighbours(index, state))
+        # First occurrence wins, so earlier sources keep their priority
+        return list(dict.fromkeys(states))[:MAX_STATES]
+
+    def warm(self, df, state, generation=None):
+        # Renders the candidate states' charts that are not cached yet; returns charts rendered
+        index = get_filter_index(df)
+        data_version = dataset_fingerprint(df)
+        query = get_backend(df)
+        aggregates = get_aggregates(df)
+        rendered = filled = 0
+        with self._lock:
+            self.stats["cycles"] += 1
+        for candidate in self.candidates(index, state):
+            if not self._current(generation):
+                break
+            jobs = section_jobs(df, candidate, index.resolve(candidate), data_version, query, aggregates)
+            for key, render in jobs.items():
+                if not self._current(generation) or filled >= MAX_BYTES:
+                    return rendered
+                if key in render_cache:
+                    continue
+                started = time.thread_time()
+                payload = render()
+                busy = time.thread_time() - started
+                if payload is not None:
+                    render_cache.put(key, payload)
+                    size = len(payload.encode("utf-8"))
+                    filled += size
+                    rendered += 1
+                    with self._lock:
+                        self.stats["charts"] += 1
+                        self.stats["bytes"] += size
+                with self._lock:
+                    self.stats["cpu_seconds"] += busy
+                # Idle long enough that rendering stays at CPU_SHARE of a core
+                time.sleep(busy * (1 / CPU_SHARE - 1))
+            with self._lock:
+                self.stats["states"] += 1
+        return rendered
+
+
+# Shared by every session in the process
+prewarmer = Prewarmer()
@@ -0,0 +1,243 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from data_loader import derived
+from filter_index import FILTER_COLUMNS, FilterState, get_filter_index
+from olap_cube import CUBE_DIMENSIONS, CUBE_MEASURES, get_cube
+
+# Every backend answers the same queries as olap_cube.Cube:
+#   mean(state, measure), sum(state, measure), count(state, measure=None),
+#   pivot(state, rows, columns=None, measure=None, stat="rows"|"count"|"sum"|"mean"|"std")
+# so main1.py can switch between them and their results can be compared.
+BACKENDS = ["cube", "pandas", "arrow"]
+DEFAULT_BACKEND = "cube"
+
+# Selects the backend main1.py queries through
+BACKEND_ENV = "INSIGHTS_QUERY_BACKEND"
+
+# The queries main1.py issues for the KPIs and the filtered sections: name -> (method, args, kwargs)
+DASHBOARD_QUERIES = {
+    "kpi.avg_engagement": ("mean", ("Engagement",), {}),
+    "kpi.total_time_spent": ("sum", ("Total Time Spent",), {}),
+    "kpi.avg_time_video": ("mean", ("Time Spent On Video",), {}),
+    "section1": ("pivot", ("Profession", "ConnectionType"), {}),
+    "section2": ("pivot", ("Age",), {"measure": "Addiction Level", "stat": "mean"}),
+    "section3": ("pivot", ("Gender", "Platform"), {"measure": "Self Control", "stat": "count"}),
+    "section8": ("pivot", ("Gender", "Location"), {"measure": "Total Time Spent", "stat": "mean"}),
+}
+
+
+def as_list(columns):
+    if columns is None:
+        return []
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def shape_pivot(result, stat, measure, columns):
+    # Same naming and layout as Cube.pivot
+    result = result.rename(measure if measure is not None else "size")
+    if columns:
+        fill = 0 if stat in ("rows", "count") else None
+        result = result.unstack(columns, fill_value=fill)
+    return result
+
+
+class PandasBackend:
+    # The original path: boolean masks over the row frame, then a pandas groupby
+
+    def __init__(self, df):
+        self.df = df
+
+    def filtered(self, state):
+        mask = pd.Series(True, index=self.df.index)
+        for column, values in state.selections:
+            mask &= self.df[column].isin(values)
+        if state.age_range is not None:
+            mask &= self.df['Age'].between(*state.age_range)
+        return self.df[mask]
+
+    def mean(self, state, measure):
+        return float(self.filtered(state)[measure].mean())
+
+    def sum(self, state, measure):
+        return float(self.filtered(state)[measure].sum())
+
+    def count(self, state, measure=None):
+        rows = self.filtered(state)
+        return len(rows) if measure is None else int(rows[measure].count())
+
+    def pivot(self, state, rows, columns=None, measure=None, stat="rows"):
+        rows, columns = as_list(rows), as_list(columns)
+        grouped = self.filtered(state).groupby(rows + columns, observed=True)
+        if stat == "rows":
+            result = grouped.size()
+        elif stat in ("count", "sum", "mean", "std"):
+            result = getattr(grouped[measure], stat)()
+        else:
+            raise ValueError(f"Unknown statistic: {stat}")
+        return shape_pivot(result, stat, measure, columns)
+
+
+def to_arrow(df, columns=CUBE_DIMENSIONS + CUBE_MEASURES):
+    # Only the queried columns, with string columns dictionary-encoded (one small int per row
+    # instead of a Python object)
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    for position, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(position, field.name, pc.dictionary_encode(table.column(position)))
+    return table
+
+
+# Arrow hash-aggregate function per statistic
+_ARROW_AGGREGATES = {
+    "count": ("count", None),
+    "sum": ("sum", None),
+    "mean": ("mean", None),
+    "std": ("stddev", pc.VarianceOptions(ddof=1)),
+}
+
+
+class ArrowBackend:
+    # Keeps the queried columns as an Arrow table and runs predicates, group-bys and
+    # reductions with Arrow compute kernels, which use Arrow's own thread pool
+
+    def __init__(self, table):
+        self.table = table
+        # Last filter state and its rows; every section of a rerun asks for the same state
+        self._last = None
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(to_arrow(df))
+
+    def extended(self, rows):
+        table = pa.concat_tables([self.table, to_arrow(rows, self.table.column_names)])
+        return ArrowBackend(table.unify_dictionaries())
+
+    def mask(self, state):
+        mask = None
+        for column, values in state.selections:
+            # Typed like the column's values, so an empty selection (right after unticking a
+            # "Select All") is an empty set of strings rather than an untyped null array
+            value_type = self.table.schema.field(column).type
+            if pa.types.is_dictionary(value_type):
+                value_type = value_type.value_type
+            condition = pc.is_in(self.table[column], value_set=pa.array(values, type=value_type))
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if state.age_range is not None:
+            low, high = state.age_range
+            age = self.table['Age']
+            condition = pc.and_(pc.greater_equal(age, low), pc.less_equal(age, high))
+            mask = condition if mask is None else pc.and_(mask, condition)
+        return mask
+
+    def filtered(self, state):
+        last = self._last
+        if last is not None and last[0] == state:
+            return last[1]
+        mask = self.mask(state)
+        table = self.table if mask is None else self.table.filter(mask)
+        self._last = (state, table)
+        return table
+
+    def mean(self, state, measure):
+        value = pc.mean(self.filtered(state)[measure]).as_py()
+        return np.nan if value is None else float(value)
+
+    def sum(self, state, measure):
+        return float(pc.sum(self.filtered(state)[measure], min_count=0).as_py())
+
+    def count(self, state, measure=None):
+        table = self.filtered(state)
+        return table.num_rows if measure is None else int(pc.count(table[measure]).as_py())
+
+    def pivot(self, state, rows, columns=None, measure=None, stat="rows"):
+        rows, columns = as_list(rows), as_list(columns)
+        keys = rows + columns
+        if stat == "rows":
+            aggregate, output = ([], "count_all"), "count_all"
+        elif stat in _ARROW_AGGREGATES:
+            function, options = _ARROW_AGGREGATES[stat]
+            aggregate = (measure, function, options) if options is not None else (measure, function)
+            output = f"{measure}_{function}"
+        else:
+            raise ValueError(f"Unknown statistic: {stat}")
+
+        grouped = self.filtered(state).group_by(keys, use_threads=True).aggregate([aggregate]).to_pandas()
+        for key in keys:
+            # Dictionary keys come back as categoricals; plain values sort and compare like pandas
+            if isinstance(grouped[key].dtype, pd.CategoricalDtype):
+                grouped[key] = grouped[key].astype(object)
+        result = grouped.set_index(keys)[output].sort_index()
+        return shape_pivot(result, stat, measure, columns)
+
+
+def get_backend(df, name=None):
+    # Backend chosen by name, else by INSIGHTS_QUERY_BACKEND, else the cube
+    name = name or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+    if name == "cube":
+        return get_cube(df)
+    if name == "pandas":
+        return derived(df, "pandas_backend", PandasBackend)
+    if name == "arrow":
+        return derived(df, "arrow_backend", ArrowBackend.from_frame, ArrowBackend.extended)
+    raise ValueError(f"Unknown query backend {name!r}; expected one of {BACKENDS}")
+
+
+def run_queries(backend, state, queries=DASHBOARD_QUERIES):
+    return {name: getattr(backend, method)(state, *args, **kwargs) for name, (method, args, kwargs) in queries.items()}
+
+
+def same_result(expected, actual, rtol=1e-9):
+    # Values and labels must match; dtypes may differ (e.g. int sums from Arrow, float from the
+    # cube, categorical labels from one backend and plain ones from another)
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(
+            expected, actual, check_dtype=False, check_index_type=False, check_column_type=False,
+            check_categorical=False, rtol=rtol,
+        )
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(
+            expected, actual, check_dtype=False, check_index_type=False, check_categorical=False, rtol=rtol
+        )
+    elif not np.isclose(expected, actual, rtol=rtol, equal_nan=True):
+        raise AssertionError(f"{expected!r} != {actual!r}")
+
+
+def parity_states(df):
+    # Filter states every backend must agree on: no filters, a narrow selection with an age
+    # range, and an empty selection (a "Select All" unticked with nothing picked yet)
+    index = get_filter_index(df)
+    first, last = index.age_bounds()
+    selections = {column: index.options(column)[:1] for column in FILTER_COLUMNS[:2]}
+    return [
+        FilterState(),
+        index.state(selections, (first, (first + last) // 2)),
+        index.state({FILTER_COLUMNS[0]: []}),
+    ]
+
+
+def compare_backends(df, states=None, names=BACKENDS, queries=DASHBOARD_QUERIES):
+    # Runs the dashboard queries on every backend for each state (a FilterState, a list of
+    # them, or parity_states(df) by default); returns (state, backend, query, message) per
+    # mismatch against the first backend in `names`
+    if states is None:
+        states = parity_states(df)
+    elif isinstance(states, FilterState):
+        states = [states]
+    backends = {name: get_backend(df, name) for name in names}
+    mismatches = []
+    for state in states:
+        results = {name: run_queries(backend, state, queries) for name, backend in backends.items()}
+        reference = results[names[0]]
+        for name in names[1:]:
+            for query, expected in reference.items():
+                try:
+                    same_result(expected, results[name][query])
+                except AssertionError as error:
+                    mismatches.append((state, name, query, str(error)))
+    return mismatches
@@ -0,0 +1,94 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+# Rendered charts kept per process; least recently used entries are evicted past this size
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Same settings st.pyplot uses, so cached images look identical to live ones
+PNG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+
+def cache_key(section, *inputs):
+    # Canonical key for a section and the inputs it depends on (dataset fingerprint,
+    # FilterState, widget values, ...). repr() of these is stable across processes.
+    return f"{section}:" + hashlib.sha1(repr(inputs).encode("utf-8")).hexdigest()
+
+
+def figure_png(fig):
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **PNG_OPTIONS)
+    # Free the figure right away; pyplot otherwise keeps every figure alive
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def plotly_json(fig):
+    return fig.to_json()
+
+
+def _size(value):
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+
+class RenderCache:
+    # Thread-safe LRU of rendered chart payloads (PNG bytes or Plotly JSON) under a byte budget
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = _size(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= _size(previous)
+            self._entries[key] = value
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= _size(evicted)
+        return value
+
+    def get_or_render(self, key, render):
+        # render() is only called on a miss and must return bytes or str
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, render())
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# Shared by every session in the process
+render_cache = RenderCache()
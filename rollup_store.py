@@ -0,0 +1,189 @@
+import pandas as pd
+
+from Preprocessor import AGE_BINS, AGE_LABELS, derive
+from filter_index import FILTER_COLUMNS, FilterState, get_filter_index
+from olap_cube import Cube, aggregate_cells, cell_stat, merge_cells
+
+# Time-bucketed rollups for the trend chart: the row count and 'Total Time Spent' sum per day
+# and per month for every combination of the categorical sidebar filters and the dashboard's
+# age groups. Weeks are summed from the day cells when read. Keeping age groups rather than
+# ages bounds the cells by filter combinations x age groups x buckets, whatever the row count;
+# an age range that ends inside a group reads that group's share from the rows themselves.
+
+# Bucket column in the cells; holds the first day of the bucket
+PERIOD = "Period"
+AGE_GROUP = 'Age Group'
+ROLLUP_FILTERS = FILTER_COLUMNS + [AGE_GROUP]
+ROLLUP_DIMENSIONS = ROLLUP_FILTERS + [PERIOD]
+ROLLUP_MEASURES = ['Total Time Spent']
+ROLLUP_STATS = ("sum",)
+
+# Granularity -> pandas period frequency (weeks start on Monday)
+GRANULARITIES = {"day": "D", "week": "W-SUN", "month": "M"}
+
+# Granularities with cells of their own; the others are summed from the day cells
+STORED_GRANULARITIES = ("day", "month")
+
+# Whole years each age group covers, (first, last, label); the groups are cut right-open
+AGE_GROUP_SPANS = [(AGE_BINS[i], AGE_BINS[i + 1] - 1, label) for i, label in enumerate(AGE_LABELS)]
+
+
+def row_dates(df):
+    # The export's Date column; an export without one has no trend (empty rollups), as
+    # there is no date to bucket its rows by
+    if 'Date' in df.columns:
+        return df['Date']
+    return pd.Series(pd.NaT, index=df.index[:0], dtype='datetime64[ns]')
+
+
+def bucket_start(dates, granularity):
+    if granularity == "day":
+        return dates.dt.normalize()
+    # Computed once per distinct date; rows and cells repeat the same few thousand days
+    codes, distinct = pd.factorize(dates, use_na_sentinel=False)
+    starts = pd.Series(distinct).dt.to_period(GRANULARITIES[granularity]).dt.start_time
+    return pd.Series(starts.to_numpy()[codes], index=dates.index, name=dates.name)
+
+
+def bucket_stop(starts, granularity):
+    # First day of the following bucket
+    return starts.dt.to_period(GRANULARITIES[granularity]).dt.end_time.dt.normalize() + pd.Timedelta(days=1)
+
+
+def _bucket_of(day, granularity):
+    return bucket_start(pd.Series([day]), granularity).iloc[0]
+
+
+def _bucket_at_or_after(day, granularity):
+    # First bucket starting on or after `day`
+    bucket = _bucket_of(day, granularity)
+    return bucket if bucket == day else bucket_stop(pd.Series([bucket]), granularity).iloc[0]
+
+
+def _day_range(start, end):
+    # Inclusive days start..end (None for open-ended) as [start, stop) timestamps
+    start = pd.Timestamp.min if start is None else pd.Timestamp(start).normalize()
+    stop = pd.Timestamp.max if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    return start, stop
+
+
+def day_cells(df):
+    # Additive per-day cells of df, like olap_cube.aggregate_cells with the day as one more dimension
+    dates = row_dates(df)
+    rows = df.loc[dates.index]
+    frame = rows[FILTER_COLUMNS + ROLLUP_MEASURES].assign(
+        **{AGE_GROUP: derive(rows, AGE_GROUP), PERIOD: bucket_start(dates, "day")}
+    )
+    return aggregate_cells(frame, ROLLUP_DIMENSIONS, ROLLUP_MEASURES, ROLLUP_STATS)
+
+
+def rebucket(cells, granularity):
+    # Day cells summed into week or month cells
+    cells = cells.assign(**{PERIOD: bucket_start(cells[PERIOD], granularity)})
+    return merge_cells([cells], ROLLUP_DIMENSIONS)
+
+
+def split_age_range(low, high):
+    # An inclusive age range as the age groups it wholly covers plus the (low, high) ranges
+    # left over at either end: parts of a group, or ages outside every group
+    whole = [(first, last, label) for first, last, label in AGE_GROUP_SPANS if low <= first and last <= high]
+    if not whole:
+        return (), [(low, high)]
+    edges = [(low, whole[0][0] - 1), (whole[-1][1] + 1, high)]
+    return tuple(label for _, _, label in whole), [(first, last) for first, last in edges if first <= last]
+
+
+class RollupStore:
+    # Day and month Cubes over ROLLUP_DIMENSIONS; the categorical sidebar filters resolve
+    # against the cells exactly like they do for olap_cube.Cube, and age ranges as age groups
+
+    def __init__(self, cells):
+        # cells: stored granularity -> cell frame
+        self.cubes = {
+            granularity: Cube(cells[granularity], ROLLUP_DIMENSIONS, ROLLUP_MEASURES, ROLLUP_FILTERS, age_column=None)
+            for granularity in STORED_GRANULARITIES
+        }
+        days = self.cubes["day"].cells[PERIOD].dropna()
+        self._bounds = None if days.empty else (days.min(), days.max())
+
+    @classmethod
+    def from_day_cells(cls, cells):
+        return cls({granularity: cells if granularity == "day" else rebucket(cells, granularity) for granularity in STORED_GRANULARITIES})
+
+    @classmethod
+    def build(cls, df):
+        return cls.from_day_cells(day_cells(df))
+
+    def extended(self, cells):
+        # Store with more day cells (e.g. from appended rows) folded into every granularity
+        return RollupStore({
+            granularity: merge_cells(
+                [cube.cells, cells if granularity == "day" else rebucket(cells, granularity)], ROLLUP_DIMENSIONS
+            )
+            for granularity, cube in self.cubes.items()
+        })
+
+    def date_bounds(self):
+        # (first, last) day with any rows, or None for an empty store
+        return self._bounds
+
+    def _cells(self, state, granularity, start, end):
+        # Cells of the filter state bucketed by `granularity`, limited to days in [start, end].
+        # Buckets wholly inside the range come pre-summed; the partial buckets at either end
+        # are summed from their day cells.
+        if self._bounds is not None:
+            # A range reaching past the data is open-ended, so the full range reads whole buckets
+            if start is not None and pd.Timestamp(start).normalize() <= self._bounds[0]:
+                start = None
+            if end is not None and pd.Timestamp(end).normalize() >= self._bounds[1]:
+                end = None
+        if granularity not in self.cubes:
+            days = self._cells(state, "day", start, end)
+            return days.assign(**{PERIOD: bucket_start(days[PERIOD], granularity)})
+
+        cells = self.cubes[granularity].slice(state)
+        if start is None and end is None:
+            return cells
+        start, stop = _day_range(start, end)
+        if granularity == "day":
+            return cells[(cells[PERIOD] >= start) & (cells[PERIOD] < stop)]
+
+        # Whole buckets start in [first, last); the bounds are computed once, not per cell
+        first = start if start == pd.Timestamp.min else _bucket_at_or_after(start, granularity)
+        last = stop if stop == pd.Timestamp.max else _bucket_of(stop, granularity)
+        whole = (cells[PERIOD] >= first) & (cells[PERIOD] < last)
+        days = self.cubes["day"].slice(state)
+        days = days[(days[PERIOD] >= start) & (days[PERIOD] < stop) & ((days[PERIOD] < first) | (days[PERIOD] >= last))]
+        edges = days.assign(**{PERIOD: bucket_start(days[PERIOD], granularity)})
+        return pd.concat([cells[whole], edges], ignore_index=True)
+
+    def _row_cells(self, rows, state, granularity, start, end):
+        # Per-bucket cells summed straight from the dataset's rows in the filter state
+        picked = get_filter_index(rows).resolve(state).take(rows[['Date'] + ROLLUP_MEASURES])
+        start, stop = _day_range(start, end)
+        picked = picked[(picked['Date'] >= start) & (picked['Date'] < stop)]
+        frame = picked[ROLLUP_MEASURES].assign(**{PERIOD: bucket_start(picked['Date'], granularity)})
+        return aggregate_cells(frame, [PERIOD], ROLLUP_MEASURES, ROLLUP_STATS)
+
+    def trend(self, state, granularity="month", start=None, end=None, rows=None):
+        # Total time spent per bucket for the rows in the filter state dated start..end
+        # (inclusive days, None for open-ended), as a frame of bucket start and value. The
+        # bucket column is named after the granularity ("Month", "Week", "Day").
+        # `rows` is the dataset the store was built from; it is read only when the state's age
+        # range ends inside an age group, for the rows of the ages that group's cells mix.
+        if state.age_range is None:
+            cells = self._cells(state, granularity, start, end)
+        else:
+            groups, edges = split_age_range(*state.age_range)
+            if self._bounds is None:
+                # No dated rows to add
+                edges = []
+            parts = [self._cells(FilterState(state.selections + ((AGE_GROUP, groups),)), granularity, start, end)]
+            if edges and rows is None:
+                raise ValueError("an age range ending inside an age group needs the dataset's rows")
+            for edge in edges:
+                parts.append(self._row_cells(rows, FilterState(state.selections, edge), granularity, start, end))
+            cells = pd.concat(parts, ignore_index=True)
+        grouped = cells.drop(columns=ROLLUP_FILTERS, errors="ignore").groupby(PERIOD).sum()
+        result = cell_stat(grouped, ROLLUP_MEASURES[0], "sum")
+        return result.rename_axis(granularity.title()).reset_index()
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.ipc
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing is only serialised within the process
+    fcntl = None
+
+# One copy of the cleaned dataset per host. The first process to load an export writes it
+# as an uncompressed Arrow IPC file; every Streamlit process and pool worker memory-maps
+# that file read-only, so numeric columns and category codes are views onto the same page
+# cache pages instead of a private copy per process.
+#
+# Refreshing is swap-on-refresh: a new version is written under its own name, then the
+# `<stem>.current` pointer is replaced atomically. Readers that already mapped the old
+# version keep using it (an unlinked file stays readable while it is mapped) and pick up
+# the new one on their next load_dataset.
+
+SHARED_DIR_ENV = "INSIGHTS_SHARED_DIR"
+
+# tmpfs where there is one, so the published file is itself shared memory
+SHARED_DIR = os.environ.get(SHARED_DIR_ENV) or (
+    "/dev/shm/insights" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "insights-shared")
+)
+
+# Published file -> mapped Table, so each process maps a version once
+_tables = {}
+# id(frame) -> (frame, published file) for frames handed out by attach()
+_frames = {}
+_lock = threading.Lock()
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+
+
+def published_path(path, fingerprint):
+    return os.path.join(SHARED_DIR, f"{_stem(path)}-{fingerprint}.arrow")
+
+
+def _pointer_path(path):
+    return os.path.join(SHARED_DIR, f"{_stem(path)}.current")
+
+
+def current(path):
+    # Name of the published version the pointer currently names, or None
+    try:
+        with open(_pointer_path(path), encoding="utf-8") as handle:
+            return handle.read().strip() or None
+    except OSError:
+        return None
+
+
+@contextmanager
+def publishing(path):
+    # Host-wide lock around building and publishing one export, so concurrent cold starts
+    # parse the CSV once and the others attach to the result
+    try:
+        os.makedirs(SHARED_DIR, exist_ok=True)
+        handle = open(os.path.join(SHARED_DIR, f"{_stem(path)}.lock"), "a")
+    except OSError:
+        # Nowhere to publish to, so nothing to serialise either
+        yield
+        return
+    with handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def publish(path, fingerprint, df):
+    # Writes df as the current version of `path` (unless that version already exists),
+    # swaps the pointer to it and returns the memory-mapped frame
+    target = published_path(path, fingerprint)
+    if not os.path.exists(target):
+        os.makedirs(SHARED_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, target)
+
+    pointer = _pointer_path(path)
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(os.path.basename(target))
+    os.replace(tmp, pointer)
+    _remove_old_versions(path, target)
+    return attach(target)
+
+
+def _remove_old_versions(path, keep):
+    prefix = f"{_stem(path)}-"
+    for name in os.listdir(SHARED_DIR):
+        full = os.path.join(SHARED_DIR, name)
+        if name.startswith(prefix) and name.endswith(".arrow") and full != keep:
+            try:
+                os.remove(full)
+            except OSError:
+                # Still mapped on a platform that refuses to unlink it; next publish retries
+                pass
+
+
+def _open(target):
+    # Maps the file; reading the table only parses its footer, the columns stay on disk pages
+    return pa.ipc.open_file(pa.memory_map(target, "r")).read_all()
+
+
+def attach(target):
+    # Read-only DataFrame over a published file. split_blocks keeps pandas from
+    # consolidating columns into a fresh block, which would copy them.
+    with _lock:
+        table = _tables.get(target)
+        if table is None:
+            table = _open(target)
+            _tables[target] = table
+    df = table.to_pandas(split_blocks=True)
+    with _lock:
+        _frames[id(df)] = (df, target)
+    return df
+
+
+def attach_rows(target, start, stop):
+    # Rows [start, stop) of a published file, for pool workers. The mapping is not cached,
+    # so a worker never pins a version that has since been swapped out.
+    return _open(target).slice(start, stop - start).to_pandas(split_blocks=True)
+
+
+def attach_current(path, fingerprint):
+    # The published frame for this version of `path`, if the pointer names it
+    target = published_path(path, fingerprint)
+    if current(path) != os.path.basename(target) or not os.path.exists(target):
+        return None
+    try:
+        return attach(target)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def source_of(df):
+    # Published file behind a frame from attach(), or None for ordinary frames
+    entry = _frames.get(id(df))
+    return entry[1] if entry is not None and entry[0] is df else None
+
+
+def mapped_table(df):
+    # The memory-mapped Table behind a frame from attach(), or None for ordinary frames
+    target = source_of(df)
+    if target is None:
+        return None
+    with _lock:
+        return _tables.get(target)
+
+
+def release(df):
+    # Forgets a frame that is no longer served; its mapping goes once nothing references it
+    with _lock:
+        entry = _frames.pop(id(df), None)
+        if entry is not None and not any(target == entry[1] for _, target in _frames.values()):
+            _tables.pop(entry[1], None)
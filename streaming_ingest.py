@@ -0,0 +1,169 @@
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Preprocessor import apply_schema, clean_data, create_additional_columns
+from olap_cube import ROWS, measure_column
+from parallel_aggregate import merge_partials, partial_aggregates
+from rollup_store import PERIOD, ROLLUP_MEASURES, bucket_start
+
+# Rows parsed per chunk; peak memory is proportional to this, not to the file size
+DEFAULT_CHUNKSIZE = 250_000
+
+# Whole-dataset partials (parallel_aggregate.partial_aggregates) summed over the chunks and
+# written next to the parts: cube cells, per-day trend cells, and the section 4 and 7 sums
+PARTIAL_FILES = {
+    "cells": "_cube.parquet",
+    "days": "_days.parquet",
+    "age_sum": "_age_sum.parquet",
+    "age_count": "_age_count.parquet",
+    "platforms": "_platforms.parquet",
+}
+CUBE_FILE = PARTIAL_FILES["cells"]
+
+
+class RowHashSet:
+    # Remembers 64-bit hashes of rows already emitted, as sorted numpy runs (8 bytes per
+    # unique row instead of a Python object per row). Runs are merged as they pile up.
+
+    def __init__(self, max_runs=8):
+        self.runs = []
+        self.max_runs = max_runs
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add_new(self, hashes):
+        # Returns a mask of hashes never seen before (first occurrence only) and records them
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        unique, first = np.unique(hashes, return_index=True)
+        fresh = np.ones(len(unique), dtype=bool)
+        for run in self.runs:
+            positions = np.searchsorted(run, unique).clip(max=len(run) - 1)
+            fresh &= run[positions] != unique
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[fresh]] = True
+
+        if fresh.any():
+            self.runs.append(unique[fresh])
+            if len(self.runs) > self.max_runs:
+                self.runs = [np.unique(np.concatenate(self.runs))]
+        return mask
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def preprocess_chunk(chunk, seen=None):
+    # Same steps as Preprocessor.preprocessor_data, applied to one chunk; duplicates are
+    # removed across chunks when a RowHashSet is given
+    chunk = clean_data(chunk)
+    if seen is not None and len(chunk):
+        chunk = chunk[seen.add_new(row_hashes(chunk))]
+    return create_additional_columns(chunk)
+
+
+def write_partials(partials, output_dir):
+    for key, name in PARTIAL_FILES.items():
+        value = partials[key]
+        frame = value.to_frame(key) if isinstance(value, pd.Series) else value
+        frame.to_parquet(os.path.join(output_dir, name), index=isinstance(value, pd.Series))
+
+
+def stream_preprocess(source, output_dir, chunksize=DEFAULT_CHUNKSIZE, dedupe=True, aggregates=True):
+    # Reads `source` in bounded chunks, cleans each one and writes it as a Parquet part file
+    # under `output_dir`, which pandas/pyarrow read back as one dataset. Each chunk's partial
+    # aggregates are folded in as it goes by and written next to the parts, so loading the
+    # dataset does not aggregate it again. Everything is written to a temporary directory
+    # and moved into place at the end.
+    tmp_dir = f"{output_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    seen = RowHashSet() if dedupe else None
+    schema = None
+    partials = None
+    rows_in = rows_out = parts = 0
+
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        rows_in += len(chunk)
+        chunk = preprocess_chunk(chunk, seen)
+        if chunk.empty:
+            continue
+
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        if schema is None:
+            # The first chunk fixes the schema so every part file reads back as one dataset
+            schema = table.schema
+        pq.write_table(table, os.path.join(tmp_dir, f"part-{parts:05d}.parquet"))
+        parts += 1
+        rows_out += len(chunk)
+
+        if aggregates:
+            # Cells are bounded by the dimension combinations, so the running sum stays small
+            partial = partial_aggregates(apply_schema(chunk))
+            partials = partial if partials is None else merge_partials([partials, partial])
+
+    if partials is not None:
+        write_partials(partials, tmp_dir)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    return {"rows_in": rows_in, "rows_out": rows_out, "parts": parts}
+
+
+def read_parts(output_dir):
+    # The cleaned rows written by stream_preprocess (aggregate side files excluded)
+    names = sorted(name for name in os.listdir(output_dir) if name.startswith("part-"))
+    if not names:
+        return pd.DataFrame()
+    return pd.read_parquet([os.path.join(output_dir, name) for name in names])
+
+
+def _read_partial(output_dir, key):
+    path = os.path.join(output_dir, PARTIAL_FILES[key])
+    if not os.path.exists(path):
+        return None
+    frame = pd.read_parquet(path)
+    # Chunks had their own categories; the merged cells get the dataset's dtypes back
+    return apply_schema(frame) if key in ("cells", "days") else frame[key]
+
+
+def read_partials(output_dir):
+    # The partials stream_preprocess summed, shaped like parallel_aggregate.partial_aggregates
+    # returns them, or None if the parts were written without them
+    partials = {key: _read_partial(output_dir, key) for key in PARTIAL_FILES}
+    if any(value is None for value in partials.values()):
+        return None
+    partials["rows"] = int(partials["cells"][ROWS].sum())
+    return partials
+
+
+def read_cube_cells(output_dir):
+    return _read_partial(output_dir, "cells")
+
+
+def read_monthly(output_dir):
+    # Monthly 'Total Time Spent' totals, summed from the per-day trend cells
+    days = _read_partial(output_dir, "days")
+    if days is None:
+        return None
+    measure = ROLLUP_MEASURES[0]
+    totals = days.groupby(bucket_start(days[PERIOD], "month"))[measure_column(measure, "sum")].sum()
+    return totals.rename(measure).rename_axis("Month").reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean a large CSV export in bounded chunks.")
+    parser.add_argument("source")
+    parser.add_argument("output_dir")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--no-dedupe", action="store_true")
+    args = parser.parse_args()
+    print(stream_preprocess(args.source, args.output_dir, args.chunksize, dedupe=not args.no_dedupe))
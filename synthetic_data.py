@@ -0,0 +1,93 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from Preprocessor import AGE_BINS, AGE_LABELS
+from data_loader import DATA_PATH
+
+# Columns with at most this many distinct values are sampled from their observed frequencies;
+# wider numeric columns are drawn uniformly from their observed range
+CATEGORICAL_MAX_VALUES = 60
+
+START_DATE = pd.Timestamp('2023-01-01')
+DATE_SPAN_DAYS = 3 * 365
+
+# The real export the rows are modelled on; a relative path is taken from the repository,
+# so the generator (and benchmark.py, load_test.py) can run from any directory
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_PATH)
+
+
+class Profile:
+    # Per-column distributions learned from the real export, used to synthesise rows with
+    # the same schema, value sets and (optionally exaggerated) frequency skew.
+
+    def __init__(self, template=TEMPLATE_PATH, skew=0.0):
+        df = pd.read_csv(template)
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes
+        self.categorical = {}
+        self.ranges = {}
+        for column in self.columns:
+            if column in ('UserID', 'Date', 'Month', 'Age Group'):
+                continue
+            counts = df[column].value_counts()
+            if df[column].dtype == object or df[column].dtype == bool or len(counts) <= CATEGORICAL_MAX_VALUES:
+                # skew > 0 sharpens the observed frequencies so popular values dominate more
+                weights = counts.to_numpy(dtype=float) ** (1.0 + skew)
+                self.categorical[column] = (counts.index.to_numpy(), weights / weights.sum())
+            else:
+                self.ranges[column] = (int(df[column].min()), int(df[column].max()))
+
+    def sample(self, n_rows, seed=0, first_id=1):
+        rng = np.random.default_rng(seed)
+        data = {}
+        for column in self.columns:
+            if column == 'UserID':
+                data[column] = np.arange(first_id, first_id + n_rows, dtype=np.int64)
+            elif column in self.categorical:
+                values, probabilities = self.categorical[column]
+                data[column] = values[rng.choice(len(values), size=n_rows, p=probabilities)]
+            elif column in self.ranges:
+                low, high = self.ranges[column]
+                data[column] = rng.integers(low, high + 1, size=n_rows)
+
+        dates = START_DATE + pd.to_timedelta(rng.integers(0, DATE_SPAN_DAYS, size=n_rows), unit='D')
+        data['Date'] = dates.strftime('%Y-%m-%d')
+        data['Month'] = dates.strftime('%Y-%m')
+        data['Age Group'] = pd.cut(data['Age'], bins=AGE_BINS, labels=AGE_LABELS, right=False).astype(str)
+        return pd.DataFrame(data, columns=self.columns)
+
+
+def generate(n_rows, seed=0, skew=0.0, template=TEMPLATE_PATH):
+    # In-memory frame shaped like the raw export (before Preprocessor runs)
+    return Profile(template, skew).sample(n_rows, seed)
+
+
+def write_csv(path, n_rows, chunk_rows=1_000_000, seed=0, skew=0.0, template=TEMPLATE_PATH):
+    # Writes n_rows synthetic rows chunk by chunk, so 10^8 rows never sit in memory at once
+    profile = Profile(template, skew)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    chunk = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        frame = profile.sample(size, seed=seed + chunk, first_id=written + 1)
+        frame.to_csv(tmp, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += size
+        chunk += 1
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic export shaped like 'cleaning dataset final.csv'.")
+    parser.add_argument("path")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=0.0)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--template", default=TEMPLATE_PATH, help="export to model the rows on")
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, args.chunk_rows, args.seed, args.skew, args.template)
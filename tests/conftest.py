@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The app's modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_loader  # noqa: E402
+import shared_dataset  # noqa: E402
+from Preprocessor import apply_schema, clean_data, create_additional_columns  # noqa: E402
+from filter_index import FILTER_COLUMNS, FilterIndex  # noqa: E402
+from synthetic_data import generate  # noqa: E402
+
+# Synthetic rows are drawn from the value sets of the real export
+TEMPLATE = os.path.join(ROOT, "cleaning dataset final.csv")
+
+ROWS = 4000
+
+
+def clean(raw):
+    # What preprocessor_data does after reading the CSV
+    return apply_schema(create_additional_columns(clean_data(raw.copy()))).reset_index(drop=True)
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    return clean(generate(ROWS, seed=7, template=TEMPLATE))
+
+
+@pytest.fixture(scope="session")
+def filter_states(dataset):
+    # Sidebar states of every kind: no filters, one or several columns narrowed, options
+    # that match nothing, empty selections (a "Select All" unticked with nothing picked)
+    # and age ranges inside, across and outside the data
+    index = FilterIndex(dataset)
+    rng = np.random.default_rng(11)
+    first, last = index.age_bounds()
+    states = [index.state({}), index.state({column: [] for column in FILTER_COLUMNS[:1]})]
+    for _ in range(40):
+        selections = {}
+        for column in rng.choice(FILTER_COLUMNS, size=rng.integers(1, 4), replace=False):
+            options = index.options(column)
+            picked = rng.choice(options, size=rng.integers(0, len(options) + 1), replace=False)
+            selections[column] = list(picked) + (["no such value"] if rng.random() < 0.1 else [])
+        low, high = sorted(rng.integers(first - 5, last + 5, size=2))
+        states.append(index.state(selections, (low, high) if rng.random() < 0.6 else None))
+    return states
+
+
+@pytest.fixture
+def isolated_cache(tmp_path, monkeypatch):
+    # Snapshots, shared copies and the process-wide dataset cache confined to one test
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(shared_dataset, "SHARED_DIR", str(tmp_path / "shared"))
+    data_loader.clear_cache()
+    yield tmp_path
+    data_loader.clear_cache()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from aggregations import hour_box_stats
+
+
+@pytest.fixture(scope="module")
+def skewed(dataset):
+    # The synthetic times are uniform and have no outliers; push some rows far out either way
+    rng = np.random.default_rng(9)
+    frame = dataset[['Hour', 'Total Time Spent']].copy()
+    rows = rng.choice(len(frame), size=120, replace=False)
+    frame.iloc[rows[:100], 1] = frame['Total Time Spent'].max() * rng.uniform(5, 50, size=100)
+    frame.iloc[rows[100:], 1] = -frame['Total Time Spent'].max() * rng.uniform(5, 50, size=20)
+    return frame
+
+
+def test_hour_box_stats_match_pandas_quantiles(skewed):
+    stats = hour_box_stats(skewed)
+    hours = skewed['Hour'].astype(int)
+    assert list(stats.index) == sorted(hours.unique())
+    assert stats["fliers"].map(len).sum() == 120
+    for hour, values in skewed['Total Time Spent'].groupby(hours):
+        row = stats.loc[hour]
+        q1, med, q3 = values.quantile([0.25, 0.5, 0.75])
+        np.testing.assert_allclose([row["q1"], row["med"], row["q3"]], [q1, med, q3])
+        assert (row["min"], row["max"], row["count"]) == (values.min(), values.max(), len(values))
+
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = values[values.between(low, high)]
+        assert (row["whislo"], row["whishi"]) == (inside.min(), inside.max())
+        outliers = values[~values.between(low, high)]
+        np.testing.assert_array_equal(np.sort(row["fliers"]), np.sort(outliers.to_numpy()))
+
+
+def test_hour_box_stats_cap_the_outliers(skewed):
+    stats = hour_box_stats(skewed, max_outliers=5)
+    hours = skewed['Hour'].astype(int)
+    for hour, values in skewed['Total Time Spent'].groupby(hours):
+        row = stats.loc[hour]
+        low, high = row["q1"] - 1.5 * (row["q3"] - row["q1"]), row["q3"] + 1.5 * (row["q3"] - row["q1"])
+        outliers = values[~values.between(low, high)].to_numpy()
+        assert len(row["fliers"]) == min(5, len(outliers)) == 5
+        assert np.isin(row["fliers"], outliers).all()
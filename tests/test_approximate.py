@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import approximate
+import data_loader
+from approximate import APPROXIMATE_ENV, StratifiedSample, approximate_by_default, exact_or_none
+from conftest import TEMPLATE
+from filter_index import FilterIndex
+from olap_cube import Cube
+from synthetic_data import write_csv
+
+
+def test_error_bounds_cover_the_exact_answer(dataset, filter_states):
+    # 95% intervals: over many independent samples nearly every one should hold the truth
+    cube = Cube.build(dataset)
+    states = [state for state in filter_states[:12] if cube.count(state) >= 200]
+    hits = total = 0
+    for seed in range(30):
+        sample = StratifiedSample.build(dataset, target=800, seed=seed)
+        for state in states:
+            for (estimate, error), exact in [
+                (sample.mean_with_error(state, 'Engagement'), cube.mean(state, 'Engagement')),
+                (sample.sum_with_error(state, 'Total Time Spent'), cube.sum(state, 'Total Time Spent')),
+                (sample.count_with_error(state), cube.count(state)),
+            ]:
+                hits += abs(estimate - exact) <= error
+                total += 1
+    assert hits / total >= 0.85
+
+
+def test_pivot_errors_cover_the_exact_cells(dataset):
+    cube = Cube.build(dataset)
+    state = FilterIndex(dataset).state({"Location": ["India", "Germany", "Pakistan"]})
+    # Groups that cut across the strata, so their errors are not zero
+    exact = cube.pivot(state, 'Profession', 'ConnectionType', measure='Engagement', stat='mean')
+    hits = total = 0
+    for seed in range(30):
+        estimate, error = StratifiedSample.build(dataset, target=800, seed=seed).pivot_with_error(
+            state, 'Profession', 'ConnectionType', measure='Engagement', stat='mean'
+        )
+        assert (error > 0).to_numpy().any()
+        inside = (estimate - exact).abs() <= error
+        hits += int(inside.to_numpy().sum())
+        total += inside.size
+    assert hits / total >= 0.85
+
+
+def test_full_sample_is_exact(dataset, filter_states):
+    cube = Cube.build(dataset)
+    sample = StratifiedSample.build(dataset, target=len(dataset))
+    for state in filter_states:
+        estimate, error = sample.sum_with_error(state, 'Total Time Spent')
+        assert np.isclose(estimate, cube.sum(state, 'Total Time Spent')) and error == 0
+        assert sample.count(state) == cube.count(state)
+
+
+def test_approximate_by_default_follows_size_and_setting(dataset, monkeypatch):
+    monkeypatch.delenv(APPROXIMATE_ENV, raising=False)
+    assert not approximate_by_default(dataset)
+    monkeypatch.setattr(approximate, "APPROXIMATE_MIN_ROWS", len(dataset))
+    assert approximate_by_default(dataset)
+    monkeypatch.setenv(APPROXIMATE_ENV, "0")
+    assert not approximate_by_default(dataset)
+
+
+def test_exact_or_none_builds_in_the_background(isolated_cache):
+    path = str(isolated_cache / "export.csv")
+    write_csv(path, 1000, seed=2, template=TEMPLATE)
+    df = data_loader.load_dataset(path)
+    built = []
+
+    def build(frame):
+        time.sleep(0.2)
+        built.append(len(frame))
+        return Cube.build(frame)
+
+    assert exact_or_none(df, "exact_cube", build) is None
+    # Asked again while building: still the sample, and no second build
+    assert exact_or_none(df, "exact_cube", build) is None
+    deadline = time.monotonic() + 30
+    while approximate.refining() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert isinstance(exact_or_none(df, "exact_cube", build), Cube)
+    assert built == [len(df)]
+
+    # Frames that were not loaded are never cached, so they are built right away
+    assert isinstance(exact_or_none(pd.DataFrame(df), "exact_cube", Cube.build), Cube)
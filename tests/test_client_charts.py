@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+import client_charts
+from client_charts import MIN_POINTS, PayloadTooLarge, lttb
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 40)
+    y[437], y[812] = 25.0, -25.0
+    keep = lttb(x, y, 100)
+    assert len(keep) == 100 and keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+    assert {437, 812} <= set(keep)
+
+
+def test_lttb_leaves_short_series_alone():
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 20), np.arange(10))
+
+
+def daily_trend(days):
+    dates = pd.date_range("2023-01-01", periods=days, freq="D")
+    values = np.random.default_rng(1).normal(1000, 50, size=days)
+    return pd.DataFrame({"Day": dates, "Total Time Spent": values})
+
+
+def test_bounded_json_fits_the_budget():
+    trend = daily_trend(20_000)
+    fig = client_charts.monthly_trends_chart(trend)
+    assert len(fig.to_json()) > 64 * 1024
+    payload = client_charts.bounded_json(fig, budget=64 * 1024)
+    assert len(payload.encode("utf-8")) <= 64 * 1024
+    # Still a line over the whole range, with the first and last day kept
+    trace = json.loads(payload)["data"][0]
+    assert MIN_POINTS <= len(trace["y"]) < len(trend)
+    assert (trace["x"][0], trace["x"][-1]) == ("2023-01-01", trend["Day"].iloc[-1].strftime("%Y-%m-%d"))
+
+
+def test_bounded_json_leaves_small_charts_untouched():
+    fig = client_charts.monthly_trends_chart(daily_trend(30))
+    assert client_charts.bounded_json(fig) == fig.to_json()
+
+
+def test_bounded_json_gives_up_when_nothing_can_be_thinned():
+    fig = go.Figure(go.Heatmap(z=np.random.default_rng(2).random((200, 200))))
+    with pytest.raises(PayloadTooLarge):
+        client_charts.bounded_json(fig, budget=16 * 1024)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import AGE_COLUMN, FILTER_COLUMNS, FilterIndex, FilterState, RowSet
+from query_backend import PandasBackend
+
+
+def pandas_mask(df, state, skip=None):
+    # The row mask the original pandas filters give, optionally without one filter
+    mask = pd.Series(True, index=df.index)
+    for column, values in state.selections:
+        if column != skip:
+            mask &= df[column].isin(values)
+    if state.age_range is not None and skip != AGE_COLUMN:
+        mask &= df[AGE_COLUMN].between(*state.age_range)
+    return mask.to_numpy()
+
+
+def test_resolve_matches_pandas(dataset, filter_states):
+    index = FilterIndex(dataset)
+    for state in filter_states:
+        rows = index.resolve(state)
+        expected = pandas_mask(dataset, state)
+        np.testing.assert_array_equal(rows.mask(), expected)
+        assert rows.count() == expected.sum()
+        pd.testing.assert_index_equal(rows.take(dataset).index, PandasBackend(dataset).filtered(state).index)
+
+
+def test_state_drops_filters_that_keep_everything(dataset):
+    index = FilterIndex(dataset)
+    everything = {column: index.options(column) for column in FILTER_COLUMNS}
+    assert index.state(everything, index.age_bounds()) == FilterState()
+    assert index.state({"Gender": []}).selections == (("Gender", ()),)
+    assert index.resolve(index.state({"Gender": []})).is_empty()
+
+
+def test_facets_match_pandas(dataset, filter_states):
+    index = FilterIndex(dataset)
+    for state in filter_states:
+        counts, ages = index.facets(state)
+        for column in FILTER_COLUMNS:
+            # Each option counted under every active filter but its own column's
+            others = dataset[pandas_mask(dataset, state, skip=column)]
+            expected = others[column].value_counts()
+            for value in index.options(column):
+                assert counts[column][value] == expected.get(value, 0)
+        others = dataset[pandas_mask(dataset, state, skip=AGE_COLUMN)]
+        expected = others[AGE_COLUMN].value_counts().reindex(ages.index, fill_value=0)
+        np.testing.assert_array_equal(ages.to_numpy(), expected.to_numpy())
+
+
+def test_extended_matches_rebuild(dataset, filter_states):
+    head, tail = dataset.iloc[:2500], dataset.iloc[2500:]
+    extended = FilterIndex(head).extended(tail)
+    rebuilt = FilterIndex(dataset)
+    for state in filter_states:
+        np.testing.assert_array_equal(extended.resolve(state).mask(), rebuilt.resolve(state).mask())
+
+
+def test_rowset_extend_keeps_partial_byte():
+    rng = np.random.default_rng(3)
+    first, second = rng.random(13) < 0.5, rng.random(29) < 0.5
+    rows = RowSet.from_mask(first).extend(second)
+    np.testing.assert_array_equal(rows.mask(), np.concatenate([first, second]))
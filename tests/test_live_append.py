@@ -0,0 +1,72 @@
+import pandas as pd
+
+import data_loader
+from conftest import TEMPLATE
+from filter_index import FilterIndex, get_filter_index
+from live_ingest import AppendTracker
+from parallel_aggregate import DatasetAggregates, get_aggregates
+from query_backend import get_backend, run_queries
+from synthetic_data import Profile, write_csv
+
+
+def append_csv(path, rows, seed):
+    # What the exporting job does: complete lines added to the end of the file
+    profile = Profile(TEMPLATE)
+    first_id = len(pd.read_csv(path, usecols=['UserID'])) + 1
+    profile.sample(rows, seed=seed, first_id=first_id).to_csv(path, mode='a', header=False, index=False)
+
+
+def test_appended_rows_match_full_reload(isolated_cache, filter_states):
+    path = str(isolated_cache / "export.csv")
+    write_csv(path, 3000, seed=5, template=TEMPLATE)
+    tracker = AppendTracker(path)
+    df = data_loader.load_dataset(path)
+    # Structures built before the append are extended, not rebuilt
+    get_filter_index(df)
+    get_aggregates(df)
+    get_backend(df, "arrow")
+
+    append_csv(path, 700, seed=6)
+    assert tracker.poll() == 700
+    appended = data_loader.load_dataset(path)
+
+    data_loader.clear_cache()
+    reloaded = data_loader.load_dataset(path)
+    pd.testing.assert_frame_equal(appended, reloaded, check_dtype=False, check_categorical=False)
+
+    index, rebuilt_index = get_filter_index(appended), FilterIndex(reloaded)
+    aggregates, rebuilt = get_aggregates(appended), DatasetAggregates.build(reloaded, workers=1)
+    for state in filter_states:
+        assert (index.resolve(state).mask() == rebuilt_index.resolve(state).mask()).all()
+        for name in ("cube", "arrow"):
+            ours = run_queries(get_backend(appended, name), state)
+            expected = run_queries(get_backend(reloaded, "pandas"), state)
+            for query, value in expected.items():
+                if isinstance(value, (pd.Series, pd.DataFrame)):
+                    pd.testing.assert_frame_equal(
+                        pd.DataFrame(ours[query]), pd.DataFrame(value),
+                        check_dtype=False, check_categorical=False, check_index_type=False, check_column_type=False,
+                    )
+                else:
+                    assert ours[query] == value or (pd.isna(ours[query]) and pd.isna(value))
+        pd.testing.assert_frame_equal(aggregates.trend(state, "week", rows=appended), rebuilt.trend(state, "week", rows=reloaded))
+    pd.testing.assert_frame_equal(aggregates.age_group_time(), rebuilt.age_group_time())
+    pd.testing.assert_frame_equal(aggregates.platform_totals(), rebuilt.platform_totals(), check_categorical=False)
+
+
+def test_partial_line_waits_for_the_rest(isolated_cache):
+    path = str(isolated_cache / "export.csv")
+    write_csv(path, 500, seed=5, template=TEMPLATE)
+    tracker = AppendTracker(path)
+    append_csv(path, 3, seed=8)
+    with open(path, "rb") as handle:
+        data = handle.read()
+    # Cut the last appended line in half, as if the writer were still busy
+    cut = data.rstrip(b"\n").rfind(b"\n") + 10
+    with open(path, "wb") as handle:
+        handle.write(data[:cut])
+    assert tracker.poll() == 2
+    with open(path, "ab") as handle:
+        handle.write(data[cut:])
+    assert tracker.poll() == 1
+    assert len(data_loader.load_dataset(path)) == 503
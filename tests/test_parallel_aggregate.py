@@ -0,0 +1,33 @@
+import pandas as pd
+
+from parallel_aggregate import PARALLEL_ROWS_ENV, DatasetAggregates, map_reduce, partial_aggregates
+from query_backend import run_queries
+
+
+def test_map_reduce_matches_one_pass(dataset, filter_states, monkeypatch):
+    # Small frames normally stay in-process; lower the threshold so the pool runs
+    monkeypatch.setenv(PARALLEL_ROWS_ENV, "1")
+    merged, sequential = map_reduce(dataset, workers=3), partial_aggregates(dataset)
+    assert merged["rows"] == sequential["rows"] == len(dataset)
+    pd.testing.assert_series_equal(merged["age_count"], sequential["age_count"])
+    pd.testing.assert_series_equal(merged["age_sum"], sequential["age_sum"])
+    pd.testing.assert_series_equal(merged["platforms"], sequential["platforms"].sort_index(), check_categorical=False)
+
+    parallel, one_pass = DatasetAggregates(merged), DatasetAggregates(sequential)
+    for state in filter_states:
+        expected = run_queries(one_pass.cube, state)
+        for query, value in run_queries(parallel.cube, state).items():
+            if isinstance(value, (pd.Series, pd.DataFrame)):
+                pd.testing.assert_frame_equal(pd.DataFrame(value), pd.DataFrame(expected[query]), check_categorical=False)
+            else:
+                assert value == expected[query] or (pd.isna(value) and pd.isna(expected[query]))
+        pd.testing.assert_frame_equal(parallel.trend(state, "day", rows=dataset), one_pass.trend(state, "day", rows=dataset))
+
+
+def test_small_frames_stay_in_process(dataset, monkeypatch):
+    def no_pool(workers):
+        raise AssertionError("the pool was started for a small frame")
+
+    monkeypatch.delenv(PARALLEL_ROWS_ENV, raising=False)
+    monkeypatch.setattr("parallel_aggregate._get_pool", no_pool)
+    assert map_reduce(dataset, workers=8)["rows"] == len(dataset)
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+import pytest
+
+from Preprocessor import AGE_BINS, AGE_LABELS, PIPELINE, ColumnCache, Stage, age_groups, clean_data, run_pipeline
+from conftest import TEMPLATE
+from synthetic_data import generate
+
+
+@pytest.fixture
+def raw():
+    return clean_data(generate(800, seed=4, template=TEMPLATE))
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    # Outputs of the stages actually run (rather than read back from the cache)
+    ran = []
+    original = Stage.run
+
+    def run(self, df):
+        ran.append(self.output)
+        return original(self, df)
+
+    monkeypatch.setattr(Stage, "run", run)
+    return ran
+
+
+def test_cached_pipeline_matches_and_skips_unchanged_stages(tmp_path, raw, computed):
+    cache = ColumnCache(str(tmp_path), "export.csv")
+    first = run_pipeline(raw.copy(), cache)
+    assert computed == ['Date', 'Hour', 'Month', 'Age Group']
+    pd.testing.assert_frame_equal(first, run_pipeline(raw.copy()))
+
+    computed.clear()
+    second = run_pipeline(raw.copy(), cache)
+    assert computed == []
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_changed_input_recomputes_only_its_stages(tmp_path, raw, computed):
+    cache = ColumnCache(str(tmp_path), "export.csv")
+    run_pipeline(raw.copy(), cache)
+    computed.clear()
+    changed = raw.copy()
+    changed['Age'] = changed['Age'] + 1
+    result = run_pipeline(changed.copy(), cache)
+    assert computed == ['Age Group']
+    pd.testing.assert_series_equal(result['Age Group'], run_pipeline(changed.copy())['Age Group'])
+
+    computed.clear()
+    changed['Date'] = pd.to_datetime(changed['Date']) + pd.Timedelta(days=40)
+    run_pipeline(changed.astype({'Date': str}), cache)
+    assert computed == ['Date', 'Month']
+
+
+def test_changed_stage_recomputes_it_and_what_reads_it(tmp_path, raw, computed):
+    cache = ColumnCache(str(tmp_path), "export.csv")
+    run_pipeline(raw.copy(), cache)
+    computed.clear()
+    stages = [
+        Stage('Age Group', ['Age'], age_groups, bins=[0, 25] + AGE_BINS[2:], labels=['0-25'] + AGE_LABELS[1:])
+        if stage.output == 'Age Group' else stage
+        for stage in PIPELINE
+    ]
+    result = run_pipeline(raw.copy(), cache, stages)
+    assert computed == ['Age Group']
+    assert '0-25' in set(result['Age Group'].astype(str))
+
+
+def test_column_versions_are_pruned_per_export(tmp_path, raw):
+    directory = str(tmp_path)
+    first, second = ColumnCache(directory, "first export.csv", keep=2), ColumnCache(directory, "second.csv", keep=2)
+    second.put('Hour', "a", raw['Age'].rename('Hour'))
+    for key in "abcd":
+        first.put('Hour', key, raw['Age'].rename('Hour'))
+    names = sorted(os.listdir(directory))
+    assert names == ['first_export-Hour-c.parquet', 'first_export-Hour-d.parquet', 'second-Hour-a.parquet']
+    assert first.get('Hour', "a", raw.index) is None
+    pd.testing.assert_series_equal(first.get('Hour', "d", raw.index), raw['Age'].rename('Hour'))
+    # A cached column of another length (a different export version) is not reused
+    assert first.get('Hour', "d", raw.index[:10]) is None
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Preprocessor import AGE_LABELS
+from filter_index import FilterIndex
+from parallel_aggregate import DatasetAggregates
+from rollup_store import GRANULARITIES, RollupStore, bucket_start, day_cells, split_age_range
+
+
+def scanned_trend(df, rows, granularity, start=None, end=None):
+    # The trend straight from the filtered rows
+    rows = df[rows.mask()]
+    if start is not None:
+        rows = rows[rows['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[rows['Date'] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    return rows.groupby(bucket_start(rows['Date'], granularity))['Total Time Spent'].sum()
+
+
+@pytest.mark.parametrize("granularity", list(GRANULARITIES))
+@pytest.mark.parametrize("date_range", [(None, None), ("2023-02-15", "2024-11-03"), (None, "2023-06-30"), ("2025-03-02", None)])
+def test_trend_matches_scan(dataset, filter_states, granularity, date_range):
+    index = FilterIndex(dataset)
+    store = RollupStore.build(dataset)
+    for state in filter_states[:15]:
+        trend = store.trend(state, granularity, *date_range, dataset).set_index(granularity.title())['Total Time Spent']
+        expected = scanned_trend(dataset, index.resolve(state), granularity, *date_range)
+        pd.testing.assert_index_equal(trend.index, expected.index, check_names=False)
+        np.testing.assert_allclose(trend.to_numpy(), expected.to_numpy())
+
+
+def test_extended_matches_rebuild(dataset):
+    head, tail = dataset.iloc[:2500], dataset.iloc[2500:]
+    extended = RollupStore.build(head).extended(day_cells(tail))
+    rebuilt = RollupStore.build(dataset)
+    for granularity in GRANULARITIES:
+        pd.testing.assert_frame_equal(
+            extended.trend(FilterIndex(dataset).state({}), granularity),
+            rebuilt.trend(FilterIndex(dataset).state({}), granularity),
+        )
+
+
+def test_age_range_splits_into_whole_groups_and_edges():
+    assert split_age_range(18, 39) == (('19-30', '31-40'), [])
+    assert split_age_range(20, 45) == (('31-40',), [(20, 29), (40, 45)])
+    assert split_age_range(33, 36) == ((), [(33, 36)])
+    assert split_age_range(0, 120) == (tuple(AGE_LABELS), [(100, 120)])
+
+
+def test_whole_age_groups_do_not_read_rows(dataset):
+    # Ranges on age group bounds are answered from the cells alone
+    store = RollupStore.build(dataset)
+    index = FilterIndex(dataset)
+    state = index.state({"Gender": ["Male"]}, (18, 39))
+    expected = scanned_trend(dataset, index.resolve(state), "month")
+    np.testing.assert_allclose(store.trend(state, "month")['Total Time Spent'].to_numpy(), expected.to_numpy())
+    with pytest.raises(ValueError):
+        store.trend(index.state({}, (20, 45)), "month")
+
+
+def test_export_without_dates_has_no_trend(dataset):
+    # Enough rows that one invented day per row would overflow pandas' date range
+    rows = pd.concat([dataset.drop(columns=['Date', 'Month'])] * 25, ignore_index=True)
+    aggregates = DatasetAggregates.build(rows, workers=1)
+    assert aggregates.date_bounds() is None
+    assert aggregates.trend(FilterIndex(rows).state({})).empty
+    assert aggregates.rows == len(rows)
@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+
+import data_loader
+import shared_dataset
+from conftest import TEMPLATE
+from shared_dataset import attach_current, attach_rows, current, mapped_table, publish, release, source_of
+from synthetic_data import write_csv
+
+
+def test_publish_then_attach(isolated_cache, dataset):
+    path = str(isolated_cache / "export.csv")
+    shared = publish(path, "v1", dataset)
+    pd.testing.assert_frame_equal(shared, dataset)
+    assert source_of(shared) == shared_dataset.published_path(path, "v1")
+    assert current(path) == "export-v1.arrow"
+    assert source_of(dataset) is None
+
+    attached = attach_current(path, "v1")
+    pd.testing.assert_frame_equal(attached, dataset)
+    assert attach_current(path, "v0") is None
+    # Pool workers map just their row range
+    pd.testing.assert_frame_equal(
+        attach_rows(source_of(shared), 1000, 1500), dataset.iloc[1000:1500].reset_index(drop=True)
+    )
+
+
+def test_swap_keeps_old_readers_working(isolated_cache, dataset):
+    path = str(isolated_cache / "export.csv")
+    old = publish(path, "v1", dataset)
+    newer = dataset.iloc[::2].reset_index(drop=True)
+    new = publish(path, "v2", newer)
+
+    assert current(path) == "export-v2.arrow"
+    assert attach_current(path, "v1") is None
+    pd.testing.assert_frame_equal(attach_current(path, "v2"), newer)
+    # The old version is unlinked, but the session still reading it keeps its rows
+    assert not os.path.exists(shared_dataset.published_path(path, "v1"))
+    pd.testing.assert_frame_equal(old, dataset)
+    assert len(new) == len(newer)
+
+    release(old)
+    assert mapped_table(old) is None
+    assert mapped_table(new) is not None
+
+
+def test_second_load_attaches_instead_of_parsing(isolated_cache, monkeypatch):
+    path = str(isolated_cache / "export.csv")
+    write_csv(path, 1500, seed=8, template=TEMPLATE)
+    first = data_loader.load_dataset(path)
+    published = source_of(first)
+    assert published is not None
+
+    # What another process sees on a cold start: the published copy, without a parse
+    data_loader.clear_cache()
+
+    def parse(*args):
+        raise AssertionError("the export was parsed again")
+
+    monkeypatch.setattr(data_loader, "_read_or_build", parse)
+    second = data_loader.load_dataset(path)
+    assert source_of(second) == published
+    pd.testing.assert_frame_equal(second, first)
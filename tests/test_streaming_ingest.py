@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+import data_loader
+from Preprocessor import apply_schema, preprocessor_data
+from conftest import TEMPLATE
+from parallel_aggregate import DatasetAggregates
+from query_backend import run_queries
+from streaming_ingest import RowHashSet, read_monthly, read_partials, read_parts, stream_preprocess
+from synthetic_data import generate
+
+
+def test_row_hash_set_keeps_first_occurrences():
+    seen = RowHashSet(max_runs=2)
+    rng = np.random.default_rng(4)
+    batches = [rng.integers(0, 500, size=300).astype(np.uint64) for _ in range(6)]
+    kept, expected, emitted = [], [], set()
+    for batch in batches:
+        kept.append(batch[seen.add_new(batch)])
+        for value in batch:
+            if value not in emitted:
+                emitted.add(value)
+                expected.append(value)
+    # Runs were merged along the way, and every value came out once, in order
+    assert len(seen.runs) <= 3
+    np.testing.assert_array_equal(np.concatenate(kept), np.array(expected, dtype=np.uint64))
+    assert len(seen) == len(emitted)
+
+
+def export_with_duplicates(path):
+    # Rows repeated within and across chunks, and rows the cleaning drops
+    raw = generate(3000, seed=3, template=TEMPLATE)
+    raw = pd.concat([raw, raw.iloc[100:400], raw.iloc[2500:2600]], ignore_index=True)
+    raw.loc[[5, 900], 'Gender'] = None
+    raw.to_csv(path, index=False)
+
+
+def test_streamed_parts_match_preprocessor_data(tmp_path):
+    source = str(tmp_path / "export.csv")
+    export_with_duplicates(source)
+    output = str(tmp_path / "parts")
+    summary = stream_preprocess(source, output, chunksize=700)
+    streamed = apply_schema(read_parts(output))
+    expected = preprocessor_data(source).reset_index(drop=True)
+    assert summary["rows_out"] == len(expected) and summary["parts"] == 5
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, check_categorical=False)
+
+
+def test_streamed_partials_match_aggregating_the_rows(tmp_path, filter_states):
+    source = str(tmp_path / "export.csv")
+    export_with_duplicates(source)
+    output = str(tmp_path / "parts")
+    stream_preprocess(source, output, chunksize=700)
+    df = apply_schema(read_parts(output))
+    streamed, built = DatasetAggregates(read_partials(output)), DatasetAggregates.build(df, workers=1)
+
+    assert streamed.rows == built.rows == len(df)
+    for state in filter_states:
+        expected = run_queries(built.cube, state)
+        for query, value in run_queries(streamed.cube, state).items():
+            if isinstance(value, (pd.Series, pd.DataFrame)):
+                pd.testing.assert_frame_equal(pd.DataFrame(value), pd.DataFrame(expected[query]), check_dtype=False)
+            else:
+                assert np.isclose(value, expected[query], equal_nan=True)
+        pd.testing.assert_frame_equal(streamed.trend(state, "week", rows=df), built.trend(state, "week", rows=df))
+    pd.testing.assert_frame_equal(streamed.age_group_time(), built.age_group_time())
+    pd.testing.assert_frame_equal(streamed.platform_totals(), built.platform_totals(), check_categorical=False)
+
+    monthly = read_monthly(output).set_index("Month")['Total Time Spent']
+    expected = df.groupby(df['Date'].dt.to_period("M").dt.start_time)['Total Time Spent'].sum()
+    np.testing.assert_allclose(monthly.to_numpy(), expected.to_numpy())
+
+
+def test_streamed_load_comes_with_its_aggregates(isolated_cache, monkeypatch):
+    source = str(isolated_cache / "export.csv")
+    export_with_duplicates(source)
+    monkeypatch.setattr(data_loader, "STREAMING_THRESHOLD_BYTES", 0)
+    df = data_loader.load_dataset(source)
+    aggregates = data_loader.peek_derived(df, "aggregates")
+    assert aggregates is not None and aggregates.rows == len(df)